@@ -0,0 +1,488 @@
+# -*- coding: utf-8 -*-
+"""Microbenchmarks of the hot paths of the client.
+
+Measures the throughput and the peak memory of the serialization of points
+to line protocol, the escaping of tags, the parsing of query results and
+the conversion of DataFrames, at several shapes of data: number of series
+(the cardinality of the tags), number of tags and of fields, and mixes of
+float, integer, boolean and string values.
+
+The end-to-end cases time the writes and queries of a client against a
+server: the pure-Python stand-in server of the tests, started in this
+process, or the InfluxDB server given with `--server`. The stand-in server
+shares the interpreter with the client, so its own work is counted too.
+
+Run it from the root of the repository::
+
+    $ python benchmarks/bench.py
+    $ python benchmarks/bench.py --filter make_lines --json after.json
+    $ python benchmarks/bench.py --json after.json --compare before.json
+    $ python benchmarks/bench.py --filter end --server http://db:8086
+
+The throughput is given in units per second, the unit being a point, a row
+of a result or a tag depending on the case, from the best of `--repeat`
+runs. The peak memory is measured with :mod:`tracemalloc` over a separate
+run, as tracing slows the code down, and is not available on Python 2.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import sys
+from timeit import default_timer
+
+from six.moves.urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import influxdb
+from influxdb import Point
+from influxdb.client import InfluxDBClient
+from influxdb.line_protocol import (
+    _escape_tag,
+    _series_order,
+    coalesce_lines,
+    iter_lines,
+    make_lines,
+)
+from influxdb.resultset import ResultSet
+from influxdb.tests.server_tests.standin_server import StandInServer
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import numpy as np
+    import pandas as pd
+    from influxdb import DataFrameClient
+except ImportError:
+    pd = None
+
+RESULTS_VERSION = 1
+
+# number of points, rows or tags handled by one call of a case
+SIZE = 10000
+QUICK_SIZE = 1000
+
+# name: (number of series, tags per point, fields per point, field types)
+SHAPES = {
+    'one-float': (10, 2, 1, 'float'),
+    'mixed': (100, 4, 10, 'mixed'),
+    'wide': (100, 4, 50, 'float'),
+    'strings': (100, 4, 5, 'string'),
+    'high-cardinality': (None, 8, 4, 'mixed'),
+}
+
+_CASES = []
+
+# address of the server of the end-to-end cases and the stand-in server
+# started for them, unless --server is given
+_server = {}
+
+
+def case(name, unit='points', **variants):
+    """Register a benchmark, once per value of its only variant.
+
+    The decorated function takes the size and the variant and returns the
+    function to time, with the number of units it handles if that is not
+    the size, or None to skip the benchmark.
+    """
+    def register(setup):
+        if not variants:
+            _CASES.append((name, unit, None, None, setup))
+        for param, values in variants.items():
+            for value in values:
+                _CASES.append((name, unit, param, value, setup))
+        return setup
+    return register
+
+
+def _value(kind, index, rand):
+    if kind == 'mixed':
+        kind = ('float', 'int', 'bool', 'string')[index % 4]
+    if kind == 'float':
+        return rand.random() * 1000
+    elif kind == 'int':
+        return rand.randint(-2 ** 40, 2 ** 40)
+    elif kind == 'bool':
+        return rand.random() < 0.5
+    return 'value "{0}", with spaces'.format(rand.randint(0, 10 ** 6))
+
+
+def make_points(size, shape, duplicates=1):
+    """Return `size` dict points of a shape, from a fixed seed.
+
+    With `duplicates`, that many consecutive points share their series and
+    time but not their fields.
+    """
+    series, tags, fields, kind = SHAPES[shape]
+    rand = random.Random(size)
+    points = []
+    for i in range(size):
+        row = i // duplicates
+        key = row if series is None else row % series
+        points.append({
+            'measurement': 'bench',
+            'tags': dict(('tag{0}'.format(t), 'value-{0}-{1}'.format(t, key))
+                         for t in range(tags)),
+            'time': 1500000000000000000 + row * 1000000000,
+            'fields': dict(('field{0}-{1}'.format(i % duplicates, f),
+                            _value(kind, f, rand))
+                           for f in range(fields)),
+        })
+    return points
+
+
+def make_series(size, series, columns=5, tags=True):
+    """Return the raw result of a query of `size` rows over `series`."""
+    rand = random.Random(size)
+    names = ['time'] + ['value{0}'.format(c) for c in range(columns - 1)]
+    result = []
+    for s in range(series):
+        values = []
+        for row in range(max(1, size // series)):
+            values.append(['2017-07-14T02:40:{0:02d}.{1:06d}Z'.format(
+                row % 60, row)])
+            values[-1].extend(rand.random() for _ in range(columns - 1))
+        raw = {'name': 'bench', 'columns': names, 'values': values}
+        if tags:
+            raw['tags'] = {'host': 'host{0}'.format(s)}
+        result.append(raw)
+    return {'series': result}
+
+
+@case('make_lines', shape=sorted(SHAPES))
+def bench_make_lines(size, shape):
+    """Serialize dict points."""
+    data = {'points': make_points(size, shape)}
+    return lambda: make_lines(data)
+
+
+@case('make_lines[Point]', shape=['one-float', 'mixed'])
+def bench_make_lines_point(size, shape):
+    """Serialize Point objects."""
+    points = [Point(p['measurement'], tags=p['tags'], fields=p['fields'],
+                    time=p['time'], time_precision='n')
+              for p in make_points(size, shape)]
+    data = {'points': points}
+
+    def serialize():
+        # points keep their line, which is only reused when they are
+        # written again: time their first serialization
+        for point in points:
+            point._line = None
+        make_lines(data)
+    return serialize
+
+
+@case('coalesce_lines', duplicates=[1, 4])
+def bench_coalesce_lines(size, duplicates):
+    """Serialize points merging those of a series sharing a time."""
+    data = {'points': make_points(size, 'mixed', duplicates)}
+    return lambda: coalesce_lines(data)
+
+
+@case('sort_by_series', shape=['one-float', 'high-cardinality'])
+def bench_sort_by_series(size, shape):
+    """Sort serialized lines by series and time, as sort_by_series does."""
+    lines = [line[:-1] for line in iter_lines(
+        {'points': make_points(size, shape)})]
+    random.Random(size).shuffle(lines)
+    return lambda: sorted(lines, key=_series_order)
+
+
+@case('_escape_tag', unit='tags', tags=['plain', 'special'])
+def bench_escape_tag(size, tags):
+    """Escape tag keys and values."""
+    if tags == 'plain':
+        values = ['host-{0}.example.com'.format(i) for i in range(size)]
+    else:
+        values = ['a host, {0}=eu\\west'.format(i) for i in range(size)]
+
+    def escape():
+        for value in values:
+            _escape_tag(value)
+    return escape
+
+
+@case('ResultSet.get_points', unit='rows', series=[1, 100])
+def bench_get_points(size, series):
+    """Iterate over the points of a result, then of one of its series."""
+    result = ResultSet(make_series(size, series))
+
+    def get_points():
+        list(result.get_points())
+        list(result.get_points('bench', tags={'host': 'host0'}))
+    return get_points
+
+
+class _ChunkedResponse(object):
+    """The part of a response :meth:`_read_chunked_response` reads."""
+
+    def __init__(self, lines):
+        self._lines = lines
+
+    def iter_lines(self):
+        return iter(self._lines)
+
+
+@case('_read_chunked_response', unit='rows', chunk_size=[100, 10000])
+def bench_read_chunked_response(size, chunk_size):
+    """Parse the chunks of the response of a chunked query."""
+    raw = make_series(size, 1, tags=False)['series'][0]
+    values = raw['values']
+    lines = [json.dumps({'results': [{'statement_id': 0, 'series': [
+        dict(raw, values=values[i:i + chunk_size])]}]}).encode('utf-8')
+        for i in range(0, len(values), chunk_size)]
+    response = _ChunkedResponse(lines)
+    return lambda: list(InfluxDBClient._read_chunked_response(
+        response).get_points())
+
+
+@case('DataFrame to lines', rows=['numeric', 'tagged'])
+def bench_dataframe_to_lines(size, rows):
+    """Convert a DataFrame to line protocol."""
+    if pd is None:
+        return None
+    rand = np.random.RandomState(size)
+    frame = pd.DataFrame(
+        rand.rand(size, 4), columns=['a', 'b', 'c', 'd'],
+        index=pd.date_range('2017-01-01', periods=size, freq='s'))
+    tag_columns = []
+    if rows == 'tagged':
+        frame['host'] = ['host{0}'.format(i % 100) for i in range(size)]
+        frame['int'] = rand.randint(0, 1000, size)
+        tag_columns = ['host']
+    client = DataFrameClient(database='db')
+    return lambda: client._convert_dataframe_to_lines(
+        frame, 'bench', tag_columns=tag_columns)
+
+
+def _client(**kwargs):
+    """Return a client of the 'bench' database of the benchmark server."""
+    if 'address' not in _server:
+        standin = _server['standin'] = StandInServer().start()
+        _server['address'] = (standin.host, standin.port)
+    host, port = _server['address']
+    client = InfluxDBClient(host, port, database='bench', **kwargs)
+    client.create_database('bench')
+    return client
+
+
+@case('write (end to end)',
+      transport=['requests', 'gzip', 'fast_writes', 'sort_by_series'])
+def bench_write(size, transport):
+    """Write a batch of points to the server."""
+    options = {} if transport == 'requests' else {transport: True}
+    client = _client(**options)
+    client.query('DROP MEASUREMENT bench')
+    points = make_points(size, 'mixed')
+    return lambda: client.write_points(points)
+
+
+@case('write latency (end to end)', unit='requests',
+      transport=['requests', 'fast_writes'])
+def bench_write_latency(size, transport):
+    """Write points one request at a time."""
+    client = _client(fast_writes=transport == 'fast_writes')
+    client.query('DROP MEASUREMENT bench')
+    requests = max(1, size // 100)
+    points = [[point] for point in make_points(requests, 'one-float')]
+
+    def write():
+        for batch in points:
+            client.write_points(batch)
+    return write, requests
+
+
+@case('query (end to end)', unit='rows', chunked=[False, True])
+def bench_query(size, chunked):
+    """Query the rows of a series."""
+    client = _client()
+    client.query('DROP MEASUREMENT bench_query')
+    client.write_points(
+        ['bench_query a={0},b={0}i,c="row {0}" {0}'.format(i)
+         for i in range(size)], protocol='line')
+    query = 'SELECT * FROM bench_query'
+    return lambda: list(client.query(
+        query, epoch='n', chunked=chunked, chunk_size=1000).get_points())
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def measure(func, repeat, min_time):
+    """Return the seconds per call of every run and the peak memory.
+
+    A run calls `func` as many times as needed to last `min_time`.
+    """
+    func()
+    number = 1
+    while True:
+        started = default_timer()
+        for _ in range(number):
+            func()
+        elapsed = default_timer() - started
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 2 >= min_time else 10
+    runs = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = default_timer()
+        for _ in range(number):
+            func()
+        runs.append((default_timer() - started) / number)
+
+    peak = None
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return runs, peak
+
+
+def run(size, repeat, min_time, patterns=None, out=sys.stdout):
+    """Run the benchmarks whose name contains one of `patterns`.
+
+    :returns: the results, one dict per benchmark
+    :rtype: list
+    """
+    results = []
+    for name, unit, param, value, setup in _CASES:
+        label = name if param is None else '{0}[{1}={2}]'.format(
+            name, param, value)
+        if patterns and not any(p in label for p in patterns):
+            continue
+        func = setup(size) if param is None else setup(size, value)
+        units = size
+        if isinstance(func, tuple):
+            func, units = func
+        if func is None:
+            print('{0:<56} skipped'.format(label), file=out)
+            continue
+        runs, peak = measure(func, repeat, min_time)
+        best = min(runs)
+        result = {'name': label, 'case': name,
+                  'params': {} if param is None else {param: value},
+                  'unit': unit, 'size': size, 'repeat': repeat,
+                  'best': best, 'median': _median(runs),
+                  'per_second': units / best, 'peak_bytes': peak}
+        results.append(result)
+        print('{0:<56} {1:>12,.0f} {2}/s {3:>10}'.format(
+            label, result['per_second'], unit,
+            '-' if peak is None else '{0:,.0f} KiB'.format(peak / 1024)),
+            file=out)
+    return results
+
+
+def compare(results, baseline, threshold, out=sys.stdout):
+    """Print the change of throughput of every benchmark since a baseline.
+
+    :returns: the number of benchmarks slower by more than `threshold`
+    :rtype: int
+    """
+    before = dict((r['name'], r) for r in baseline['results'])
+    regressions = 0
+    for result in results:
+        old = before.get(result['name'])
+        if old is None or old['size'] != result['size']:
+            continue
+        change = result['per_second'] / old['per_second'] - 1
+        flag = ''
+        if change < -threshold:
+            regressions += 1
+            flag = '  slower'
+        elif change > threshold:
+            flag = '  faster'
+        print('{0:<56} {1:>+8.1%}{2}'.format(result['name'], change, flag),
+              file=out)
+    return regressions
+
+
+def parse_args(argv=None):
+    """Parse the args."""
+    parser = argparse.ArgumentParser(
+        description='microbenchmarks of the InfluxDB client')
+    parser.add_argument('--filter', action='append', default=[],
+                        metavar='TEXT',
+                        help='only run the benchmarks whose name contains '
+                             'TEXT, can be repeated')
+    parser.add_argument('--size', type=int, default=SIZE,
+                        help='points, rows or tags per call')
+    parser.add_argument('--quick', action='store_true',
+                        help='use a size of {0} and a single run'.format(
+                            QUICK_SIZE))
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs, the best is reported')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum seconds per run')
+    parser.add_argument('--server', metavar='URL',
+                        help='run the end-to-end cases against the InfluxDB '
+                             'server at URL instead of a stand-in server')
+    parser.add_argument('--json', metavar='FILE',
+                        help='write the results to FILE as JSON')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare with the results of a previous run')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change reported as faster or slower')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the benchmarks, returning 1 if some got slower."""
+    args = parse_args(argv)
+    if args.quick:
+        args.size, args.repeat = QUICK_SIZE, 1
+    if args.server:
+        url = urlparse(args.server)
+        _server['address'] = (url.hostname, url.port or 8086)
+    try:
+        results = run(args.size, args.repeat, args.min_time, args.filter)
+    finally:
+        if 'standin' in _server:
+            _server['standin'].close()
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({
+                'version': RESULTS_VERSION,
+                'influxdb': influxdb.__version__,
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                'date': datetime.datetime.utcnow().isoformat() + 'Z',
+                'results': results,
+            }, output, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            baseline = json.load(baseline)
+        print('', 'Change since {0}:'.format(args.compare), sep='\n')
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,15 +6,31 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+from .aggregation import Aggregator
+from .batching import BatchingWriter
 from .client import InfluxDBClient
 from .dataframe_client import DataFrameClient
+from .gevent_client import GeventInfluxDBClient
 from .helper import SeriesHelper
+from .point import Point
+from .retry import RetryPolicy
+from .sharding import ShardedInfluxDBClient
+from .spool import WriteSpool
+from .stats import ClientStats
 
 
 __all__ = [
     'InfluxDBClient',
     'DataFrameClient',
+    'GeventInfluxDBClient',
+    'ShardedInfluxDBClient',
     'SeriesHelper',
+    'BatchingWriter',
+    'Aggregator',
+    'Point',
+    'RetryPolicy',
+    'ClientStats',
+    'WriteSpool',
 ]
 
 
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Load balancing of the requests between several InfluxDB hosts."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+import threading
+
+from six import string_types
+
+LOAD_BALANCING = ('round_robin', 'least_outstanding')
+
+_READ_STATEMENT_RE = re.compile(r'^\s*(SELECT|SHOW)\b', re.IGNORECASE)
+_INTO_RE = re.compile(r'\bINTO\b', re.IGNORECASE)
+
+
+def parse_host(host, default_port=8086):
+    """Return the (host, port) of a host given as a tuple or a string.
+
+    Strings are either "host" or "host:port", IPv6 addresses being written
+    "[address]:port".
+    """
+    if not isinstance(host, string_types):
+        name, port = host
+        return name, int(port)
+    if host.startswith('['):
+        name, _, port = host[1:].partition(']')
+        port = port.lstrip(':')
+    elif host.count(':') == 1:
+        name, _, port = host.partition(':')
+    else:
+        name, port = host, None
+    return name, int(port) if port else default_port
+
+
+def base_url(scheme, host, port):
+    """Return the URL of a host, IPv6 addresses being bracketed."""
+    if ':' in host:
+        host = '[{0}]'.format(host)
+    return "{0}://{1}:{2}".format(scheme, host, port)
+
+
+def is_read_query(query):
+    """Tell whether a query only reads, and may go to a read replica.
+
+    Every statement of the query must be a SELECT or a SHOW, without
+    INTO. Anything else (databases, users, retention policies, DROP...)
+    changes the data and must go to the write hosts.
+    """
+    if not query or _INTO_RE.search(query):
+        return False
+    statements = [s for s in query.split(';') if s.strip()]
+    return bool(statements) and all(_READ_STATEMENT_RE.match(s)
+                                    for s in statements)
+
+
+class Endpoint(object):
+    """An InfluxDB host and the requests in flight to it."""
+
+    __slots__ = ('url', 'outstanding', 'healthy')
+
+    def __init__(self, url):
+        """Initialize an endpoint assumed healthy."""
+        self.url = url
+        self.outstanding = 0
+        self.healthy = True
+
+    def __repr__(self):
+        """Represent the endpoint and its health."""
+        return '<Endpoint {0} {1}>'.format(
+            self.url, 'up' if self.healthy else 'down')
+
+
+class HostPool(object):
+    """Pick the host of each request among the healthy ones.
+
+    With 'round_robin' the healthy hosts are used in turn; with
+    'least_outstanding' the host with the fewest requests in flight is
+    used, ties being broken in turn. A host is ejected when a request to
+    it fails and readmitted by the health probes; when no host is healthy
+    they are all tried anyway.
+    """
+
+    def __init__(self, endpoints, strategy='round_robin'):
+        """Initialize a pool of the given endpoints."""
+        if strategy not in LOAD_BALANCING:
+            raise ValueError("load_balancing must be one of {0}".format(
+                ', '.join(repr(s) for s in LOAD_BALANCING)))
+        self.endpoints = endpoints
+        self._least_outstanding = strategy == 'least_outstanding'
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Return the endpoint of the next request, counted in flight."""
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.healthy]
+            if not candidates:
+                candidates = self.endpoints
+            self._next = (self._next + 1) % len(candidates)
+            endpoint = candidates[self._next]
+            if self._least_outstanding:
+                # scan from the round robin choice to spread the ties
+                rotated = candidates[self._next:] + candidates[:self._next]
+                endpoint = min(rotated, key=lambda e: e.outstanding)
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint, failed=False):
+        """Count a request as done, ejecting its host if it failed."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.healthy = False
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Vectorized line protocol serialization of NumPy columns."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from functools import reduce
+
+import numpy as np
+from six import iteritems
+
+from .line_protocol import (
+    _PRECISION_NS,
+    _escape_tag,
+    _escape_value,
+    _get_unicode,
+)
+
+_TAG_ESCAPES = (('\\', '\\\\'), (' ', '\\ '), (',', '\\,'), ('=', '\\='))
+_STRING_ESCAPES = (('\\', '\\\\'), ('"', '\\"'), ('\n', '\\n'))
+
+
+def _replace_all(values, escapes):
+    for old, new in escapes:
+        values = np.char.replace(values, old, new)
+    return values
+
+
+def _concat(*parts):
+    return reduce(np.char.add, parts)
+
+
+def _text(values):
+    """Return `values` as an array of text, None becoming ''."""
+    kind = values.dtype.kind
+    if kind == 'U':
+        return values
+    if kind == 'S':
+        return np.char.decode(values, 'utf-8')
+    if kind == 'O':
+        return np.array([_get_unicode(value, force=True) for value in values],
+                        dtype='U')
+    return values.astype('U')
+
+
+def _tag_column(values):
+    """Return the escaped tag values and the mask of the non-empty ones."""
+    text = _text(values)
+    return _replace_all(text, _TAG_ESCAPES), text != ''
+
+
+def _field_column(values):
+    """Return the encoded field values and the mask of the valid ones.
+
+    NaN and infinite floats, which line protocol cannot represent, and
+    empty strings are masked out.
+    """
+    kind = values.dtype.kind
+    if kind == 'f':
+        return values.astype('U'), np.isfinite(values)
+    if kind in 'iu':
+        return np.char.add(values.astype('U'), 'i'), None
+    if kind == 'b':
+        return values.astype('U'), None
+    if kind in 'US':
+        text = _text(values)
+        quoted = _concat('"', _replace_all(text, _STRING_ESCAPES), '"')
+        return quoted, text != ''
+    if kind == 'O':
+        encoded = np.array([_escape_value(value) for value in values],
+                           dtype='U')
+        return encoded, encoded != ''
+    raise TypeError("Unsupported field dtype: {0}".format(values.dtype))
+
+
+def datetime64_to_precision(times, precision):
+    """Return datetime64 values as integers in `precision`."""
+    if np.isnat(times).any():
+        raise ValueError("times must not contain NaT")
+    ns = times.astype('datetime64[ns]').view('int64')
+    unit = _PRECISION_NS[precision]
+    # truncate towards zero, like the conversion of single timestamps
+    return np.where(ns < 0, -(-ns // unit), ns // unit)
+
+
+def _time_column(times, precision):
+    """Return the timestamps in `precision` as an array of text."""
+    kind = times.dtype.kind
+    if kind == 'M':
+        times = datetime64_to_precision(times, precision)
+    elif kind not in 'iu':
+        raise TypeError(
+            "times must be integers or datetime64, not {0}".format(
+                times.dtype))
+    return times.astype('U')
+
+
+def _join_set(parts, masks):
+    """Join the parts with commas, leaving the masked ones out."""
+    joined = None
+    for part, mask in zip(parts, masks):
+        if mask is not None:
+            part = np.where(mask, part, '')
+        if joined is None:
+            joined = part
+            continue
+        separator = np.where((joined != '') & (part != ''), ',', '')
+        joined = _concat(joined, separator, part)
+    return joined
+
+
+def column_lines(measurement, times, fields, tags=None, precision=None):
+    """Return the UTF-8 encoded lines of the given columns.
+
+    :param measurement: the name of the measurement
+    :type measurement: str
+    :param times: integer timestamps in `precision` or datetime64 values,
+        or None to let the server stamp the points
+    :type times: numpy.ndarray
+    :param fields: the field columns, by field name
+    :type fields: dict of numpy.ndarray
+    :param tags: the tag columns, or scalar values shared by all the rows,
+        by tag name
+    :type tags: dict
+    :param precision: precision of the timestamps, defaults to None
+    :type precision: str
+    :returns: one line per row, without newline. Rows without any valid
+        field are left out
+    :rtype: list of bytes
+    """
+    if not fields:
+        raise ValueError("fields must not be empty")
+
+    columns = dict((key, np.asarray(value)) for key, value in
+                   iteritems(fields))
+    if times is not None:
+        times = np.asarray(times)
+    sizes = set(len(value) for value in columns.values())
+    if times is not None:
+        sizes.add(len(times))
+
+    tag_columns = []
+    prefix = _escape_tag(measurement)
+    for key, value in sorted(iteritems(tags or {})):
+        key = _escape_tag(key)
+        if np.ndim(value) == 0:
+            value = _escape_tag(value)
+            if key and value:
+                tag_columns.append(',' + key + '=' + value)
+            continue
+        value = np.asarray(value)
+        sizes.add(len(value))
+        if key:
+            escaped, mask = _tag_column(value)
+            tagged = _concat(',' + key + '=', escaped)
+            tag_columns.append(np.where(mask, tagged, ''))
+
+    if len(sizes) != 1:
+        raise ValueError("All the columns must have the same length")
+
+    field_parts = []
+    field_masks = []
+    for key, value in sorted(iteritems(columns)):
+        key = _escape_tag(key)
+        if not key:
+            continue
+        encoded, mask = _field_column(value)
+        field_parts.append(np.char.add(key + '=', encoded))
+        field_masks.append(mask)
+    field_set = _join_set(field_parts, field_masks)
+
+    parts = [prefix] + tag_columns + [' ', field_set]
+    if times is not None:
+        parts += [' ', _time_column(times, precision)]
+    lines = _concat(*parts)
+
+    lines = lines[field_set != '']
+    return np.char.encode(lines, 'utf-8').tolist()
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Parse the errors InfluxDB returns for the points it could not write."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import re
+
+from .exceptions import InfluxDBPartialWriteError, WriteFailure
+
+_UNABLE_TO_PARSE_RE = re.compile(r"unable to parse '(.*)': (.*)$")
+_TYPE_CONFLICT_RE = re.compile(
+    r'field type conflict: input field "((?:[^"\\]|\\.)*)" on measurement '
+    r'"((?:[^"\\]|\\.)*)" is type (\w+), already exists as type (\w+)')
+_DROPPED_RE = re.compile(r'dropped=(\d+)')
+_PARTIAL_WRITE_RE = re.compile(r'^\s*partial write:?')
+
+_PARTIAL_MARKERS = ('partial write', 'unable to parse', 'field type conflict')
+
+
+def _error_message(content):
+    """Return the message of an error body, JSON encoded or not."""
+    try:
+        message = json.loads(content)['error']
+    except (ValueError, TypeError, KeyError):
+        return content
+    return message if isinstance(message, type('')) else content
+
+
+def _split_line(line):
+    """Return the unescaped measurement and the fields of a line.
+
+    The fields are a dict of the raw values by unescaped field key.
+    """
+    measurement = []
+    fields = {}
+    key = []
+    value = []
+    # 0: measurement, 1: tags, 2: field key, 3: field value, 4: timestamp
+    state = 0
+    quoted = False
+    escaped = False
+    for char in line:
+        if escaped:
+            escaped = False
+            if state == 0:
+                measurement.append(char)
+            elif state == 2:
+                key.append(char)
+            elif state == 3:
+                value.append('\\' + char)
+            continue
+        if char == '\\':
+            escaped = True
+        elif state == 3 and char == '"':
+            quoted = not quoted
+            value.append(char)
+        elif quoted:
+            value.append(char)
+        elif char == ' ':
+            if state == 3:
+                fields[''.join(key)] = ''.join(value)
+                state = 4
+            elif state < 2:
+                state = 2
+        elif state == 0:
+            if char == ',':
+                state = 1
+            else:
+                measurement.append(char)
+        elif state == 2:
+            if char == '=':
+                state = 3
+            else:
+                key.append(char)
+        elif state == 3:
+            if char == ',':
+                fields[''.join(key)] = ''.join(value)
+                key = []
+                value = []
+                state = 2
+            else:
+                value.append(char)
+    if state == 3:
+        fields[''.join(key)] = ''.join(value)
+    return ''.join(measurement), fields
+
+
+def _value_type(value):
+    """Return the InfluxDB type name of a raw field value."""
+    if value.startswith('"'):
+        return 'string'
+    if value in ('t', 'T', 'true', 'True', 'TRUE',
+                 'f', 'F', 'false', 'False', 'FALSE'):
+        return 'boolean'
+    if value.endswith('i'):
+        return 'integer'
+    if value.endswith('u'):
+        return 'unsigned'
+    return 'float'
+
+
+def _conflicting_lines(lines, field, measurement, field_type):
+    for line in lines:
+        try:
+            text = line.decode('utf-8')
+        except UnicodeDecodeError:
+            continue
+        name, fields = _split_line(text)
+        if name != measurement or field not in fields:
+            continue
+        if _value_type(fields[field]) == field_type:
+            yield line
+
+
+def parse_write_error(error, lines=()):
+    """Turn the error of a write into an InfluxDBPartialWriteError.
+
+    :param error: the error raised by the write request
+    :type error: :class:`~.InfluxDBClientError`
+    :param lines: the lines of the request body, without newline, used to
+        tell which of them failed
+    :type lines: list of bytes
+    :returns: the partial write error, or None if `error` is not about
+        some of the points being rejected
+    :rtype: :class:`~.InfluxDBPartialWriteError`
+    """
+    if error.code != 400:
+        return None
+    message = _error_message(error.content)
+    if not any(marker in message for marker in _PARTIAL_MARKERS):
+        return None
+
+    known = set(lines)
+    failures = []
+    for part in message.split('\n'):
+        match = _UNABLE_TO_PARSE_RE.search(part)
+        if match is not None:
+            line = match.group(1).encode('utf-8')
+            reason = _DROPPED_RE.sub('', match.group(2)).strip()
+            failures.append(WriteFailure(
+                line if line in known else None, reason))
+            continue
+
+        match = _TYPE_CONFLICT_RE.search(part)
+        if match is not None:
+            field, measurement, field_type, _existing = match.groups()
+            field = field.replace('\\"', '"').replace('\\\\', '\\')
+            measurement = measurement.replace('\\"', '"').replace(
+                '\\\\', '\\')
+            conflicts = list(_conflicting_lines(lines, field, measurement,
+                                                field_type))
+            reason = match.group(0)
+            failures.extend(WriteFailure(line, reason) for line in conflicts)
+            if not conflicts:
+                failures.append(WriteFailure(None, reason))
+            continue
+
+        reason = _PARTIAL_WRITE_RE.sub('', _DROPPED_RE.sub('', part))
+        if reason.strip():
+            failures.append(WriteFailure(None, reason.strip()))
+
+    match = _DROPPED_RE.search(message)
+    dropped = int(match.group(1)) if match is not None else None
+    return InfluxDBPartialWriteError(error.content, error.code, failures,
+                                     dropped)
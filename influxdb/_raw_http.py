@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""Minimal HTTP/1.1 transport of the write requests."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import base64
+import socket
+import threading
+from timeit import default_timer
+
+import requests.exceptions
+from requests.structures import CaseInsensitiveDict
+from six.moves.urllib.parse import urlencode
+
+from ._balancer import parse_host
+from ._unix_socket import SCHEME
+
+_MAX_LINE = 65536
+_MAX_HEADS = 64
+_NO_BODY = frozenset([204, 304])
+
+
+class RawResponse(object):
+    """Response of a :class:`RawHTTPWriter` request.
+
+    It has the attributes of :class:`requests.Response` the client uses,
+    plus the seconds spent sending the request, `send_time`.
+    """
+
+    __slots__ = ('status_code', 'headers', 'content', 'send_time')
+
+    def __init__(self, status_code, headers, content):
+        """Initialize a response."""
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.send_time = None
+
+    def close(self):
+        """Do nothing, the body has been read already."""
+
+
+class _Connection(object):
+    __slots__ = ('sock', 'rfile')
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.rfile = sock.makefile('rb')
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+class _ClosedConnection(Exception):
+    """The server closed a kept-alive connection before responding."""
+
+
+class RawHTTPWriter(object):
+    """Send requests with a body in memory over persistent sockets.
+
+    It takes the arguments of :meth:`requests.Session.request` the client
+    passes, so that it can stand in for the session of the write requests,
+    but skips all the per-request work of requests: the request line and
+    the headers, including the authorization, are formatted once per URL,
+    parameters and headers, and each request is sent with a single
+    ``sendall`` of the head, the ``Content-Length`` and the body. The
+    connections are kept alive, at most `pool_size` of them being kept
+    idle per host.
+
+    A request that fails on a reused connection because the server closed
+    it in the meantime is sent again on a new connection. The other errors
+    are raised as the exceptions of requests.
+
+    :param socket_module: the module providing ``create_connection`` and
+        ``socket``, e.g. :mod:`gevent.socket`, defaults to :mod:`socket`
+    :param unix_socket: path of the unix socket the requests to
+        "http+unix" URLs are sent to, defaults to None
+    :type unix_socket: str
+    :param pool_size: number of idle connections kept per host, defaults
+        to 10
+    :type pool_size: int
+    """
+
+    def __init__(self, socket_module=socket, unix_socket=None, pool_size=10):
+        """Construct a new RawHTTPWriter."""
+        self._socket = socket_module
+        self._unix_socket = unix_socket
+        self._pool_size = pool_size
+        self._idle = {}
+        self._heads = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, auth=None, params=None, data=b'',
+                headers=None, timeout=None, **kwargs):
+        """Send a request and return its :class:`RawResponse`.
+
+        `data` must be bytes; the other keyword arguments of
+        :meth:`requests.Session.request` are ignored.
+        """
+        key = (method, url, auth,
+               tuple(params.items()) if params else (),
+               tuple(headers.items()) if headers else ())
+        prepared = self._heads.get(key)
+        if prepared is None:
+            prepared = self._prepare(method, url, auth, params, headers)
+            if len(self._heads) >= _MAX_HEADS:
+                self._heads.clear()
+            self._heads[key] = prepared
+        address, head = prepared
+        message = b''.join((head, str(len(data)).encode('ascii'),
+                            b'\r\n\r\n', data))
+
+        while True:
+            conn, reused = self._checkout(address, timeout)
+            try:
+                started = default_timer()
+                conn.sock.sendall(message)
+                send_time = default_timer() - started
+                response, keep_alive = self._read_response(conn)
+                response.send_time = send_time
+            except socket.timeout as e:
+                conn.close()
+                raise requests.exceptions.ReadTimeout(e)
+            except (socket.error, _ClosedConnection) as e:
+                conn.close()
+                if reused:
+                    continue
+                raise requests.exceptions.ConnectionError(e)
+            if keep_alive:
+                self._checkin(address, conn)
+            else:
+                conn.close()
+            return response
+
+    def _prepare(self, method, url, auth, params, headers):
+        """Return the address and the head of the requests to `url`."""
+        scheme, _, rest = url.partition('://')
+        netloc, _, path = rest.partition('/')
+        if scheme == SCHEME:
+            address = self._unix_socket
+            host = 'localhost'
+        else:
+            address = parse_host(netloc, 80)
+            host = netloc
+
+        target = '/' + path
+        if params:
+            query = urlencode([(name, value)
+                               for name, value in params.items()
+                               if value is not None])
+            if query:
+                target = '{0}?{1}'.format(target, query)
+
+        lines = ['{0} {1} HTTP/1.1'.format(method, target),
+                 'Host: {0}'.format(host)]
+        if auth and auth[0] is not None:
+            credentials = '{0}:{1}'.format(*auth).encode('utf-8')
+            lines.append('Authorization: Basic {0}'.format(
+                base64.b64encode(credentials).decode('ascii')))
+        for name, value in (headers or {}).items():
+            if name.lower() not in ('host', 'content-length'):
+                lines.append('{0}: {1}'.format(name, value))
+        lines.append('Content-Length: ')
+        return address, '\r\n'.join(lines).encode('latin-1')
+
+    def _checkout(self, address, timeout):
+        """Return an idle connection to `address`, or a new one."""
+        with self._lock:
+            idle = self._idle.get(address)
+            if idle:
+                return idle.pop(), True
+
+        try:
+            if isinstance(address, tuple):
+                sock = self._socket.create_connection(address, timeout)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            else:
+                sock = self._socket.socket(socket.AF_UNIX,
+                                           socket.SOCK_STREAM)
+                sock.settimeout(timeout)
+                sock.connect(address)
+        except socket.timeout as e:
+            raise requests.exceptions.ConnectTimeout(e)
+        except socket.error as e:
+            raise requests.exceptions.ConnectionError(e)
+        return _Connection(sock), False
+
+    def _checkin(self, address, conn):
+        with self._lock:
+            idle = self._idle.setdefault(address, [])
+            if len(idle) < self._pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    @staticmethod
+    def _read_response(conn):
+        """Return the response read from `conn` and if it can be reused."""
+        rfile = conn.rfile
+        status_line = rfile.readline(_MAX_LINE)
+        if not status_line:
+            raise _ClosedConnection()
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b'HTTP/'):
+            raise socket.error("Invalid status line {0!r}".format(
+                status_line))
+        version = parts[0]
+        status_code = int(parts[1])
+
+        headers = CaseInsensitiveDict()
+        while True:
+            line = rfile.readline(_MAX_LINE)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.partition(b':')
+            headers[name.strip().decode('latin-1')] = \
+                value.strip().decode('latin-1')
+
+        keep_alive = version == b'HTTP/1.1' and \
+            headers.get('Connection', '').lower() != 'close'
+        if status_code in _NO_BODY:
+            content = b''
+        elif 'chunked' in headers.get('Transfer-Encoding', '').lower():
+            content = _read_chunked(rfile)
+        elif 'Content-Length' in headers:
+            content = rfile.read(int(headers['Content-Length']))
+        else:
+            content = rfile.read()
+            keep_alive = False
+        return RawResponse(status_code, headers, content), keep_alive
+
+    def close(self):
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+
+def _read_chunked(rfile):
+    """Return the body of a response with chunked transfer encoding."""
+    chunks = []
+    while True:
+        size = int(rfile.readline(_MAX_LINE).split(b';', 1)[0], 16)
+        if not size:
+            break
+        chunks.append(rfile.read(size))
+        rfile.readline(_MAX_LINE)
+    # skip the trailers
+    while rfile.readline(_MAX_LINE) not in (b'\r\n', b'\n', b''):
+        pass
+    return b''.join(chunks)
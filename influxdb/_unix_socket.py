@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""HTTP over a unix domain socket, for an InfluxDB on the same host."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numbers
+import socket
+
+import requests.adapters
+import urllib3.connection
+import urllib3.connectionpool
+import urllib3.exceptions
+from six.moves.urllib.parse import quote
+
+SCHEME = 'http+unix'
+
+
+def unix_socket_url(path):
+    """Return the base URL of the requests sent to the socket at `path`."""
+    return '{0}://{1}'.format(SCHEME, quote(path, safe=''))
+
+
+class UnixHTTPConnection(urllib3.connection.HTTPConnection):
+    """HTTP connection whose socket is a unix domain socket."""
+
+    def __init__(self, *args, **kwargs):
+        """Initialize a connection to the socket at `socket_path`."""
+        self.socket_path = kwargs.pop('socket_path')
+        super(UnixHTTPConnection, self).__init__(*args, **kwargs)
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, numbers.Real):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except socket.error as e:
+            sock.close()
+            raise urllib3.exceptions.NewConnectionError(
+                self, "Failed to connect to {0}: {1}".format(
+                    self.socket_path, e))
+        return sock
+
+
+class UnixHTTPConnectionPool(urllib3.connectionpool.HTTPConnectionPool):
+    """Pool of the connections to a unix domain socket."""
+
+    ConnectionCls = UnixHTTPConnection
+
+
+class UnixSocketAdapter(requests.adapters.HTTPAdapter):
+    """Transport adapter sending every request to one unix domain socket.
+
+    The host of the request URLs is ignored; the requests reach the server
+    listening on `socket_path` through a pool of keep-alive connections.
+    """
+
+    def __init__(self, socket_path, pool_maxsize=10):
+        """Initialize an adapter for the socket at `socket_path`."""
+        super(UnixSocketAdapter, self).__init__(pool_connections=1,
+                                                pool_maxsize=pool_maxsize)
+        self._socket_path = socket_path
+        self._pool = UnixHTTPConnectionPool('localhost',
+                                            maxsize=pool_maxsize,
+                                            block=False,
+                                            socket_path=socket_path)
+
+    def get_connection(self, url, proxies=None):
+        """Return the connection pool of the socket."""
+        return self._pool
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None,
+                                        cert=None):
+        """Return the connection pool of the socket."""
+        return self._pool
+
+    def request_url(self, request, proxies):
+        """Return the path of the request, proxies do not apply."""
+        return request.path_url
+
+    def close(self):
+        """Close the connections to the socket."""
+        super(UnixSocketAdapter, self).close()
+        self._pool.close()
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""Downsampling of points before they are written."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import math
+import threading
+import time
+from numbers import Integral, Real
+
+from six import iteritems
+
+from influxdb.line_protocol import (
+    _PRECISION_NS,
+    _convert_timestamp,
+    _get_series_key,
+    _static_items,
+)
+
+AGGREGATES = ('mean', 'min', 'max', 'count', 'sum', 'first', 'last')
+
+
+def _percentile(values, percent):
+    """Return the percentile of sorted values, interpolated linearly."""
+    rank = (len(values) - 1) * percent / 100.0
+    low = int(math.floor(rank))
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+class _Accumulator(object):
+    """Running aggregates of a field over a window."""
+
+    __slots__ = ('count', 'sum', 'min', 'max', 'first', 'first_time', 'last',
+                 'last_time', 'values')
+
+    def __init__(self, value, timestamp, keep_values):
+        self.count = 1
+        self.sum = value
+        self.min = value
+        self.max = value
+        self.first = value
+        self.first_time = timestamp
+        self.last = value
+        self.last_time = timestamp
+        self.values = [value] if keep_values else None
+
+    def add(self, value, timestamp):
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+        if timestamp < self.first_time:
+            self.first = value
+            self.first_time = timestamp
+        if timestamp >= self.last_time:
+            self.last = value
+            self.last_time = timestamp
+        if self.values is not None:
+            self.values.append(value)
+
+    def result(self, aggregate, percent):
+        if percent is not None:
+            self.values.sort()
+            return float(_percentile(self.values, percent))
+        if aggregate == 'count':
+            return self.count
+        if aggregate == 'mean':
+            return self.sum / self.count
+        return float(getattr(self, aggregate))
+
+
+class _Series(object):
+    """The window of a series being aggregated."""
+
+    __slots__ = ('measurement', 'tags', 'start', 'fields')
+
+    def __init__(self, measurement, tags, start):
+        self.measurement = measurement
+        self.tags = tags
+        self.start = start
+        self.fields = {}
+
+
+class Aggregator(object):
+    """Downsample points over tumbling windows before writing them.
+
+    The points given to :meth:`write_points` are not written: the numeric
+    fields of each series (measurement and tags) are aggregated over
+    windows of `interval` seconds aligned on the epoch, and one point per
+    series and window, stamped with the start of the window, is written
+    with the aggregates instead. Only the running aggregates of the
+    current window of every series are kept in memory, the values
+    themselves only when a percentile is asked for. The counts are
+    written as integers and the other aggregates as floats, whatever the
+    type of the values, so that the type of their fields never changes.
+
+    The window of a series is written when a point of the series falls in
+    a later window, once the latest time seen among all the series is
+    `grace` seconds past its end, or on :meth:`flush`. A point of a window
+    of its series already written, or ended more than `grace` seconds
+    before the latest time seen, is dropped and counted in :attr:`late`.
+
+    :param client: the client writing the aggregates
+    :type client: :class:`~.InfluxDBClient`
+    :param interval: width of the windows in seconds
+    :type interval: float
+    :param aggregates: the aggregates of every field: 'mean', 'min',
+        'max', 'count', 'sum', 'first', 'last' or a percentile such as
+        'p50' or 'p99.9', defaults to ('mean',)
+    :type aggregates: sequence of str
+    :param fields: the fields to aggregate, defaults to None (all the
+        integer and float fields). The other fields are ignored
+    :type fields: collection of str
+    :param field_format: name of the field of an aggregate, formatted with
+        `field` and `aggregate`, defaults to '{field}_{aggregate}'
+    :type field_format: str
+    :param grace: number of seconds the points may be out of order across
+        the series, defaults to 0
+    :type grace: float
+    :param database: the database to write the aggregates to, defaults to
+        the client's current database
+    :type database: str
+    :param retention_policy: the retention policy of the aggregates,
+        defaults to None
+    :type retention_policy: str
+
+    :Example:
+
+    ::
+
+        >> aggregator = Aggregator(client, interval=1,
+                                   aggregates=('mean', 'max', 'p99'))
+        >> aggregator.write_points(samples)
+        >> aggregator.flush()
+    """
+
+    def __init__(self,
+                 client,
+                 interval,
+                 aggregates=('mean',),
+                 fields=None,
+                 field_format='{field}_{aggregate}',
+                 grace=0,
+                 database=None,
+                 retention_policy=None):
+        """Construct a new Aggregator."""
+        self._interval = int(interval * _PRECISION_NS['s'])
+        if self._interval < 1:
+            raise ValueError("interval must be positive")
+        if not aggregates:
+            raise ValueError("aggregates must not be empty")
+
+        self._outputs = []
+        for aggregate in aggregates:
+            percent = None
+            if aggregate not in AGGREGATES:
+                try:
+                    percent = float(aggregate[1:])
+                except ValueError:
+                    percent = None
+                if not aggregate.startswith('p') or percent is None or \
+                        not 0 <= percent <= 100:
+                    raise ValueError(
+                        "Unknown aggregate {0!r}".format(aggregate))
+            self._outputs.append((aggregate, percent))
+        self._keep_values = any(percent is not None
+                                for _, percent in self._outputs)
+
+        self._client = client
+        self._fields = frozenset(fields) if fields is not None else None
+        self._field_format = field_format
+        self._grace = int(grace * _PRECISION_NS['s'])
+        self._database = database
+        self._retention_policy = retention_policy
+        self._series = {}
+        self._watermark = None
+        self._next_expiry = None
+        self._late = 0
+        self._lock = threading.Lock()
+
+    @property
+    def late(self):
+        """Number of points dropped for arriving too late."""
+        return self._late
+
+    def write_points(self, points, time_precision=None, tags=None):
+        """Aggregate points, writing the windows they complete.
+
+        :param points: the points, as accepted by
+            :meth:`InfluxDBClient.write_points` with the 'json' protocol.
+            Points without a time are stamped with the current time
+        :type points: iterable of dicts or :class:`~.Point`
+        :param time_precision: precision of the integer times of the dict
+            points, defaults to None (nanoseconds)
+        :type time_precision: str
+        :param tags: tags shared by all the points, defaults to None
+        :type tags: dict
+        :returns: True, if the completed windows were written
+        :rtype: bool
+        """
+        try:
+            unit = _PRECISION_NS[time_precision]
+        except KeyError:
+            raise ValueError(
+                "Invalid time precision: {0!r}".format(time_precision))
+        static_items = _static_items(tags)
+        completed = []
+        with self._lock:
+            for point in points:
+                if isinstance(point, dict):
+                    measurement = point['measurement']
+                    point_tags = point.get('tags')
+                    fields = iteritems(point['fields'])
+                    timestamp = point.get('time')
+                    if isinstance(timestamp, Integral):
+                        timestamp = int(timestamp) * unit
+                    elif timestamp is not None:
+                        timestamp = _convert_timestamp(timestamp, 'n')
+                else:
+                    measurement = point.measurement
+                    point_tags = point.tags
+                    fields = point.fields
+                    timestamp = point.timestamp
+                if timestamp is None:
+                    timestamp = int(time.time() * _PRECISION_NS['s'])
+                key = _get_series_key(measurement, tags, static_items,
+                                      point_tags)
+                self._add(key, measurement, tags, point_tags, fields,
+                          timestamp, completed)
+            self._expire(completed)
+        return self._write(completed)
+
+    def _add(self, key, measurement, tags, point_tags, fields, timestamp,
+             completed):
+        start = timestamp - timestamp % self._interval
+        if self._watermark is not None and \
+                start + self._interval <= self._watermark - self._grace:
+            self._late += 1
+            return
+        series = self._series.get(key)
+        if series is not None and start != series.start:
+            if start < series.start:
+                self._late += 1
+                return
+            completed.append(self._emit(series))
+            series = None
+        if series is None:
+            merged = dict(tags or ())
+            merged.update(point_tags or ())
+            series = self._series[key] = _Series(measurement, merged, start)
+
+        accumulators = series.fields
+        for name, value in fields:
+            if self._fields is not None and name not in self._fields:
+                continue
+            if isinstance(value, bool) or not isinstance(value, Real):
+                continue
+            accumulator = accumulators.get(name)
+            if accumulator is None:
+                accumulators[name] = _Accumulator(value, timestamp,
+                                                  self._keep_values)
+            else:
+                accumulator.add(value, timestamp)
+
+        if self._watermark is None or timestamp > self._watermark:
+            self._watermark = timestamp
+
+    def _expire(self, completed):
+        """Write the windows ended `grace` before the latest time seen."""
+        if self._watermark is None:
+            return
+        horizon = self._watermark - self._grace
+        if self._next_expiry is not None and horizon < self._next_expiry:
+            return
+        self._next_expiry = None
+        for key, series in list(self._series.items()):
+            end = series.start + self._interval
+            if end <= horizon:
+                completed.append(self._emit(series))
+                del self._series[key]
+            elif self._next_expiry is None or end < self._next_expiry:
+                self._next_expiry = end
+
+    def _emit(self, series):
+        """Return the point of the aggregates of a window."""
+        fields = {}
+        for name, accumulator in iteritems(series.fields):
+            for aggregate, percent in self._outputs:
+                fields[self._field_format.format(
+                    field=name, aggregate=aggregate)] = \
+                    accumulator.result(aggregate, percent)
+        return {'measurement': series.measurement,
+                'tags': series.tags,
+                'fields': fields,
+                'time': series.start}
+
+    def _write(self, points):
+        points = [point for point in points if point['fields']]
+        if not points:
+            return True
+        return self._client.write_points(
+            points,
+            database=self._database,
+            retention_policy=self._retention_policy)
+
+    def flush(self):
+        """Write the aggregates of all the open windows.
+
+        Meant for shutdown: the points of these windows given afterwards
+        start them again.
+
+        :returns: True, if the windows were written
+        :rtype: bool
+        """
+        with self._lock:
+            completed = [self._emit(series)
+                         for series in self._series.values()]
+            self._series.clear()
+            self._next_expiry = None
+        return self._write(completed)
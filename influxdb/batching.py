@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""Background batching of points for InfluxDBClient."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+from timeit import default_timer
+
+from six.moves import queue
+
+from influxdb.line_protocol import iter_lines
+
+log = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class _Flush(object):
+    """Ask the background task to write everything it holds."""
+
+    def __init__(self, done):
+        self.done = done
+
+
+class _Batch(object):
+    """Lines waiting to be written with the same write parameters."""
+
+    __slots__ = ('lines', 'size', 'started')
+
+    def __init__(self):
+        self.lines = []
+        self.size = 0
+        self.started = default_timer()
+
+
+class BatchingWriter(object):
+    """Group single points into batches written in the background.
+
+    Points are handed over with :meth:`submit`, which never blocks: they
+    are put on a bounded queue consumed by a background task (a greenlet
+    for a :class:`~.GeventInfluxDBClient`, a daemon thread otherwise).
+    The task groups them per database, retention policy and time precision
+    and writes a group as soon as it holds `batch_size` points,
+    `max_batch_bytes` bytes of line protocol or is `flush_interval`
+    seconds old, whichever comes first.
+
+    :param client: the client used to write the batches
+    :type client: :class:`~.InfluxDBClient`
+    :param batch_size: maximum number of points in a batch, defaults to 5000
+    :type batch_size: int
+    :param max_batch_bytes: maximum size of a batch in bytes of line
+        protocol, defaults to None (no limit)
+    :type max_batch_bytes: int
+    :param flush_interval: maximum number of seconds a point waits before
+        being written, defaults to 1
+    :type flush_interval: float
+    :param queue_size: maximum number of points waiting to be batched,
+        defaults to 10000
+    :type queue_size: int
+    :param error_callback: called with the exception and the lines (bytes
+        without the newline) of a batch that could not be written, or with
+        a list holding the point, as submitted, that could not be
+        serialized. Defaults to logging the error; an exception raised by
+        the callback is logged as well
+    :type error_callback: callable
+
+    :Example:
+
+    ::
+
+        >> writer = BatchingWriter(client, batch_size=1000)
+        >> writer.submit({'measurement': 'cpu',
+                          'time': '2009-11-10T23:00:00Z',
+                          'fields': {'value': 0.64}})
+        True
+        >> writer.close()
+
+    .. note:: points without a time are stamped by the server when their
+        batch is written, up to `flush_interval` seconds after submission.
+    """
+
+    def __init__(self,
+                 client,
+                 batch_size=5000,
+                 max_batch_bytes=None,
+                 flush_interval=1.0,
+                 queue_size=10000,
+                 error_callback=None):
+        """Construct a new BatchingWriter and start its background task."""
+        if batch_size is None or batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        if max_batch_bytes is not None and max_batch_bytes < 1:
+            raise ValueError("max_batch_bytes must be a positive integer")
+
+        self._client = client
+        self._batch_size = batch_size
+        self._max_batch_bytes = max_batch_bytes
+        self._flush_interval = flush_interval
+        self._error_callback = error_callback
+        self._queue = client._make_queue(queue_size)
+        self._batches = {}
+        self._dropped = 0
+        self._closed = False
+        self._task = client._spawn(self._run)
+
+    @property
+    def dropped(self):
+        """Number of points rejected because the queue was full."""
+        return self._dropped
+
+    def submit(self, point, database=None, retention_policy=None,
+               time_precision=None):
+        """Queue a point to be written, without blocking.
+
+        :param point: the point to write, as accepted by
+            :meth:`InfluxDBClient.write_points`
+        :type point: dict
+        :param database: the database to write the point to, defaults to the
+            client's current database
+        :type database: str
+        :param retention_policy: the retention policy for the point,
+            defaults to None
+        :type retention_policy: str
+        :param time_precision: precision of the point's time, defaults to
+            None
+        :type time_precision: str
+        :returns: True if the point was queued, False if the queue was full
+            and the point was dropped
+        :rtype: bool
+        """
+        if self._closed:
+            raise ValueError("submit() called on a closed BatchingWriter")
+
+        key = (database or self._client._database, retention_policy,
+               time_precision)
+        try:
+            self._queue.put_nowait((key, point))
+        except queue.Full:
+            self._dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout=None):
+        """Write all the queued points and wait until it is done.
+
+        :param timeout: maximum number of seconds to wait, defaults to None
+        :type timeout: float
+        :raises ValueError: if the writer is closed
+        """
+        if self._closed:
+            raise ValueError("flush() called on a closed BatchingWriter")
+
+        done = self._client._make_queue(1)
+        self._queue.put(_Flush(done))
+        done.get(timeout=timeout)
+
+    def close(self, timeout=None):
+        """Write all the queued points and stop the background task.
+
+        :param timeout: maximum number of seconds to wait, defaults to None
+        :type timeout: float
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._task.join(timeout)
+
+    def __enter__(self):
+        """Enter the runtime context of the writer."""
+        return self
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        """Close the writer, writing everything still queued."""
+        self.close()
+
+    def _next_timeout(self):
+        if not self._batches:
+            return None
+        oldest = min(batch.started for batch in self._batches.values())
+        return max(0, oldest + self._flush_interval - default_timer())
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self._next_timeout())
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write_all()
+                return
+            elif isinstance(item, _Flush):
+                self._write_all()
+                item.done.put(True)
+            elif item is not None:
+                self._add(*item)
+
+            self._write_expired()
+
+    def _add(self, key, point):
+        try:
+            line = b''.join(iter_lines({'points': [point]}, key[2]))
+        except Exception as e:
+            self._report(e, [point])
+            return
+        size = len(line)
+
+        batch = self._batches.get(key)
+        if batch is not None and self._max_batch_bytes is not None:
+            if batch.size + size > self._max_batch_bytes:
+                self._write(key)
+                batch = None
+        if batch is None:
+            batch = self._batches[key] = _Batch()
+
+        batch.lines.append(line[:-1])
+        batch.size += size
+        if len(batch.lines) >= self._batch_size:
+            self._write(key)
+
+    def _write_expired(self):
+        now = default_timer()
+        for key, batch in list(self._batches.items()):
+            if now - batch.started >= self._flush_interval:
+                self._write(key)
+
+    def _write_all(self):
+        for key in list(self._batches):
+            self._write(key)
+
+    def _write(self, key):
+        batch = self._batches.pop(key)
+        database, retention_policy, time_precision = key
+        try:
+            self._client._write_points(points=batch.lines,
+                                       time_precision=time_precision,
+                                       database=database,
+                                       retention_policy=retention_policy,
+                                       tags=None,
+                                       protocol='line')
+        except Exception as e:
+            self._report(e, batch.lines)
+
+    def _report(self, error, lines):
+        if self._error_callback is not None:
+            try:
+                self._error_callback(error, lines)
+            except Exception:
+                log.exception("BatchingWriter error callback failed")
+        else:
+            log.error("BatchingWriter failed to write %d point(s): %s",
+                      len(lines), error)
@@ -8,13 +8,34 @@ from __future__ import unicode_literals
 
 from sys import version_info
 
+import errno
 import json
+import logging
 import socket
+import threading
+import time
+import zlib
+from itertools import islice
+from timeit import default_timer
 import requests
+import requests.adapters
 import requests.exceptions
-
-from influxdb.line_protocol import make_lines, quote_ident, quote_literal
+from six import string_types
+from six.moves import queue
+
+from influxdb._balancer import Endpoint, HostPool, base_url, is_read_query
+from influxdb._balancer import parse_host
+from influxdb._partial_write import parse_write_error
+from influxdb._raw_http import RawHTTPWriter
+from influxdb._unix_socket import SCHEME, UnixSocketAdapter, unix_socket_url
+from influxdb.hooks import HOOK_EVENTS, RequestInfo
+from influxdb.line_protocol import _series_order, coalesce_lines, iter_lines
+from influxdb.line_protocol import quote_ident, quote_literal
 from influxdb.resultset import ResultSet
+from influxdb.retry import RetryPolicy
+from influxdb.spool import WriteSpool
+from influxdb.stats import ClientStats
+from .exceptions import InfluxDBBatchError
 from .exceptions import InfluxDBClientError
 from .exceptions import InfluxDBServerError
 
@@ -23,9 +44,23 @@ try:
 except NameError:
     xrange = range
 
+log = logging.getLogger(__name__)
+
+# size of the pieces a request body is compressed and streamed in
+_CHUNK_SIZE = 64 * 1024
+
+_STOP = object()
+
+# largest payload of a UDP datagram over IPv4
+_MAX_UDP_PAYLOAD = 65507
+
+# responses after which a host is ejected until it answers a ping again
+_UNAVAILABLE = frozenset([502, 503, 504])
+
 if version_info[0] == 3:
-    from urllib.parse import urlparse
+    from urllib.parse import unquote, urlparse
 else:
+    from urllib import unquote
     from urlparse import urlparse
 
 
@@ -56,16 +91,90 @@ class InfluxDBClient(object):
         establish a connection, defaults to None
     :type timeout: int
     :param retries: number of retries your client will try before aborting,
-        defaults to 3. 0 indicates try until success
+        defaults to 3. 0 indicates try until success. Ignored by the
+        requests that have a retry policy
     :type retries: int
     :param use_udp: use UDP to connect to InfluxDB, defaults to False
     :type use_udp: bool
     :param udp_port: UDP port to connect to InfluxDB, defaults to 4444
     :type udp_port: int
+    :param udp_payload_size: maximum size of the UDP datagrams, the points
+        being split at line boundaries. The default of 1400 bytes avoids IP
+        fragmentation on Ethernet networks
+    :type udp_payload_size: int
     :param proxies: HTTP(S) proxy to use for Requests, defaults to {}
     :type proxies: dict
+    :param pool_size: number of HTTP connections kept open for reuse,
+        should be at least the `concurrency` used with
+        :meth:`write_points`, defaults to 10
+    :type pool_size: int
+    :param gzip: compress the body of write requests with gzip, defaults to
+        False
+    :type gzip: bool
+    :param compression_level: gzip compression level from 1 (fastest) to 9
+        (smallest), setting it enables `gzip`, defaults to None which uses
+        zlib's default level
+    :type compression_level: int
+    :param spool: spool the writes that fail because the server cannot be
+        reached and replay them in the background once it is back, either
+        a :class:`~.WriteSpool` or the directory of a new one, defaults to
+        None. The spool is closed with the client
+    :type spool: :class:`~.WriteSpool` or str
+    :param write_retry_policy: when and how often to retry write requests,
+        defaults to None (retry connection errors up to `retries` times)
+    :type write_retry_policy: :class:`~.RetryPolicy`
+    :param query_retry_policy: when and how often to retry queries, defaults
+        to None (retry connection errors up to `retries` times)
+    :type query_retry_policy: :class:`~.RetryPolicy`
+    :param partial_writes: what to do when the server rejects some of the
+        points of a write: 'raise' an :class:`~.InfluxDBPartialWriteError`
+        listing them, 'drop' them and send the other lines again, or a
+        callable receiving the list of :class:`~.WriteFailure` to
+        quarantine them before the other lines are sent again. The lines
+        are only sent again when every failure could be traced back to a
+        line, defaults to 'raise'
+    :type partial_writes: str or callable
+    :param hosts: the hosts to send the read queries (SELECT and SHOW
+        statements) to, as "host:port" strings or (host, port) tuples,
+        replacing `host` and `port`, defaults to None
+    :type hosts: list
+    :param write_hosts: the hosts to send the writes and the other requests
+        to, defaults to None (the same as `hosts`)
+    :type write_hosts: list
+    :param load_balancing: how a host is picked for each request among
+        several, either 'round_robin' or 'least_outstanding' (the host with
+        the fewest requests in flight), defaults to 'round_robin'
+    :type load_balancing: str
+    :param health_check_interval: number of seconds between two pings of
+        every host, when there are several. A host is ejected when a
+        request to it fails or it does not answer a ping, and readmitted
+        once it answers a ping, defaults to 10
+    :type health_check_interval: float
+    :param unix_socket: path of the unix domain socket InfluxDB serves HTTP
+        on, replacing `host` and `port` to spare the local requests the TCP
+        stack, defaults to None
+    :type unix_socket: str
+    :param fast_writes: send the write requests whose body is in memory
+        over a minimal HTTP/1.1 transport of persistent sockets, with the
+        request head formatted once, instead of requests. It saves most of
+        the CPU time of small writes; the queries and the other requests
+        still go through requests. Not available with `ssl` or `proxies`,
+        defaults to False
+    :type fast_writes: bool
+    :param sort_by_series: send the lines of every write request grouped
+        by series, each series in time order, which the server's cache and
+        storage engine ingest faster than interleaved series. The points of
+        a request are all serialized before it is sent, defaults to False
+    :type sort_by_series: bool
+    :param stats: record the timings and counters of the work of the
+        client, read from :attr:`stats`, either a :class:`~.ClientStats` or
+        True for a new one, defaults to None
+    :type stats: :class:`~.ClientStats` or bool
     """
 
+    # module providing the sockets of the fast writes
+    _socket_module = socket
+
     def __init__(self,
                  host='localhost',
                  port=8086,
@@ -78,9 +187,32 @@ class InfluxDBClient(object):
                  retries=3,
                  use_udp=False,
                  udp_port=4444,
+                 udp_payload_size=1400,
                  proxies=None,
+                 gzip=False,
+                 compression_level=None,
+                 pool_size=10,
+                 spool=None,
+                 write_retry_policy=None,
+                 query_retry_policy=None,
+                 partial_writes='raise',
+                 hosts=None,
+                 write_hosts=None,
+                 load_balancing='round_robin',
+                 health_check_interval=10.0,
+                 unix_socket=None,
+                 fast_writes=False,
+                 sort_by_series=False,
+                 stats=None,
                  ):
         """Construct a new InfluxDBClient object."""
+        if unix_socket and (hosts or write_hosts or ssl):
+            raise ValueError("unix_socket cannot be used with hosts, "
+                             "write_hosts or ssl")
+        if fast_writes and (ssl or proxies):
+            raise ValueError("fast_writes cannot be used with ssl or proxies")
+        if hosts:
+            host, port = parse_host(hosts[0])
         self.__host = host
         self.__port = int(port)
         self._username = username
@@ -88,12 +220,45 @@ class InfluxDBClient(object):
         self._database = database
         self._timeout = timeout
         self._retries = retries
+        self._retry_policy = RetryPolicy(attempts=retries)
+        self._write_retry_policy = write_retry_policy or self._retry_policy
+        self._query_retry_policy = query_retry_policy or self._retry_policy
+
+        if partial_writes not in ('raise', 'drop') and \
+                not callable(partial_writes):
+            raise ValueError("partial_writes must be 'raise', 'drop' or a "
+                             "callable")
+        self._partial_writes = partial_writes
+        self._sort_by_series = sort_by_series
+        self._before_request_hooks = ()
+        self._after_response_hooks = ()
 
         self._verify_ssl = verify_ssl
 
+        self._gzip = gzip or compression_level is not None
+        if compression_level is None:
+            compression_level = zlib.Z_DEFAULT_COMPRESSION
+        self._compression_level = compression_level
+
         self.__use_udp = use_udp
         self.__udp_port = udp_port
+        self._udp_payload_size = min(udp_payload_size, _MAX_UDP_PAYLOAD)
+        self._udp_connected = False
+        self._udp_stats = dict.fromkeys(
+            ('datagrams', 'bytes', 'dropped_lines', 'send_errors'), 0)
         self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._unix_socket = unix_socket
+        if unix_socket:
+            self._session.mount(
+                SCHEME + '://',
+                UnixSocketAdapter(unix_socket, pool_maxsize=pool_size))
+        self._raw_writer = None
+        if fast_writes:
+            self._raw_writer = RawHTTPWriter(self._socket_module,
+                                             unix_socket, pool_size)
         if use_udp:
             self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
@@ -107,16 +272,92 @@ class InfluxDBClient(object):
         else:
             self._proxies = proxies
 
-        self.__baseurl = "{0}://{1}:{2}".format(
-            self._scheme,
-            self._host,
-            self._port)
+        if unix_socket:
+            self.__baseurl = unix_socket_url(unix_socket)
+        else:
+            self.__baseurl = base_url(self._scheme, self._host, self._port)
+
+        self._read_hosts = self._write_hosts = None
+        self._health_task = None
+        if hosts or write_hosts:
+            self._setup_hosts(hosts or [(host, port)],
+                              write_hosts or hosts or [(host, port)],
+                              load_balancing, health_check_interval)
 
         self._headers = {
             'Content-type': 'application/json',
             'Accept': 'text/plain'
         }
 
+        if stats is True:
+            stats = ClientStats()
+        self._stats = stats or None
+        self._stats_task = None
+        if self._stats is not None and self._stats.export_interval:
+            self._stats_wakeup = self._make_queue()
+            self._stats_task = self._spawn(self._export_stats)
+
+        if isinstance(spool, string_types):
+            spool = WriteSpool(spool)
+        self._spool = spool
+        if spool is not None:
+            self._spool_wakeup = self._make_queue()
+            if spool.pending_bytes:
+                # left over by a previous process
+                self._spool_wakeup.put(True)
+            self._spool_task = self._spawn(self._replay_spool)
+
+    def _setup_hosts(self, hosts, write_hosts, load_balancing,
+                     health_check_interval):
+        endpoints = {}
+
+        def get_endpoints(names):
+            result = []
+            for name in names:
+                url = base_url(self._scheme, *parse_host(name))
+                if url not in endpoints:
+                    endpoints[url] = Endpoint(url)
+                if endpoints[url] not in result:
+                    result.append(endpoints[url])
+            return result
+
+        self._read_hosts = HostPool(get_endpoints(hosts), load_balancing)
+        self._write_hosts = HostPool(get_endpoints(write_hosts),
+                                     load_balancing)
+        self._endpoints = list(endpoints.values())
+        if len(self._endpoints) > 1 and health_check_interval:
+            self._health_check_interval = health_check_interval
+            self._health_wakeup = self._make_queue()
+            self._health_task = self._spawn(self._check_health)
+
+    def _check_health(self):
+        """Ping every host periodically, ejecting the failing ones."""
+        while True:
+            try:
+                item = self._health_wakeup.get(
+                    timeout=self._health_check_interval)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                return
+            for endpoint in self._endpoints:
+                endpoint.healthy = self._probe(endpoint.url)
+
+    def _probe(self, baseurl):
+        """Tell whether the host at `baseurl` answers a ping."""
+        try:
+            response = self._session.request(
+                method='GET',
+                url="{0}/ping".format(baseurl),
+                auth=(self._username, self._password),
+                proxies=self._proxies,
+                verify=self._verify_ssl,
+                timeout=self._timeout or self._health_check_interval
+            )
+        except requests.exceptions.RequestException:
+            return False
+        return response.status_code == 204
+
     @property
     def _baseurl(self):
         return self.__baseurl
@@ -137,14 +378,43 @@ class InfluxDBClient(object):
     def _use_udp(self):
         return self.__use_udp
 
+    @property
+    def stats(self):
+        """The :class:`~.ClientStats` of the client, None if not recorded."""
+        return self._stats
+
+    def _export_stats(self):
+        """Export the stats periodically."""
+        while True:
+            try:
+                item = self._stats_wakeup.get(
+                    timeout=self._stats.export_interval)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                return
+            self._stats.export()
+
+    @property
+    def udp_stats(self):
+        """Counters of the UDP writes.
+
+        A dict of the number of `datagrams` and `bytes` sent, of the lines
+        not delivered (`dropped_lines`), either larger than the largest UDP
+        datagram or in a datagram the network refused, and of the failed
+        sends (`send_errors`).
+        """
+        return dict(self._udp_stats)
+
     @classmethod
     def from_dsn(cls, dsn, **kwargs):
         r"""Generate an instance of InfluxDBClient from given data source name.
 
         Return an instance of :class:`~.InfluxDBClient` from the provided
-        data source name. Supported schemes are "influxdb", "https+influxdb"
-        and "udp+influxdb". Parameters for the :class:`~.InfluxDBClient`
-        constructor may also be passed to this method.
+        data source name. Supported schemes are "influxdb", "https+influxdb",
+        "udp+influxdb" and "unix+influxdb". Parameters for the
+        :class:`~.InfluxDBClient` constructor may also be passed to this
+        method.
 
         :param dsn: data source name
         :type dsn: string
@@ -166,14 +436,22 @@ class InfluxDBClient(object):
             http://localhost:8086 - True 159
 
         .. note:: parameters provided in `**kwargs` may override dsn parameters
+        .. note:: several hosts may be given, separated by commas, e.g.
+            "influxdb://host1:8086,host2:8086/databasename"; they are used
+            as the `hosts` of the client.
         .. note:: when using "udp+influxdb" the specified port (if any) will
             be used for the TCP connection; specify the UDP port with the
             additional `udp_port` parameter (cf. examples).
+        .. note:: with "unix+influxdb" the host is the percent-encoded path
+            of the unix socket, e.g.
+            "unix+influxdb://%2Fvar%2Frun%2Finfluxdb.sock/databasename".
         """
         init_args = _parse_dsn(dsn)
-        host, port = init_args.pop('hosts')[0]
-        init_args['host'] = host
-        init_args['port'] = port
+        hosts = init_args.pop('hosts')
+        if 'unix_socket' not in init_args:
+            init_args['host'], init_args['port'] = hosts[0]
+        if len(hosts) > 1:
+            init_args['hosts'] = hosts
         init_args.update(kwargs)
 
         return cls(**init_args)
@@ -198,7 +476,7 @@ class InfluxDBClient(object):
         self._password = password
 
     def request(self, url, method='GET', params=None, data=None,
-                expected_response_code=200, headers=None):
+                expected_response_code=200, headers=None, retry_policy=None):
         """Make a HTTP request to the InfluxDB API.
 
         :param url: the path of the HTTP request, e.g. write, query, etc.
@@ -214,6 +492,9 @@ class InfluxDBClient(object):
         :type expected_response_code: int
         :param headers: headers to add to the request
         :type headers: dict
+        :param retry_policy: when and how often to retry the request,
+            defaults to None (retry connection errors up to `retries` times)
+        :type retry_policy: :class:`~.RetryPolicy`
         :returns: the response from the request
         :rtype: :class:`requests.Response`
         :raises InfluxDBServerError: if the response code is any server error
@@ -221,7 +502,14 @@ class InfluxDBClient(object):
         :raises InfluxDBClientError: if the response code is not the
             same as `expected_response_code` and is not a server error code
         """
-        url = "{0}/{1}".format(self._baseurl, url)
+        path = url
+        url = "{0}/{1}".format(self._baseurl, path)
+        hosts = None
+        if self._read_hosts is not None:
+            if path == 'query' and is_read_query(params and params.get('q')):
+                hosts = self._read_hosts
+            else:
+                hosts = self._write_hosts
 
         if headers is None:
             headers = self._headers
@@ -232,12 +520,36 @@ class InfluxDBClient(object):
         if isinstance(data, (dict, list)):
             data = json.dumps(data)
 
+        if retry_policy is None:
+            retry_policy = self._retry_policy
+
+        session = self._session
+        if self._raw_writer is not None and path == 'write' and \
+                isinstance(data, bytes):
+            session = self._raw_writer
+        stats = self._stats
+        before_hooks = self._before_request_hooks
+        after_hooks = self._after_response_hooks
+        hooked = before_hooks or after_hooks
+
         # Try to send the request more than once by default (see #103)
-        retry = True
+        started = default_timer()
         _try = 0
-        while retry:
+        while True:
+            _try += 1
+            error = response = None
+            if hosts is not None:
+                endpoint = hosts.acquire()
+                url = "{0}/{1}".format(endpoint.url, path)
+            if stats is not None:
+                stats.request_started()
+                attempt_started = default_timer()
+            if hooked:
+                info = RequestInfo(method, path, url, params, data, _try,
+                                   default_timer())
+                _call_hooks(before_hooks, info)
             try:
-                response = self._session.request(
+                response = session.request(
                     method=method,
                     url=url,
                     auth=(self._username, self._password),
@@ -248,15 +560,46 @@ class InfluxDBClient(object):
                     verify=self._verify_ssl,
                     timeout=self._timeout
                 )
+            except requests.exceptions.RequestException as e:
+                error = e
+            finally:
+                if hosts is not None:
+                    status = getattr(response, 'status_code', None)
+                    failed = error is not None or status in _UNAVAILABLE
+                    hosts.release(endpoint, failed)
+                if stats is not None:
+                    self._record_attempt(stats, path, attempt_started,
+                                         response)
+                if after_hooks:
+                    info.finish(response, error, default_timer())
+                    _call_hooks(after_hooks, info)
+
+            if getattr(data, 'consumed', False):
+                # a streamed body cannot be sent a second time
+                delay = None
+            elif error is None and \
+                    response.status_code not in retry_policy.status_forcelist:
+                delay = None
+            else:
+                delay = retry_policy.delay(_try, default_timer() - started,
+                                           error, response)
+            if delay is None:
+                if error is not None:
+                    if stats is not None:
+                        stats.count('failures')
+                    raise error
                 break
-            except requests.exceptions.ConnectionError:
-                _try += 1
-                if self._retries != 0:
-                    retry = _try < self._retries
 
-        else:
-            raise requests.exceptions.ConnectionError
+            if stats is not None:
+                stats.count('retries')
+            if response is not None:
+                response.close()
+            if delay:
+                self._sleep(delay)
 
+        if stats is not None and \
+                response.status_code != expected_response_code:
+            stats.count('failures')
         if 500 <= response.status_code < 600:
             raise InfluxDBServerError(response.content)
         elif response.status_code == expected_response_code:
@@ -264,13 +607,69 @@ class InfluxDBClient(object):
         else:
             raise InfluxDBClientError(response.content, response.status_code)
 
+    def add_hook(self, event, hook):
+        """Call a function around every attempt of every request.
+
+        The hooks are given a :class:`~influxdb.hooks.RequestInfo` holding
+        the method, path, parameters, query text, attempt number and body
+        size of the request and, after the response, its status, size and
+        duration or the error raised. The exceptions they raise are logged
+        and ignored. Without hooks, requests pay for a single check.
+
+        :param event: 'before_request', to call `hook` before each attempt,
+            or 'after_response', to call it once the attempt is over
+        :type event: str
+        :param hook: the function to call
+        :type hook: callable
+        """
+        if event not in HOOK_EVENTS:
+            raise ValueError("event must be one of {0}".format(
+                ', '.join(repr(e) for e in HOOK_EVENTS)))
+        name = '_{0}_hooks'.format(event)
+        # replaced rather than appended to, so that the requests in flight
+        # keep the hooks they started with
+        setattr(self, name, getattr(self, name) + (hook,))
+
+    def remove_hook(self, event, hook):
+        """Stop calling a function added with :meth:`add_hook`.
+
+        :param event: the event the hook was added for
+        :type event: str
+        :param hook: the function to stop calling
+        :type hook: callable
+        :raises ValueError: if `hook` was not added for `event`
+        """
+        if event not in HOOK_EVENTS:
+            raise ValueError("event must be one of {0}".format(
+                ', '.join(repr(e) for e in HOOK_EVENTS)))
+        name = '_{0}_hooks'.format(event)
+        hooks = list(getattr(self, name))
+        hooks.remove(hook)
+        setattr(self, name, tuple(hooks))
+
+    @staticmethod
+    def _record_attempt(stats, path, started, response):
+        elapsed = default_timer() - started
+        stats.request_finished(path, elapsed)
+        stats.count('requests')
+        send_time = getattr(response, 'send_time', None)
+        if send_time is None:
+            stats.add_time('server', elapsed)
+        else:
+            stats.add_time('send', send_time)
+            stats.add_time('server', elapsed - send_time)
+
     def write(self, data, params=None, expected_response_code=204,
               protocol='json'):
         """Write data to InfluxDB.
 
-        :param data: the data to be written
+        :param data: the data to be written. When the points (or lines) are
+            given as an iterator rather than a sequence, they are serialized
+            lazily and streamed with chunked transfer encoding; such a
+            request is not retried once its body has been sent
         :type data: (if protocol is 'json') dict
-                    (if protocol is 'line') sequence of line protocol strings
+                    (if protocol is 'line') iterable of line protocol
+                                            strings or UTF-8 encoded bytes
         :param params: additional parameters for the request, defaults to None
         :type params: dict
         :param expected_response_code: the expected response code of the write
@@ -280,19 +679,95 @@ class InfluxDBClient(object):
         :type protocol: str
         :returns: True, if the write operation is successful
         :rtype: bool
-        """
-        headers = self._headers
-        headers['Content-type'] = 'application/octet-stream'
 
+        .. note:: with a spool, the body of a request is serialized in full
+            before being sent, so that it can be spooled if the server is
+            unreachable. While the spool holds data, new writes are appended
+            to it rather than sent, keeping them in order.
+        """
         if params:
             precision = params.get('precision')
         else:
             precision = None
 
+        if self._stats is not None:
+            started = default_timer()
         if protocol == 'json':
-            data = make_lines(data, precision).encode('utf-8')
+            if hasattr(data['points'], '__len__'):
+                data = b''.join(iter_lines(data, precision)) or b'\n'
+            else:
+                data = _StreamBody(iter_lines(data, precision))
         elif protocol == 'line':
-            data = ('\n'.join(data) + '\n').encode('utf-8')
+            if hasattr(data, '__len__'):
+                data = _join_lines(data)
+            else:
+                data = _StreamBody(_encode_lines(data))
+        if self._stats is not None and isinstance(data, bytes):
+            self._stats.add_time('serialize', default_timer() - started)
+
+        if self._spool is not None:
+            if isinstance(data, _StreamBody):
+                data = b''.join(data)
+            if self._spool.pending_bytes:
+                self._spool_write(data, params)
+                return True
+
+        try:
+            self._send_write(data, params, expected_response_code)
+        except requests.exceptions.ConnectionError:
+            if self._spool is None:
+                raise
+            self._spool_write(data, params)
+        return True
+
+    def _send_write(self, data, params, expected_response_code=204):
+        try:
+            self._post_write(data, params, expected_response_code)
+        except InfluxDBClientError as e:
+            remaining = self._handle_partial_write(e, data)
+            if remaining is None:
+                raise
+            if remaining:
+                self._post_write(remaining, params, expected_response_code)
+
+    def _handle_partial_write(self, error, data):
+        """Return the lines to send again after a partial write.
+
+        Returns None when `error` is not a partial write, raises it as an
+        InfluxDBPartialWriteError when the lines are not to be sent again.
+        """
+        lines = data.split(b'\n') if isinstance(data, bytes) else []
+        partial = parse_write_error(error, lines)
+        if partial is None:
+            return None
+
+        failed = set(failure.line for failure in partial.failures)
+        if self._partial_writes == 'raise' or not lines or None in failed:
+            raise partial
+
+        if self._partial_writes == 'drop':
+            log.warning("Dropped %d point(s) rejected by the server: %s",
+                        len(partial.failures), partial.content)
+        else:
+            self._partial_writes(partial.failures)
+        return b''.join(line + b'\n' for line in lines
+                        if line and line not in failed)
+
+    def _post_write(self, data, params, expected_response_code):
+        headers = dict(self._headers)
+        headers['Content-type'] = 'application/octet-stream'
+
+        stats = self._stats
+        if stats is not None:
+            points = data.count(b'\n') if isinstance(data, bytes) else None
+
+        if self._gzip:
+            headers['Content-Encoding'] = 'gzip'
+            # the fast writes send a body of known length
+            at_once = self._raw_writer is not None and isinstance(data, bytes)
+            data = _GzipBody(data, self._compression_level, stats=stats)
+            if at_once:
+                data = b''.join(data)
 
         self.request(
             url="write",
@@ -300,9 +775,77 @@ class InfluxDBClient(object):
             params=params,
             data=data,
             expected_response_code=expected_response_code,
-            headers=headers
+            headers=headers,
+            retry_policy=self._write_retry_policy
         )
-        return True
+
+        if stats is not None:
+            if points is None:
+                points = data.lines
+            stats.count('points', points)
+            if isinstance(data, bytes):
+                stats.count('bytes', len(data))
+            elif isinstance(data, _GzipBody) and data.size is not None:
+                stats.count('bytes', data.size)
+
+    def _spool_write(self, data, params):
+        if not self._spool.append(data, params):
+            log.error("Dropped a write of %d bytes larger than the spool",
+                      len(data))
+        self._spool_wakeup.put(True)
+
+    def _replay_spool(self):
+        """Write the spooled data whenever the server can be reached."""
+        timeout = None
+        while True:
+            try:
+                item = self._spool_wakeup.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            while item is not _STOP:
+                try:
+                    item = self._spool_wakeup.get_nowait()
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                return
+
+            timeout = None
+            if not self._spool.pending_bytes:
+                continue
+            try:
+                self.ping()
+                self._drain_spool()
+            except (requests.exceptions.RequestException,
+                    InfluxDBServerError, InfluxDBClientError) as e:
+                log.debug("Spool replay postponed: %s", e)
+                timeout = self._spool.retry_interval
+
+    def _drain_spool(self):
+        while True:
+            batch = self._spool.read()
+            if batch is None:
+                return
+            params, data, position = batch
+            try:
+                self._send_write(data, params)
+            except InfluxDBClientError as e:
+                # the server rejected the data, sending it again won't help
+                log.error("Dropped %d spooled bytes: %s", len(data), e)
+            self._spool.commit(position)
+
+    def ping(self):
+        """Check the connectivity to InfluxDB.
+
+        :returns: the version of the InfluxDB server
+        :rtype: str
+        """
+        response = self.request(
+            url="ping",
+            method='GET',
+            expected_response_code=204
+        )
+        return response.headers.get('X-Influxdb-Version')
 
     @staticmethod
     def _read_chunked_response(response, raise_errors=True):
@@ -382,19 +925,25 @@ class InfluxDBClient(object):
             method='GET',
             params=params,
             data=None,
-            expected_response_code=expected_response_code
+            expected_response_code=expected_response_code,
+            retry_policy=self._query_retry_policy
         )
 
+        if self._stats is not None:
+            started = default_timer()
         if chunked:
-            return self._read_chunked_response(response)
-
-        data = response.json()
-
-        results = [
-            ResultSet(result, raise_errors=raise_errors)
-            for result
-            in data.get('results', [])
-        ]
+            results = self._read_chunked_response(response)
+        else:
+            data = response.json()
+            results = [
+                ResultSet(result, raise_errors=raise_errors)
+                for result
+                in data.get('results', [])
+            ]
+        if self._stats is not None:
+            self._stats.add_time('parse', default_timer() - started)
+        if chunked:
+            return results
 
         # TODO(aviau): Always return a list. (This would be a breaking change)
         if len(results) == 1:
@@ -409,15 +958,21 @@ class InfluxDBClient(object):
                      retention_policy=None,
                      tags=None,
                      batch_size=None,
-                     protocol='json'
+                     protocol='json',
+                     max_batch_bytes=None,
+                     concurrency=None,
+                     coalesce=False
                      ):
         """Write to multiple time series names.
 
-        :param points: the list of points to be written in the database
-        :type points: list of dictionaries, each dictionary represents a point
-        :type points: (if protocol is 'json') list of dicts, where each dict
-                                            represents a point.
-                    (if protocol is 'line') sequence of line protocol strings.
+        :param points: the points to be written in the database. Any
+            iterable is accepted: a generator is consumed lazily, one batch
+            at a time with `batch_size`, or streamed in a single request
+            otherwise
+        :type points: (if protocol is 'json') iterable of dicts, where each
+                                            dict represents a point.
+                    (if protocol is 'line') iterable of line protocol
+                                            strings.
         :param time_precision: Either 's', 'm', 'ms' or 'u', defaults to None
         :type time_precision: str
         :param database: the database to write the points to. Defaults to
@@ -437,12 +992,72 @@ class InfluxDBClient(object):
         :type batch_size: int
         :param protocol: Protocol for writing data. Either 'line' or 'json'.
         :type protocol: str
+        :param max_batch_bytes: maximum size in bytes of the line protocol
+            sent in one request. The points are serialized first and the
+            batches are cut at line boundaries, a line larger than the limit
+            being sent on its own. May be combined with `batch_size`,
+            defaults to None
+        :type max_batch_bytes: int
+        :param concurrency: number of batches written at the same time,
+            from background threads (greenlets for a
+            :class:`~.GeventInfluxDBClient`). The points of the next batches
+            are serialized while the previous ones are in flight. Only used
+            with `batch_size` or `max_batch_bytes`, defaults to None
+        :type concurrency: int
+        :param coalesce: merge the points of a series that share a time into
+            a single line, the last point winning for a field they share.
+            The points are all read before the first batch is sent; only
+            for the 'json' protocol, defaults to False
+        :type coalesce: bool
         :returns: True, if the operation is successful
         :rtype: bool
+        :raises InfluxDBBatchError: with `concurrency`, once all the batches
+            have been sent, if any of them failed
 
         .. note:: if no retention policy is specified, the default retention
             policy for the database is used
         """
+        if coalesce:
+            if protocol != 'json':
+                raise ValueError("coalesce is only supported by the 'json' "
+                                 "protocol")
+            self._check_time_precision(time_precision)
+            points = [line[:-1] for line in coalesce_lines(
+                {'points': points, 'tags': tags}, time_precision)]
+            protocol = 'line'
+            tags = None
+
+        batched = (batch_size and batch_size > 0) or \
+            (max_batch_bytes and max_batch_bytes > 0)
+        if batched and concurrency and concurrency > 1:
+            return self._write_points_concurrently(
+                points=points,
+                time_precision=time_precision,
+                database=database,
+                retention_policy=retention_policy,
+                tags=tags,
+                batch_size=batch_size,
+                protocol=protocol,
+                max_batch_bytes=max_batch_bytes,
+                concurrency=concurrency)
+
+        if max_batch_bytes and max_batch_bytes > 0:
+            self._check_time_precision(time_precision)
+            if protocol == 'json':
+                lines = iter_lines({'points': points, 'tags': tags},
+                                   time_precision)
+            else:
+                lines = _encode_lines(points)
+
+            for batch in self._byte_batches(lines, max_batch_bytes,
+                                            batch_size):
+                self._write_points(points=batch,
+                                   time_precision=time_precision,
+                                   database=database,
+                                   retention_policy=retention_policy,
+                                   tags=None, protocol='line')
+            return True
+
         if batch_size and batch_size > 0:
             for batch in self._batches(points, batch_size):
                 self._write_points(points=batch,
@@ -458,18 +1073,189 @@ class InfluxDBClient(object):
                                   retention_policy=retention_policy,
                                   tags=tags, protocol=protocol)
 
+    def write_columns(self,
+                      measurement,
+                      times,
+                      fields,
+                      tags=None,
+                      time_precision=None,
+                      database=None,
+                      retention_policy=None,
+                      batch_size=None,
+                      max_batch_bytes=None,
+                      concurrency=None
+                      ):
+        """Write points held in NumPy arrays, one point per row.
+
+        The line protocol is built with vectorized NumPy operations, without
+        going through a dict per point. Integer, float, boolean and string
+        field columns are supported; NaN and infinite floats and empty
+        strings are left out of their line, and rows without any field left
+        are not written.
+
+        :param measurement: the name of the measurement
+        :type measurement: str
+        :param times: the timestamps, either integers in `time_precision` or
+            datetime64 values (UTC), or None to let the server stamp the
+            points
+        :type times: numpy.ndarray
+        :param fields: the field columns, by field name
+        :type fields: dict of numpy.ndarray
+        :param tags: the tag columns, or scalar values shared by all the
+            points, by tag name, defaults to None
+        :type tags: dict
+        :param time_precision: Either 'n', 'u', 'ms', 's', 'm' or 'h',
+            defaults to None (nanoseconds)
+        :type time_precision: str
+        :param database: the database to write the points to. Defaults to
+            the client's current database
+        :type database: str
+        :param retention_policy: the retention policy for the points. Defaults
+            to None
+        :type retention_policy: str
+        :param batch_size: see :meth:`write_points`, defaults to None
+        :type batch_size: int
+        :param max_batch_bytes: see :meth:`write_points`, defaults to None
+        :type max_batch_bytes: int
+        :param concurrency: see :meth:`write_points`, defaults to None
+        :type concurrency: int
+        :returns: True, if the operation is successful
+        :rtype: bool
+
+        :Example:
+
+        ::
+
+            >> client.write_columns(
+                'cpu',
+                times=np.array(['2009-11-10T23:00:00'],
+                               dtype='datetime64[ns]'),
+                fields={'value': np.array([0.64])},
+                tags={'host': 'server01',
+                      'core': np.array(['0'])})
+        """
+        try:
+            from ._columnar import column_lines
+        except ImportError as e:
+            raise ImportError("write_columns requires numpy which couldn't "
+                              "be imported: %s" % e)
+
+        self._check_time_precision(time_precision)
+        lines = column_lines(measurement, times, fields, tags, time_precision)
+        if not lines:
+            return True
+        return self.write_points(lines,
+                                 time_precision=time_precision,
+                                 database=database,
+                                 retention_policy=retention_policy,
+                                 batch_size=batch_size,
+                                 protocol='line',
+                                 max_batch_bytes=max_batch_bytes,
+                                 concurrency=concurrency)
+
+    @staticmethod
+    def _spawn(func, *args, **kwargs):
+        """Run `func` in the background, return a joinable handle."""
+        thread = threading.Thread(target=func, args=args, kwargs=kwargs)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _sleep(seconds):
+        """Wait between two attempts of a request."""
+        time.sleep(seconds)
+
+    @staticmethod
+    def _make_queue(maxsize=0):
+        """Return a queue usable by the tasks of :meth:`_spawn`."""
+        return queue.Queue(maxsize)
+
     @staticmethod
     def _batches(iterable, size):
-        for i in xrange(0, len(iterable), size):
-            yield iterable[i:i + size]
+        iterator = iter(iterable)
+        while True:
+            batch = list(islice(iterator, size))
+            if not batch:
+                return
+            yield batch
 
-    def _write_points(self,
-                      points,
-                      time_precision,
-                      database,
-                      retention_policy,
-                      tags,
-                      protocol='json'):
+    @staticmethod
+    def _byte_batches(lines, max_bytes, max_points=None):
+        batch = []
+        size = 0
+        for line in lines:
+            full = size + len(line) > max_bytes or len(batch) == max_points
+            if batch and full:
+                yield batch
+                batch = []
+                size = 0
+            # drop the newline, it is added back when the batch is joined
+            batch.append(line[:-1])
+            size += len(line)
+        if batch:
+            yield batch
+
+    def _write_points_concurrently(self,
+                                   points,
+                                   time_precision,
+                                   database,
+                                   retention_policy,
+                                   tags,
+                                   batch_size,
+                                   protocol,
+                                   max_batch_bytes,
+                                   concurrency):
+        self._check_time_precision(time_precision)
+        if protocol == 'json':
+            lines = iter_lines({'points': points, 'tags': tags},
+                               time_precision)
+        else:
+            lines = _encode_lines(points)
+
+        if max_batch_bytes and max_batch_bytes > 0:
+            batches = self._byte_batches(lines, max_batch_bytes, batch_size)
+        else:
+            batches = self._batches((line[:-1] for line in lines),
+                                    batch_size)
+
+        # bounded, so that serialization runs at most `concurrency`
+        # batches ahead of the requests in flight
+        pending = self._make_queue(concurrency)
+        results = []
+
+        def send_batches():
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                index, batch = item
+                try:
+                    self._write_points(points=batch,
+                                       time_precision=time_precision,
+                                       database=database,
+                                       retention_policy=retention_policy,
+                                       tags=None,
+                                       protocol='line')
+                except Exception as e:
+                    results[index] = e
+
+        workers = [self._spawn(send_batches) for _ in xrange(concurrency)]
+        try:
+            for index, batch in enumerate(batches):
+                results.append(True)
+                pending.put((index, batch))
+        finally:
+            for _ in workers:
+                pending.put(None)
+            for worker in workers:
+                worker.join()
+
+        if any(result is not True for result in results):
+            raise InfluxDBBatchError(results)
+        return True
+
+    def _check_time_precision(self, time_precision):
         if time_precision not in ['n', 'u', 'ms', 's', 'm', 'h', None]:
             raise ValueError(
                 "Invalid time precision is given. "
@@ -480,6 +1266,15 @@ class InfluxDBClient(object):
                 "InfluxDB only supports seconds precision for udp writes"
             )
 
+    def _write_points(self,
+                      points,
+                      time_precision,
+                      database,
+                      retention_policy,
+                      tags,
+                      protocol='json'):
+        self._check_time_precision(time_precision)
+
         if protocol == 'json':
             data = {
                 'points': points
@@ -490,6 +1285,19 @@ class InfluxDBClient(object):
         else:
             data = points
 
+        if self._sort_by_series:
+            if self._stats is not None:
+                started = default_timer()
+            if protocol == 'json':
+                lines = iter_lines(data, time_precision)
+            else:
+                lines = _encode_lines(data)
+            data = [line[:-1] for line in lines]
+            data.sort(key=_series_order)
+            protocol = 'line'
+            if self._stats is not None:
+                self._stats.add_time('serialize', default_timer() - started)
+
         params = {
             'db': database or self._database
         }
@@ -817,7 +1625,10 @@ class InfluxDBClient(object):
         return list(self.query(text).get_points())
 
     def send_packet(self, packet, protocol='json'):
-        """Send an UDP packet.
+        """Send points in UDP datagrams.
+
+        The lines are packed into datagrams of at most `udp_payload_size`
+        bytes; a longer line is sent in a datagram of its own.
 
         :param packet: the packet to be sent
         :type packet: (if protocol is 'json') dict
@@ -826,15 +1637,181 @@ class InfluxDBClient(object):
         :type protocol: str
         """
         if protocol == 'json':
-            data = make_lines(packet).encode('utf-8')
+            lines = iter_lines(packet)
         elif protocol == 'line':
-            data = ('\n'.join(packet) + '\n').encode('utf-8')
-        self.udp_socket.sendto(data, (self._host, self._udp_port))
+            lines = _encode_lines(packet)
+
+        if not self._udp_connected:
+            # resolve the address once, the socket remembers it
+            self.udp_socket.connect((self._host, self._udp_port))
+            self._udp_connected = True
+
+        stats = self._udp_stats
+        max_size = self._udp_payload_size
+        datagram = []
+        size = 0
+        for line in lines:
+            if size + len(line) > max_size and datagram:
+                self._send_datagram(b''.join(datagram), len(datagram))
+                datagram = []
+                size = 0
+            if len(line) > _MAX_UDP_PAYLOAD:
+                stats['dropped_lines'] += 1
+                continue
+            datagram.append(line)
+            size += len(line)
+        if datagram:
+            self._send_datagram(b''.join(datagram), len(datagram))
+
+    def _send_datagram(self, data, line_count):
+        stats = self._udp_stats
+        try:
+            self.udp_socket.send(data)
+        except socket.error as e:
+            stats['send_errors'] += 1
+            stats['dropped_lines'] += line_count
+            # an earlier datagram was refused by the destination
+            if e.errno != errno.ECONNREFUSED:
+                raise
+            return
+        stats['datagrams'] += 1
+        stats['bytes'] += len(data)
 
     def close(self):
-        """Close http session."""
+        """Close http session and the spool, if any."""
+        if self._health_task is not None:
+            self._health_wakeup.put(_STOP)
+            self._health_task.join(self._health_check_interval)
+        if self._spool is not None:
+            self._spool_wakeup.put(_STOP)
+            self._spool_task.join(self._spool.retry_interval)
+            self._spool.close()
+        if self._stats_task is not None:
+            self._stats_wakeup.put(_STOP)
+            self._stats_task.join(self._stats.export_interval)
+            self._stats.export()
         if isinstance(self._session, requests.Session):
             self._session.close()
+        if self._raw_writer is not None:
+            self._raw_writer.close()
+
+
+def _call_hooks(hooks, info):
+    for hook in hooks:
+        try:
+            hook(info)
+        except Exception:
+            log.exception("Request hook %r failed", hook)
+
+
+def _join_lines(lines):
+    """Join text or UTF-8 encoded lines into a line protocol body."""
+    return b'\n'.join(
+        line if isinstance(line, bytes) else line.encode('utf-8')
+        for line in lines) + b'\n'
+
+
+def _encode_lines(lines):
+    """Encode text or bytes lines, each followed by a newline."""
+    for line in lines:
+        if not isinstance(line, bytes):
+            line = line.encode('utf-8')
+        yield line + b'\n'
+
+
+class _StreamBody(object):
+    """Request body generated on the fly from an iterator of lines.
+
+    The lines are grouped in chunks of about `chunk_size` bytes which
+    requests sends with chunked transfer encoding, so the whole body never
+    needs to be in memory. The underlying iterator can only be consumed
+    once: `consumed` tells whether the body has been sent already, and
+    `lines` counts the lines sent so far.
+    """
+
+    def __init__(self, lines, chunk_size=_CHUNK_SIZE):
+        self._lines = lines
+        self._chunk_size = chunk_size
+        self.consumed = False
+        self.lines = 0
+
+    def __iter__(self):
+        if self.consumed:
+            raise ValueError("A streamed request body can only be sent once")
+        self.consumed = True
+
+        chunk = []
+        size = 0
+        for line in self._lines:
+            chunk.append(line)
+            size += len(line)
+            if size >= self._chunk_size:
+                self.lines += len(chunk)
+                yield b''.join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            self.lines += len(chunk)
+            yield b''.join(chunk)
+
+
+class _GzipBody(object):
+    """Request body compressed with gzip piece by piece.
+
+    Iterating over it yields the compressed stream in chunks, so the
+    compressed body is never held in memory as a whole; requests sends it
+    with chunked transfer encoding. `data` is either the uncompressed body
+    or a :class:`_StreamBody`. For the former, every iteration starts a new
+    stream, which lets a failed request be retried. With `stats`, the time
+    spent compressing each stream is recorded, and `size` holds the length
+    of the last stream once it has been read to the end.
+    """
+
+    def __init__(self, data, level, chunk_size=_CHUNK_SIZE, stats=None):
+        self._data = data
+        self._level = level
+        self._chunk_size = chunk_size
+        self._stats = stats
+        self.size = None
+
+    @property
+    def consumed(self):
+        """Whether the body is streamed and has been sent already."""
+        return getattr(self._data, 'consumed', False)
+
+    @property
+    def lines(self):
+        """Number of lines of the body."""
+        if isinstance(self._data, bytes):
+            return self._data.count(b'\n')
+        return self._data.lines
+
+    def _chunks(self):
+        if not isinstance(self._data, bytes):
+            return iter(self._data)
+        view = memoryview(self._data)
+        return (view[i:i + self._chunk_size].tobytes()
+                for i in xrange(0, len(view), self._chunk_size))
+
+    def __iter__(self):
+        compressor = zlib.compressobj(self._level, zlib.DEFLATED,
+                                      16 + zlib.MAX_WBITS)
+        elapsed = 0.0
+        size = 0
+        for chunk in self._chunks():
+            started = default_timer()
+            compressed = compressor.compress(chunk)
+            elapsed += default_timer() - started
+            if compressed:
+                size += len(compressed)
+                yield compressed
+        started = default_timer()
+        compressed = compressor.flush()
+        elapsed += default_timer() - started
+        self.size = size + len(compressed)
+        if self._stats is not None:
+            self._stats.add_time('compress', elapsed)
+        yield compressed
 
 
 def _parse_dsn(dsn):
@@ -860,6 +1837,8 @@ def _parse_dsn(dsn):
             init_args['use_udp'] = True
         elif modifier == 'https':
             init_args['ssl'] = True
+        elif modifier == 'unix':
+            return _parse_unix_dsn(conn_params)
         else:
             raise ValueError('Unknown modifier "{0}".'.format(modifier))
 
@@ -878,6 +1857,22 @@ def _parse_dsn(dsn):
     return init_args
 
 
+def _parse_unix_dsn(conn_params):
+    # parsed by hand, urlparse would lower the case of the socket path
+    credentials, _, path = conn_params.netloc.rpartition('@')
+    username, _, password = credentials.partition(':')
+    path = unquote(path)
+    if not path:
+        raise ValueError('Missing unix socket path.')
+    init_args = {'hosts': [],
+                 'unix_socket': path,
+                 'username': unquote(username) or None,
+                 'password': unquote(password) or None}
+    if conn_params.path and len(conn_params.path) > 1:
+        init_args['database'] = conn_params.path[1:]
+    return init_args
+
+
 def _parse_netloc(netloc):
     info = urlparse("http://{0}".format(netloc))
     return {'username': info.username or None,
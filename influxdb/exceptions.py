@@ -6,6 +6,8 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+from collections import namedtuple
+
 
 class InfluxDBClientError(Exception):
     """Raised when an error occurs in the request."""
@@ -27,9 +29,59 @@ class InfluxDBClientError(Exception):
         self.code = code
 
 
+class WriteFailure(namedtuple('WriteFailure', ['line', 'reason'])):
+    """A point rejected by the server and the reason it gave.
+
+    `line` is the UTF-8 encoded line of the point, without newline, or None
+    when the failure could not be traced back to a line.
+    """
+
+    __slots__ = ()
+
+
+class InfluxDBPartialWriteError(InfluxDBClientError):
+    """Raised when the server rejected some of the points of a write.
+
+    The other points of the request may have been written.
+    """
+
+    def __init__(self, content, code, failures, dropped=None):
+        """Initialize the InfluxDBPartialWriteError handler.
+
+        :param failures: the rejected points
+        :type failures: list of :class:`~.WriteFailure`
+        :param dropped: number of points the server reported as dropped,
+            if it did
+        :type dropped: int
+        """
+        super(InfluxDBPartialWriteError, self).__init__(content, code)
+        self.failures = failures
+        self.dropped = dropped
+
+
 class InfluxDBServerError(Exception):
     """Raised when a server error occurs."""
 
     def __init__(self, content):
         """Initialize the InfluxDBServerError handler."""
         super(InfluxDBServerError, self).__init__(content)
+
+
+class InfluxDBBatchError(Exception):
+    """Raised when some batches of a concurrent write failed."""
+
+    def __init__(self, results):
+        """Initialize the InfluxDBBatchError handler.
+
+        :param results: for each batch, in order, True if it was written or
+            the exception raised while writing it
+        :type results: list
+        """
+        self.results = results
+        self.errors = dict((index, result)
+                           for index, result in enumerate(results)
+                           if result is not True)
+        index, error = min(self.errors.items(), key=lambda item: item[0])
+        super(InfluxDBBatchError, self).__init__(
+            "%d of %d batches failed, batch %d: %s" % (
+                len(self.errors), len(results), index, error))
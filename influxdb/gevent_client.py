@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Gevent client for InfluxDB."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+__all__ = ['GeventInfluxDBClient']
+
+try:
+    import gevent
+except ImportError as err:
+    from .client import InfluxDBClient
+
+    class GeventInfluxDBClient(InfluxDBClient):
+        """GeventInfluxDBClient default class instantiation."""
+
+        err = err
+
+        def __init__(self, *a, **kw):
+            """Initialize the default GeventInfluxDBClient."""
+            super(GeventInfluxDBClient, self).__init__()
+            raise ImportError("GeventInfluxDBClient requires gevent "
+                              "which couldn't be imported: %s" % self.err)
+else:
+    import socket
+
+    import gevent.local
+    import gevent.lock
+    import gevent.monkey
+    import gevent.queue
+    import gevent.socket
+    import gevent.threadpool
+    import requests
+    import requests.adapters
+
+    from ._unix_socket import SCHEME, UnixSocketAdapter
+    from .client import InfluxDBClient
+    from .exceptions import InfluxDBClientError
+
+    def _socket_is_patched():
+        return gevent.monkey.is_module_patched('socket')
+
+    class _PooledSession(requests.Session):
+        """Session whose requests never block the gevent hub.
+
+        When the socket module has been monkey patched the request runs in
+        the calling greenlet; otherwise it is handed to `threadpool` so that
+        the other greenlets keep running while it waits on the network.
+        """
+
+        def __init__(self, unix_socket=None, threadpool=None):
+            super(_PooledSession, self).__init__()
+            self._threadpool = threadpool
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                    pool_maxsize=1)
+            self.mount('http://', adapter)
+            self.mount('https://', adapter)
+            if unix_socket:
+                self.mount(SCHEME + '://',
+                           UnixSocketAdapter(unix_socket, pool_maxsize=1))
+
+        def request(self, *args, **kwargs):
+            parent = super(_PooledSession, self).request
+            if _socket_is_patched():
+                return parent(*args, **kwargs)
+            # an idle ThreadPool is falsy, it has a length
+            threadpool = self._threadpool
+            if threadpool is None:
+                threadpool = gevent.get_hub().threadpool
+            return threadpool.apply(parent, args, kwargs)
+
+    class GeventInfluxDBClient(InfluxDBClient):
+        """GeventInfluxDBClient is an InfluxDBClient shared by greenlets.
+
+        Each request checks a session out of a bounded pool for the lifetime
+        of the call, so concurrent greenlets never share connection state and
+        at most ``pool_size`` HTTP connections are opened to the server.
+        Greenlets that find the pool exhausted wait cooperatively for a
+        session to be returned. Without monkey patching, the requests run in
+        a threadpool of ``pool_size`` threads of the client. UDP packets are
+        sent through a gevent socket.
+
+        It accepts all the parameters of :class:`~.InfluxDBClient` plus:
+
+        :param pool_size: maximum number of concurrent HTTP connections,
+            defaults to 10
+        :type pool_size: int
+        :param pool_timeout: number of seconds to wait for a free connection
+            before giving up, defaults to None (wait forever)
+        :type pool_timeout: float
+        """
+
+        _socket_module = gevent.socket
+
+        def __init__(self, *args, **kwargs):
+            """Construct a new GeventInfluxDBClient object."""
+            self._pool_size = int(kwargs.pop('pool_size', 10))
+            self._pool_timeout = kwargs.pop('pool_timeout', None)
+            if self._pool_size < 1:
+                raise ValueError("pool_size must be a positive integer")
+
+            self._local = gevent.local.local()
+            self._idle_sessions = gevent.queue.LifoQueue()
+            self._pool_slots = gevent.lock.BoundedSemaphore(self._pool_size)
+            # the hub's threadpool would cap the concurrency at its own size
+            self._threadpool = gevent.threadpool.ThreadPool(self._pool_size)
+
+            super(GeventInfluxDBClient, self).__init__(
+                *args, pool_size=self._pool_size, **kwargs)
+
+            if self._use_udp:
+                self.udp_socket.close()
+                self.udp_socket = gevent.socket.socket(socket.AF_INET,
+                                                       socket.SOCK_DGRAM)
+
+        @property
+        def _session(self):
+            """Session checked out by the current greenlet, if any."""
+            session = getattr(self._local, 'session', None)
+            if session is None:
+                return self._shared_session
+            return session
+
+        @_session.setter
+        def _session(self, session):
+            self._shared_session = session
+
+        @property
+        def pool_size(self):
+            """Maximum number of concurrent HTTP connections."""
+            return self._pool_size
+
+        @staticmethod
+        def _spawn(func, *args, **kwargs):
+            """Run `func` in a new greenlet."""
+            return gevent.spawn(func, *args, **kwargs)
+
+        @staticmethod
+        def _sleep(seconds):
+            """Wait cooperatively between two attempts of a request."""
+            gevent.sleep(seconds)
+
+        @staticmethod
+        def _make_queue(maxsize=0):
+            """Return a greenlet-aware queue."""
+            return gevent.queue.Queue(maxsize or None)
+
+        def _checkout(self):
+            if not self._pool_slots.acquire(timeout=self._pool_timeout):
+                raise InfluxDBClientError(
+                    "Timed out waiting for a free connection from the pool "
+                    "(pool_size={0})".format(self._pool_size))
+            try:
+                return self._idle_sessions.get_nowait()
+            except gevent.queue.Empty:
+                return _PooledSession(self._unix_socket, self._threadpool)
+
+        def _checkin(self, session):
+            self._idle_sessions.put(session)
+            self._pool_slots.release()
+
+        def _with_session(self, func, *args, **kwargs):
+            """Call `func` with a session of the pool checked out."""
+            if getattr(self._local, 'session', None) is not None:
+                # nested call from the same greenlet, reuse its session
+                return func(*args, **kwargs)
+
+            session = self._checkout()
+            self._local.session = session
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.session = None
+                self._checkin(session)
+
+        def request(self, *args, **kwargs):
+            """Make a HTTP request using a session from the pool.
+
+            Takes the same arguments as :meth:`InfluxDBClient.request`.
+            """
+            return self._with_session(
+                super(GeventInfluxDBClient, self).request, *args, **kwargs)
+
+        def _probe(self, baseurl):
+            return self._with_session(
+                super(GeventInfluxDBClient, self)._probe, baseurl)
+
+        def close(self):
+            """Close all pooled sessions, the threadpool and the UDP socket."""
+            super(GeventInfluxDBClient, self).close()
+            self._threadpool.kill()
+            while True:
+                try:
+                    self._idle_sessions.get_nowait().close()
+                except gevent.queue.Empty:
+                    break
+            if self._use_udp:
+                self.udp_socket.close()
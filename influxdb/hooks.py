@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Hooks called around the requests of a client."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+HOOK_EVENTS = ('before_request', 'after_response')
+
+
+class RequestInfo(object):
+    """An attempt of a request, as seen by the hooks.
+
+    The same object is given to the 'before_request' hooks of an attempt
+    and then to its 'after_response' hooks, which can find in `context`
+    what the former left there, e.g. a tracing span.
+
+    :ivar method: the HTTP method
+    :ivar path: the path of the endpoint, e.g. 'write' or 'query'
+    :ivar url: the URL of the request, without its parameters
+    :ivar params: the parameters of the request
+    :ivar query: the text of the query, None for the other requests
+    :ivar attempt: number of the attempt, starting at 1; the retries are
+        the attempts after the first
+    :ivar request_bytes: size of the body, None if it is streamed
+    :ivar started: :func:`timeit.default_timer` value at the start of the
+        attempt
+    :ivar elapsed: seconds the attempt took, set after the response
+    :ivar status_code: status of the response, None if there is none
+    :ivar response_bytes: size of the body of the response
+    :ivar response: the :class:`requests.Response`, None if there is none
+    :ivar error: the exception raised by the attempt, if any
+    :ivar context: a dict for the hooks to use
+    """
+
+    __slots__ = ('method', 'path', 'url', 'params', 'query', 'attempt',
+                 'request_bytes', 'started', 'elapsed', 'status_code',
+                 'response_bytes', 'response', 'error', 'context')
+
+    def __init__(self, method, path, url, params, data, attempt, started):
+        """Describe an attempt about to start."""
+        self.method = method
+        self.path = path
+        self.url = url
+        self.params = params
+        self.query = params.get('q')
+        self.attempt = attempt
+        if isinstance(data, (bytes, type(''))):
+            self.request_bytes = len(data)
+        elif data is None:
+            self.request_bytes = 0
+        else:
+            self.request_bytes = None
+        self.started = started
+        self.elapsed = None
+        self.status_code = None
+        self.response_bytes = None
+        self.response = None
+        self.error = None
+        self.context = {}
+
+    def finish(self, response, error, finished):
+        """Record the outcome of the attempt."""
+        self.elapsed = finished - self.started
+        self.response = response
+        self.error = error
+        if response is not None:
+            self.status_code = response.status_code
+            self.response_bytes = len(response.content)
+
+    def __repr__(self):
+        """Represent the attempt."""
+        return '<RequestInfo {0} {1} attempt={2} status={3}>'.format(
+            self.method, self.path, self.attempt, self.status_code)
@@ -6,6 +6,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import re
 from datetime import datetime
 from numbers import Integral
 
@@ -13,37 +14,178 @@ from pytz import UTC
 from dateutil.parser import parse
 from six import iteritems, binary_type, text_type, integer_types, PY2
 
+try:
+    from functools import lru_cache
+except ImportError:
+    from backports.functools_lru_cache import lru_cache
+
 EPOCH = UTC.localize(datetime.utcfromtimestamp(0))
 
+# maximum number of series keys kept by the serializer
+SERIES_KEY_CACHE_SIZE = 16384
+
+
+# number of nanoseconds in one unit of each time precision
+_PRECISION_NS = {
+    None: 1,
+    'n': 1,
+    'u': 10 ** 3,
+    'ms': 10 ** 6,
+    's': 10 ** 9,
+    'm': 60 * 10 ** 9,
+    'h': 3600 * 10 ** 9,
+}
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+
+# RFC3339 and the common ISO-8601 profiles: date, optional time with up to
+# nanosecond fraction, optional "Z" or numeric UTC offset
+_ISO8601_RE = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[Tt ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?)?'
+    r'\s*(?:([Zz])|([+-])(\d{2}):?(\d{2}))?$'
+)
+
+# maximum number of distinct time strings kept by the parser
+TIMESTAMP_CACHE_SIZE = 4096
+
+
+def _days_from_civil(year, month, day):
+    """Return the number of days between 1970-01-01 and the given date."""
+    # http://howardhinnant.github.io/date_algorithms.html#days_from_civil
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    year_of_era = year - era * 400
+    shifted_month = month + (9 if month <= 2 else -3)
+    day_of_year = (153 * shifted_month + 2) // 5 + day - 1
+    leap_days = year_of_era // 4 - year_of_era // 100
+    day_of_era = year_of_era * 365 + leap_days + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _days_in_month(year, month):
+    if month == 2:
+        leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+        return 29 if leap else 28
+    return 30 if month in (4, 6, 9, 11) else 31
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def _parse_timestamp(timestamp):
+    """Return the nanoseconds since the epoch of an ISO-8601 string."""
+    match = _ISO8601_RE.match(timestamp)
+    if match is None:
+        # not RFC3339, let dateutil figure out the format
+        return _datetime_to_ns(parse(timestamp))
+
+    (year, month, day, hour, minute, second, fraction,
+     utc, sign, offset_hours, offset_minutes) = match.groups()
+    year, month, day = int(year), int(month), int(day)
+    hour, minute, second = int(hour or 0), int(minute or 0), int(second or 0)
+    if not 1 <= month <= 12 or not 1 <= day <= _days_in_month(year, month):
+        raise ValueError(timestamp)
+    if hour >= 24 or minute >= 60 or second >= 60:
+        raise ValueError(timestamp)
+
+    seconds = _days_from_civil(year, month, day) * 86400
+    seconds += hour * 3600 + minute * 60 + second
+    if sign is not None:
+        offset = int(offset_hours) * 3600 + int(offset_minutes) * 60
+        seconds = seconds - offset if sign == '+' else seconds + offset
+
+    ns = seconds * 10 ** 9
+    if fraction:
+        ns += int(fraction[:9].ljust(9, '0'))
+    return ns
+
+
+def _datetime_to_ns(timestamp):
+    """Return the nanoseconds since the epoch of a datetime."""
+    if timestamp.tzinfo is None:
+        delta = timestamp - _NAIVE_EPOCH
+    else:
+        delta = timestamp - EPOCH
+    return _timedelta_to_ns(delta)
+
+
+def _timedelta_to_ns(delta):
+    us = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    # pandas.Timedelta carries the nanoseconds of a pandas.Timestamp
+    return us * 1000 + getattr(delta, 'nanoseconds', 0)
+
+
+def _ns_to_precision(ns, precision):
+    try:
+        unit = _PRECISION_NS[precision]
+    except KeyError:
+        raise ValueError("Invalid time precision: {0!r}".format(precision))
+    # truncate towards zero, like int() did on the former float results
+    if ns < 0:
+        return -(-ns // unit)
+    return ns // unit
+
 
 def _convert_timestamp(timestamp, precision=None):
     if isinstance(timestamp, Integral):
         return timestamp  # assume precision is correct if timestamp is int
 
-    if isinstance(_get_unicode(timestamp), text_type):
-        timestamp = parse(timestamp)
-
     if isinstance(timestamp, datetime):
-        if not timestamp.tzinfo:
-            timestamp = UTC.localize(timestamp)
-
-        ns = (timestamp - EPOCH).total_seconds() * 1e9
-        if precision is None or precision == 'n':
-            return ns
-        elif precision == 'u':
-            return ns / 1e3
-        elif precision == 'ms':
-            return ns / 1e6
-        elif precision == 's':
-            return ns / 1e9
-        elif precision == 'm':
-            return ns / 1e9 / 60
-        elif precision == 'h':
-            return ns / 1e9 / 3600
+        return _ns_to_precision(_datetime_to_ns(timestamp), precision)
+
+    text = _get_unicode(timestamp)
+    if isinstance(text, text_type):
+        return _ns_to_precision(_parse_timestamp(text), precision)
 
     raise ValueError(timestamp)
 
 
+def convert_timestamps(timestamps, precision=None):
+    """Convert timestamps to integers in the given precision.
+
+    Batch version of the conversion :func:`make_lines` applies to the time
+    of every point: datetimes (naive ones being UTC) and ISO-8601 / RFC3339
+    strings become the number of `precision` units since the epoch,
+    computed with integer arithmetic only. Integers are returned unchanged.
+    A NumPy datetime64 array is converted with array operations instead of
+    one timestamp at a time.
+
+    :param timestamps: the timestamps to convert
+    :type timestamps: iterable of datetime, str or int, or numpy.ndarray
+    :param precision: Either 'n', 'u', 'ms', 's', 'm' or 'h', defaults to
+        None (nanoseconds)
+    :type precision: str
+    :returns: the converted timestamps
+    :rtype: list of int
+    """
+    if precision not in _PRECISION_NS:
+        raise ValueError("Invalid time precision: {0!r}".format(precision))
+
+    dtype = getattr(timestamps, 'dtype', None)
+    if dtype is not None and dtype.kind == 'M':
+        from ._columnar import datetime64_to_precision
+        return datetime64_to_precision(timestamps, precision).tolist()
+
+    unit = _PRECISION_NS[precision]
+    naive_epoch = _NAIVE_EPOCH
+    timedelta_to_ns = _timedelta_to_ns
+    result = []
+    append = result.append
+    for timestamp in timestamps:
+        if isinstance(timestamp, datetime):
+            if timestamp.tzinfo is None:
+                ns = timedelta_to_ns(timestamp - naive_epoch)
+            else:
+                ns = timedelta_to_ns(timestamp - EPOCH)
+        elif isinstance(timestamp, Integral):
+            append(timestamp)
+            continue
+        else:
+            ns = _parse_timestamp(_get_unicode(timestamp))
+        append(ns // unit if ns >= 0 else -(-ns // unit))
+    return result
+
+
 def _escape_tag(tag):
     tag = _get_unicode(tag, force=True)
     return tag.replace(
@@ -109,57 +251,224 @@ def _get_unicode(data, force=False):
         return data
 
 
-def make_lines(data, precision=None):
-    """Extract points from given dict.
+def _make_series_key(measurement, static_tags, tags):
+    key_values = [_escape_tag(_get_unicode(measurement))]
 
-    Extracts the points from the given dict and returns a Unicode string
-    matching the line protocol introduced in InfluxDB 0.9.0.
+    if static_tags:
+        merged = dict(static_tags)
+        merged.update(tags or ())
+    else:
+        merged = dict(tags or ())
+
+    # tags should be sorted client-side to take load off server
+    for tag_key, tag_value in sorted(iteritems(merged)):
+        key = _escape_tag(tag_key)
+        value = _escape_tag(tag_value)
+
+        if key != '' and value != '':
+            key_values.append(key + "=" + value)
+
+    return ','.join(key_values).encode('utf-8')
+
+
+def _make_field_key(field_key):
+    return _escape_tag(field_key).encode('utf-8')
+
+
+# Points usually repeat a limited set of series, so the escaped and encoded
+# series keys (measurement and sorted tags) are cached. The tags are passed
+# as frozensets of items so that the cache lookup needs neither a copy nor a
+# sort of the tags. Only the keys made of strings are cached: values such as
+# 1, 1.0 and True are equal, and would share the entry of the first of them,
+# but are not serialized the same.
+_series_key = lru_cache(maxsize=SERIES_KEY_CACHE_SIZE)(_make_series_key)
+_field_key = lru_cache(maxsize=SERIES_KEY_CACHE_SIZE)(_make_field_key)
+
+_CACHEABLE_TYPES = frozenset([text_type, binary_type])
+
+
+def _cacheable(items):
+    """Tell if the keys and values of the (key, value) pairs are strings."""
+    for key, value in items:
+        if type(key) not in _CACHEABLE_TYPES or \
+                type(value) not in _CACHEABLE_TYPES:
+            return False
+    return True
+
+
+def _get_series_key(measurement, static_tags, static_items, tags):
+    """Return the encoded series key, from the cache when possible.
+
+    `tags` is a dict or a sequence of (key, value) pairs, `static_items`
+    the frozenset of the items of `static_tags` or None if they are not
+    all strings.
+    """
+    if static_tags and static_items is None or \
+            type(measurement) not in _CACHEABLE_TYPES:
+        return _make_series_key(measurement, static_tags, tags)
+    tag_items = None
+    if tags:
+        items = tags.items() if isinstance(tags, dict) else tags
+        if not _cacheable(items):
+            return _make_series_key(measurement, static_tags, tags)
+        tag_items = frozenset(items)
+    return _series_key(measurement, static_items, tag_items)
+
+
+def _get_field_key(field_key):
+    if type(field_key) in _CACHEABLE_TYPES:
+        return _field_key(field_key)
+    return _make_field_key(field_key)
+
+
+def _encode_fields(fields):
+    """Return the encoded field set of the given (key, value) pairs."""
+    field_values = []
+    for field_key, field_value in fields:
+        key = _get_field_key(field_key)
+        value = _escape_value(field_value)
+
+        if key != b'' and value != '':
+            field_values.append(key + b"=" + value.encode('utf-8'))
+
+    return b','.join(field_values)
+
+
+def _static_items(static_tags):
+    """Return the cacheable form of the static tags, None if impossible."""
+    if not static_tags or not _cacheable(iteritems(static_tags)):
+        return None
+    return frozenset(iteritems(static_tags))
+
+
+def _line_series_key(line):
+    """Return the series key of a line, its part before the first space."""
+    if not isinstance(line, bytes):
+        line = line.encode('utf-8')
+    start = 0
+    while True:
+        end = line.find(b' ', start)
+        if end == -1:
+            return line
+        # the space is escaped if preceded by an odd number of backslashes
+        backslashes = end - len(line[:end].rstrip(b'\\'))
+        if backslashes % 2 == 0:
+            return line[:end]
+        start = end + 1
+
+
+def _series_order(line):
+    """Return the sort key of a line: its series key, then its time.
+
+    The lines without a time sort first in their series.
+    """
+    timestamp = line.rpartition(b' ')[2]
+    try:
+        timestamp = int(timestamp)
+    except ValueError:
+        timestamp = None
+    if timestamp is None:
+        return _line_series_key(line), False, 0
+    return _line_series_key(line), True, timestamp
+
+
+def iter_lines(data, precision=None):
+    """Generate the line protocol of the points of the given dict.
+
+    Yields, for every point, the UTF-8 encoded line matching the line
+    protocol introduced in InfluxDB 0.9.0, including its trailing newline.
+    The points are dicts or :class:`~influxdb.Point` objects.
     """
-    lines = []
     static_tags = data.get('tags')
+    static_items = _static_items(static_tags)
+    default_measurement = data.get('measurement')
+
     for point in data['points']:
-        elements = []
+        if not isinstance(point, dict):
+            serialize = getattr(point, '_serialize', None)
+            if serialize is not None:
+                yield serialize(precision, static_tags, static_items)
+                continue
 
-        # add measurement name
-        measurement = _escape_tag(_get_unicode(
-            point.get('measurement', data.get('measurement'))))
-        key_values = [measurement]
+        series_key = _get_series_key(
+            point.get('measurement', default_measurement),
+            static_tags, static_items, point.get('tags'))
 
-        # add tags
-        if static_tags:
-            tags = dict(static_tags)  # make a copy, since we'll modify
-            tags.update(point.get('tags') or {})
-        else:
-            tags = point.get('tags') or {}
+        elements = [series_key,
+                    _encode_fields(sorted(iteritems(point['fields'])))]
 
-        # tags should be sorted client-side to take load off server
-        for tag_key, tag_value in sorted(iteritems(tags)):
-            key = _escape_tag(tag_key)
-            value = _escape_tag(tag_value)
+        if 'time' in point:
+            elements.append(str(int(
+                _convert_timestamp(point['time'], precision))).encode('ascii'))
 
-            if key != '' and value != '':
-                key_values.append(key + "=" + value)
+        yield b' '.join(elements) + b'\n'
 
-        elements.append(','.join(key_values))
 
-        # add fields
-        field_values = []
-        for field_key, field_value in sorted(iteritems(point['fields'])):
-            key = _escape_tag(field_key)
-            value = _escape_value(field_value)
+def coalesce_lines(data, precision=None):
+    """Return the line protocol of the points, one line per series and time.
 
-            if key != '' and value != '':
-                field_values.append(key + "=" + value)
+    Takes the same dict as :func:`iter_lines`. The points of the same
+    series (measurement and tags) whose timestamps are the same once in
+    `precision` are written as one line holding the fields of all of them,
+    the last point winning for a field they share, as it would on the
+    server. The lines keep the order of the first point of each; the points
+    without a time are never merged.
 
-        elements.append(','.join(field_values))
+    :returns: the UTF-8 encoded lines, each with its trailing newline
+    :rtype: list of bytes
+    """
+    static_tags = data.get('tags')
+    static_items = _static_items(static_tags)
+    default_measurement = data.get('measurement')
 
-        # add timestamp
-        if 'time' in point:
-            timestamp = _get_unicode(str(int(
-                _convert_timestamp(point['time'], precision))))
-            elements.append(timestamp)
+    merged = []
+    by_key = {}
+    for point in data['points']:
+        if isinstance(point, dict):
+            series_key = _get_series_key(
+                point.get('measurement', default_measurement),
+                static_tags, static_items, point.get('tags'))
+            fields = iteritems(point['fields'])
+            timestamp = None
+            if 'time' in point:
+                timestamp = int(_convert_timestamp(point['time'], precision))
+        else:
+            series_key = _get_series_key(point.measurement, static_tags,
+                                         static_items, point.tags)
+            fields = point.fields
+            timestamp = point.timestamp
+            if timestamp is not None:
+                timestamp = _ns_to_precision(timestamp, precision)
+
+        if timestamp is None:
+            merged.append((series_key, dict(fields), None))
+            continue
+        entry = by_key.get((series_key, timestamp))
+        if entry is None:
+            entry = by_key[series_key, timestamp] = (series_key, {},
+                                                     timestamp)
+            merged.append(entry)
+        entry[1].update(fields)
 
-        line = ' '.join(elements)
-        lines.append(line)
+    lines = []
+    for series_key, fields, timestamp in merged:
+        elements = [series_key, _encode_fields(sorted(iteritems(fields)))]
+        if timestamp is not None:
+            elements.append(str(timestamp).encode('ascii'))
+        lines.append(b' '.join(elements) + b'\n')
+    return lines
 
-    return '\n'.join(lines) + '\n'
+
+def make_lines(data, precision=None, coalesce=False):
+    """Extract points from given dict.
+
+    Extracts the points from the given dict and returns a Unicode string
+    matching the line protocol introduced in InfluxDB 0.9.0. With
+    `coalesce`, the points of a series sharing a time are merged into one
+    line, see :func:`coalesce_lines`.
+    """
+    if coalesce:
+        lines = coalesce_lines(data, precision)
+    else:
+        lines = iter_lines(data, precision)
+    return (b''.join(lines) or b'\n').decode('utf-8')
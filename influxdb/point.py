@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Define the Point class."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from numbers import Integral
+
+from six import iteritems
+
+from influxdb.line_protocol import (
+    _PRECISION_NS,
+    _convert_timestamp,
+    _encode_fields,
+    _get_series_key,
+    _ns_to_precision,
+    _static_items,
+)
+
+
+def _set_item(items, key, value):
+    """Return the sorted pairs `items` with `key` set to `value`."""
+    items = [item for item in items if item[0] != key]
+    items.append((key, value))
+    items.sort(key=lambda item: item[0])
+    return tuple(items)
+
+
+class Point(object):
+    r"""A single point to write to InfluxDB.
+
+    A compact alternative to the dict representation of a point: the tags
+    and fields are kept as sorted tuples of (key, value) pairs and the time
+    as an integer number of nanoseconds since the epoch. Points are
+    accepted wherever :meth:`InfluxDBClient.write_points` takes dicts and
+    may be mixed with them.
+
+    Unlike the integer time of a dict, read in the `time_precision` given
+    to :meth:`InfluxDBClient.write_points`, the integer time of a point is
+    read in the precision given along with it, which is required so that
+    the two cannot be confused.
+
+    The serialized line is cached, so writing the same point again, e.g.
+    when retrying a batch, costs nothing. Modifying the point discards the
+    cached line.
+
+    :param measurement: the name of the measurement
+    :type measurement: str
+    :param tags: the tags of the point, defaults to None
+    :type tags: dict
+    :param fields: the fields of the point, defaults to None
+    :type fields: dict
+    :param time: the time of the point, see :meth:`time`, defaults to None
+    :type time: datetime, str or int
+    :param time_precision: precision of an integer `time`, required with
+        one, defaults to None
+    :type time_precision: str
+
+    :Example:
+
+    ::
+
+        >> point = Point('cpu_load_short') \
+        ..     .tag('host', 'server01') \
+        ..     .field('value', 0.64) \
+        ..     .time('2009-11-10T23:00:00Z')
+        >> point.to_line()
+        b'cpu_load_short,host=server01 value=0.64 1257894000000000000\n'
+        >> client.write_points([point])
+    """
+
+    __slots__ = ('_measurement', '_tags', '_fields', '_time', '_line')
+
+    def __init__(self, measurement, tags=None, fields=None, time=None,
+                 time_precision=None):
+        """Initialize the Point."""
+        self._measurement = measurement
+        self._tags = tuple(sorted(iteritems(tags or {}),
+                                  key=lambda item: item[0]))
+        self._fields = tuple(sorted(iteritems(fields or {}),
+                                    key=lambda item: item[0]))
+        self._time = None
+        self._line = None
+        if time is not None:
+            self.time(time, time_precision)
+
+    @property
+    def measurement(self):
+        """Name of the measurement."""
+        return self._measurement
+
+    @property
+    def tags(self):
+        """Tags of the point, as a sorted tuple of (key, value) pairs."""
+        return self._tags
+
+    @property
+    def fields(self):
+        """Fields of the point, as a sorted tuple of (key, value) pairs."""
+        return self._fields
+
+    @property
+    def timestamp(self):
+        """Time of the point in nanoseconds since the epoch, or None."""
+        return self._time
+
+    def tag(self, key, value):
+        """Set a tag of the point.
+
+        :returns: the point itself
+        :rtype: :class:`~.Point`
+        """
+        self._tags = _set_item(self._tags, key, value)
+        self._line = None
+        return self
+
+    def field(self, key, value):
+        """Set a field of the point.
+
+        :returns: the point itself
+        :rtype: :class:`~.Point`
+        """
+        self._fields = _set_item(self._fields, key, value)
+        self._line = None
+        return self
+
+    def time(self, value, precision=None):
+        """Set the time of the point.
+
+        :param value: a datetime (naive ones being UTC), an RFC3339 string
+            or an integer number of `precision` units since the epoch
+        :type value: datetime, str or int
+        :param precision: precision of an integer `value`, either 'n', 'u',
+            'ms', 's', 'm' or 'h', required with one, defaults to None
+        :type precision: str
+        :returns: the point itself
+        :rtype: :class:`~.Point`
+        :raises ValueError: if `value` is an integer and `precision` is
+            missing or invalid
+        """
+        if isinstance(value, Integral):
+            if precision is None:
+                raise ValueError(
+                    "An integer time needs a precision, e.g. 'n' for "
+                    "nanoseconds")
+            if precision not in _PRECISION_NS:
+                raise ValueError(
+                    "Invalid time precision: {0!r}".format(precision))
+            self._time = int(value) * _PRECISION_NS[precision]
+        else:
+            self._time = _convert_timestamp(value, 'n')
+        self._line = None
+        return self
+
+    def to_line(self, precision=None, tags=None):
+        """Return the point in line protocol.
+
+        :param precision: precision of the timestamp, defaults to None
+            (nanoseconds)
+        :type precision: str
+        :param tags: additional tags, overridden by the tags of the point,
+            defaults to None
+        :type tags: dict
+        :returns: the UTF-8 encoded line, newline included
+        :rtype: bytes
+        """
+        return self._serialize(precision, tags, _static_items(tags))
+
+    def _serialize(self, precision, static_tags, static_items):
+        cached = self._line
+        if not static_tags and cached is not None and cached[0] == precision:
+            return cached[1]
+
+        elements = [
+            _get_series_key(self._measurement, static_tags, static_items,
+                            self._tags),
+            _encode_fields(self._fields),
+        ]
+        if self._time is not None:
+            timestamp = _ns_to_precision(self._time, precision)
+            elements.append(str(timestamp).encode('ascii'))
+        line = b' '.join(elements) + b'\n'
+
+        if not static_tags:
+            self._line = (precision, line)
+        return line
+
+    def as_dict(self):
+        """Return the point as a dict, as accepted by write_points.
+
+        The time, if any, is in nanoseconds.
+        """
+        point = {
+            'measurement': self._measurement,
+            'tags': dict(self._tags),
+            'fields': dict(self._fields),
+        }
+        if self._time is not None:
+            point['time'] = self._time
+        return point
+
+    def __repr__(self):
+        """Represent the point."""
+        return 'Point({0!r}, tags={1!r}, fields={2!r}, time={3!r})'.format(
+            self._measurement, dict(self._tags), dict(self._fields),
+            self._time)
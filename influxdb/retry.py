@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Retry policies of the requests sent to InfluxDB."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import random
+import time
+from email.utils import mktime_tz, parsedate_tz
+
+import requests.exceptions
+
+
+class RetryPolicy(object):
+    """Decide whether and when a failed request is sent again.
+
+    A request is retried when it raises a ``ConnectionError`` (including
+    connection timeouts), when it raises a read timeout if
+    `retry_timeouts` is set, or when the server answers with one of the
+    status codes of `status_forcelist`. The n-th retry waits
+    ``backoff_factor * 2 ** (n - 1)`` seconds, capped at `backoff_max`,
+    or a random duration up to that with `jitter`, or as long as the
+    server's ``Retry-After`` header asks if that is longer.
+
+    The default policy retries connection errors immediately, as the
+    client always did.
+
+    :param attempts: total number of attempts, 0 for no limit, defaults
+        to 3
+    :type attempts: int
+    :param backoff_factor: base of the exponential backoff in seconds,
+        defaults to 0 (no wait)
+    :type backoff_factor: float
+    :param backoff_max: maximum wait between two attempts in seconds,
+        defaults to 30
+    :type backoff_max: float
+    :param jitter: wait a random duration between 0 and the backoff
+        ("full jitter"), so that clients failing together do not retry
+        together, defaults to False
+    :type jitter: bool
+    :param max_elapsed: give up rather than start an attempt more than
+        `max_elapsed` seconds after the first one, defaults to None
+    :type max_elapsed: float
+    :param status_forcelist: response status codes to retry, e.g.
+        ``(429, 500, 502, 503, 504)``, defaults to none
+    :type status_forcelist: collection of int
+    :param retry_timeouts: also retry the requests whose response timed
+        out, which may have been processed by the server, defaults to False
+    :type retry_timeouts: bool
+    :param respect_retry_after: wait as long as the ``Retry-After`` header
+        of a retried response asks, defaults to True
+    :type respect_retry_after: bool
+
+    :Example:
+
+    ::
+
+        >> policy = RetryPolicy(attempts=5, backoff_factor=0.5, jitter=True,
+                                max_elapsed=60,
+                                status_forcelist=(429, 500, 502, 503, 504),
+                                retry_timeouts=True)
+        >> client = InfluxDBClient(write_retry_policy=policy)
+    """
+
+    def __init__(self,
+                 attempts=3,
+                 backoff_factor=0,
+                 backoff_max=30.0,
+                 jitter=False,
+                 max_elapsed=None,
+                 status_forcelist=(),
+                 retry_timeouts=False,
+                 respect_retry_after=True):
+        """Construct a new RetryPolicy."""
+        if attempts < 0:
+            raise ValueError("attempts must not be negative")
+        self.attempts = attempts
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+        self.status_forcelist = frozenset(status_forcelist)
+        self.retry_timeouts = retry_timeouts
+        self.respect_retry_after = respect_retry_after
+
+    def is_retryable(self, error=None, response=None):
+        """Tell whether the outcome of an attempt calls for a retry.
+
+        :param error: the exception raised by the attempt, if any
+        :type error: Exception
+        :param response: the response received, if any
+        :type response: :class:`requests.Response`
+        :rtype: bool
+        """
+        if error is not None:
+            if isinstance(error, requests.exceptions.ConnectionError):
+                return True
+            return self.retry_timeouts and isinstance(
+                error, requests.exceptions.Timeout)
+        return response.status_code in self.status_forcelist
+
+    def backoff(self, attempt):
+        """Return the number of seconds to wait after the given attempt.
+
+        :param attempt: number of attempts made so far, starting at 1
+        :type attempt: int
+        :rtype: float
+        """
+        if not self.backoff_factor:
+            return 0
+        delay = min(self.backoff_max,
+                    self.backoff_factor * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def delay(self, attempt, elapsed, error=None, response=None):
+        """Return the number of seconds to wait before the next attempt.
+
+        :param attempt: number of attempts made so far, starting at 1
+        :type attempt: int
+        :param elapsed: number of seconds since the first attempt started
+        :type elapsed: float
+        :param error: the exception raised by the last attempt, if any
+        :type error: Exception
+        :param response: the response to the last attempt, if any
+        :type response: :class:`requests.Response`
+        :returns: the delay, or None if the request should not be retried
+        :rtype: float
+        """
+        if self.attempts and attempt >= self.attempts:
+            return None
+        if not self.is_retryable(error, response):
+            return None
+
+        delay = self.backoff(attempt)
+        if self.respect_retry_after and response is not None:
+            retry_after = _parse_retry_after(
+                response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+
+        if self.max_elapsed is not None:
+            if elapsed + delay > self.max_elapsed:
+                return None
+        return delay
+
+
+def _parse_retry_after(value):
+    """Return the seconds to wait of a Retry-After header, if valid."""
+    if not value:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0, mktime_tz(date) - time.time())
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""Sharding of the series over several InfluxDB servers."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import bisect
+import hashlib
+import struct
+from collections import OrderedDict
+
+from six import iteritems
+
+from .exceptions import InfluxDBBatchError
+from .line_protocol import _get_series_key, _line_series_key, _static_items
+
+_HASH = struct.Struct('>Q')
+
+
+def _hash(key):
+    """Return a 64 bits hash of the bytes `key`."""
+    return _HASH.unpack_from(hashlib.md5(key).digest())[0]
+
+
+class ShardedInfluxDBClient(object):
+    """Spread the series over independent InfluxDB servers.
+
+    Each series, its measurement and sorted tags as written in line
+    protocol, belongs to one node picked by consistent hashing: the nodes
+    are placed `vnodes` times on a ring of 64 bits hashes and a series
+    belongs to the first node found on the ring after its own hash. Adding
+    or removing a node only moves the series of about one node's share.
+
+    The points of a write are grouped per node and the groups written in
+    parallel. Queries are sent to the node owning the series they read.
+
+    :param nodes: the clients of the nodes, either a list, each node being
+        named after its URL, or a dict of clients by node name. The names,
+        rather than the order, decide where the series go
+    :type nodes: list or dict of :class:`~.InfluxDBClient`
+    :param vnodes: number of places of each node on the ring, the more the
+        more even the spread of the series, defaults to 128
+    :type vnodes: int
+
+    :Example:
+
+    ::
+
+        >> client = ShardedInfluxDBClient([
+            InfluxDBClient('influx1', database='metrics'),
+            InfluxDBClient('influx2', database='metrics'),
+        ])
+        >> client.write_points(points)
+        >> client.query("SELECT * FROM cpu WHERE host = 'server01'",
+                        measurement='cpu', tags={'host': 'server01'})
+    """
+
+    def __init__(self, nodes, vnodes=128):
+        """Construct a new ShardedInfluxDBClient object."""
+        if vnodes < 1:
+            raise ValueError("vnodes must be a positive integer")
+        self._vnodes = vnodes
+        self._nodes = OrderedDict()
+        self._ring = []
+        self._ring_nodes = []
+        if not isinstance(nodes, dict):
+            nodes = OrderedDict((node._baseurl, node) for node in nodes)
+        for name, client in iteritems(nodes):
+            self.add_node(client, name)
+
+    @property
+    def nodes(self):
+        """Clients of the nodes, by name."""
+        return OrderedDict(self._nodes)
+
+    def add_node(self, client, name=None):
+        """Add a node to the ring.
+
+        :param client: the client of the node
+        :type client: :class:`~.InfluxDBClient`
+        :param name: the name of the node, defaults to the URL of the client
+        :type name: str
+        """
+        if name is None:
+            name = client._baseurl
+        if name in self._nodes:
+            raise ValueError("Node {0!r} already exists".format(name))
+        self._nodes[name] = client
+        self._build_ring()
+
+    def remove_node(self, name):
+        """Remove a node from the ring.
+
+        :param name: the name of the node
+        :type name: str
+        :returns: the client of the node
+        :rtype: :class:`~.InfluxDBClient`
+        """
+        client = self._nodes.pop(name)
+        self._build_ring()
+        return client
+
+    def _build_ring(self):
+        points = []
+        for name in self._nodes:
+            encoded = name.encode('utf-8')
+            for i in range(self._vnodes):
+                points.append((_hash(encoded + b'#' + str(i).encode()), name))
+        points.sort()
+        self._ring = [point[0] for point in points]
+        self._ring_nodes = [point[1] for point in points]
+
+    def _node_for_key(self, series_key):
+        if not self._ring:
+            raise ValueError("ShardedInfluxDBClient has no node")
+        index = bisect.bisect(self._ring, _hash(series_key))
+        return self._ring_nodes[index % len(self._ring)]
+
+    def node_for(self, measurement, tags=None):
+        """Return the name of the node owning a series.
+
+        :param measurement: the measurement of the series
+        :type measurement: str
+        :param tags: the tags of the series, defaults to None
+        :type tags: dict
+        :rtype: str
+        """
+        return self._node_for_key(
+            _get_series_key(measurement, None, None, tags))
+
+    def client_for(self, measurement, tags=None):
+        """Return the client of the node owning a series.
+
+        Takes the same arguments as :meth:`node_for`.
+
+        :rtype: :class:`~.InfluxDBClient`
+        """
+        return self._nodes[self.node_for(measurement, tags)]
+
+    def _group(self, points, tags, protocol):
+        """Return the points grouped by node name."""
+        groups = OrderedDict()
+        if protocol == 'line':
+            for line in points:
+                name = self._node_for_key(_line_series_key(line))
+                groups.setdefault(name, []).append(line)
+            return groups
+
+        static_items = _static_items(tags)
+        for point in points:
+            if isinstance(point, dict):
+                key = _get_series_key(point.get('measurement'), tags,
+                                      static_items, point.get('tags'))
+            else:
+                key = _get_series_key(point.measurement, tags,
+                                      static_items, point.tags)
+            groups.setdefault(self._node_for_key(key), []).append(point)
+        return groups
+
+    def write_points(self,
+                     points,
+                     time_precision=None,
+                     database=None,
+                     retention_policy=None,
+                     tags=None,
+                     batch_size=None,
+                     protocol='json',
+                     max_batch_bytes=None,
+                     concurrency=None,
+                     coalesce=False):
+        """Write points, each to the node owning its series.
+
+        Takes the same arguments as :meth:`InfluxDBClient.write_points`,
+        which are checked before any node is written to. The points of
+        every node are written in parallel, from background threads
+        (greenlets for :class:`~.GeventInfluxDBClient` nodes).
+
+        :returns: True, if the operation is successful
+        :rtype: bool
+        :raises ValueError: if the arguments are invalid
+        :raises InfluxDBBatchError: once all the nodes have been written to,
+            if any of them failed. Its results are in the order of
+            :attr:`nodes`
+        """
+        if coalesce and protocol != 'json':
+            raise ValueError("coalesce is only supported by the 'json' "
+                             "protocol")
+        for client in self._nodes.values():
+            client._check_time_precision(time_precision)
+
+        groups = self._group(points, tags, protocol)
+
+        def write(name):
+            return self._nodes[name].write_points(
+                groups[name],
+                time_precision=time_precision,
+                database=database,
+                retention_policy=retention_policy,
+                tags=tags,
+                batch_size=batch_size,
+                protocol=protocol,
+                max_batch_bytes=max_batch_bytes,
+                concurrency=concurrency,
+                coalesce=coalesce)
+
+        if len(groups) == 1:
+            return write(next(iter(groups)))
+
+        results = dict.fromkeys(groups)
+        first = next(iter(self._nodes.values()))
+
+        def run(name):
+            try:
+                results[name] = write(name)
+            except Exception as e:
+                results[name] = e
+
+        tasks = [first._spawn(run, name) for name in groups]
+        for task in tasks:
+            task.join()
+
+        if any(result is not True for result in results.values()):
+            raise InfluxDBBatchError([results.get(name, True)
+                                      for name in self._nodes])
+        return True
+
+    def query(self, query, measurement, tags=None, **kwargs):
+        """Send a query to the node owning a series.
+
+        :param query: the query
+        :type query: str
+        :param measurement: the measurement of the series read by the query
+        :type measurement: str
+        :param tags: the tags of the series read by the query, defaults to
+            None
+        :type tags: dict
+        :param kwargs: the other arguments of :meth:`InfluxDBClient.query`
+        :returns: the result of the query
+        :rtype: :class:`~.ResultSet`
+        """
+        return self.client_for(measurement, tags).query(query, **kwargs)
+
+    def query_all(self, query, **kwargs):
+        """Send a query to every node.
+
+        Takes the same arguments as :meth:`InfluxDBClient.query`.
+
+        :returns: the result of each node, by node name
+        :rtype: dict
+        """
+        return dict((name, client.query(query, **kwargs))
+                    for name, client in iteritems(self._nodes))
+
+    def close(self):
+        """Close the clients of all the nodes."""
+        for client in self._nodes.values():
+            client.close()
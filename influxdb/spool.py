@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""Disk-backed spool of the writes InfluxDB could not receive."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+
+# record header: length of the JSON write parameters, length of the body
+_RECORD = struct.Struct('!II')
+
+_SEGMENT_RE = re.compile(r'^(\d{16})\.seg$')
+_CHECKPOINT = 'checkpoint'
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class WriteSpool(object):
+    """Append-only store of line protocol waiting to be written.
+
+    The spool is a directory of segment files holding one record per
+    failed write: its query parameters (database, retention policy,
+    precision) and its line protocol body. Records are appended to the
+    last segment, a new segment being started once it exceeds
+    `segment_bytes`, and read back through memory maps. The position of
+    the oldest record not yet replayed is saved in a checkpoint file,
+    replaced atomically, so that a restarted process resumes where the
+    previous one stopped; segments are deleted once replayed.
+
+    When the spool would grow beyond `max_bytes` its oldest segments are
+    discarded, the number of bytes lost being counted in
+    :attr:`dropped_bytes`.
+
+    :param directory: the directory holding the segments, created if
+        needed
+    :type directory: str
+    :param segment_bytes: size from which a new segment is started,
+        defaults to 16 MiB
+    :type segment_bytes: int
+    :param max_bytes: maximum size of the segments on disk, defaults to
+        1 GiB
+    :type max_bytes: int
+    :param replay_batch_bytes: maximum size of a replayed request body,
+        defaults to 4 MiB
+    :type replay_batch_bytes: int
+    :param retry_interval: number of seconds between two attempts to reach
+        the server while the spool holds data, defaults to 5
+    :type retry_interval: float
+    :param fsync: flush the records to the disk before a write returns,
+        defaults to False
+    :type fsync: bool
+
+    :Example:
+
+    ::
+
+        >> client = InfluxDBClient(spool=WriteSpool('/var/spool/influxdb'))
+    """
+
+    def __init__(self,
+                 directory,
+                 segment_bytes=16 * 1024 * 1024,
+                 max_bytes=1024 * 1024 * 1024,
+                 replay_batch_bytes=4 * 1024 * 1024,
+                 retry_interval=5.0,
+                 fsync=False):
+        """Open the spool, resuming from its checkpoint if any."""
+        if segment_bytes < 1 or max_bytes < 1 or replay_batch_bytes < 1:
+            raise ValueError("the spool sizes must be positive integers")
+
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.replay_batch_bytes = replay_batch_bytes
+        self.retry_interval = retry_interval
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._dropped_bytes = 0
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._sizes = {}
+        for name in os.listdir(directory):
+            match = _SEGMENT_RE.match(name)
+            if match is not None:
+                segment = int(match.group(1))
+                self._sizes[segment] = os.path.getsize(self._path(segment))
+        self._segments = sorted(self._sizes)
+
+        self._checkpoint = self._read_checkpoint()
+        self._current = None
+        self._release()
+        for segment in self._segments[:-1]:
+            if not self._sizes[segment]:
+                self._delete_segment(segment)
+
+        # an empty last segment is reused, but never append after a record
+        # a crash may have left incomplete
+        self._file = None
+        last = self._segments[-1] if self._segments else None
+        reusable = last is not None and not self._sizes[last]
+        if reusable and (last, 0) >= self._checkpoint:
+            self._open_segment(last)
+        else:
+            self._start_segment()
+
+    @property
+    def dropped_bytes(self):
+        """Number of spooled bytes discarded to stay within max_bytes."""
+        return self._dropped_bytes
+
+    @property
+    def pending_bytes(self):
+        """Number of bytes of records not replayed yet."""
+        with self._lock:
+            return self._pending_bytes()
+
+    def append(self, body, params=None):
+        """Spool the body of a write request.
+
+        :param body: line protocol, newline terminated
+        :type body: bytes
+        :param params: the query parameters of the write request
+        :type params: dict
+        :returns: False if the record is larger than max_bytes and was
+            dropped, True otherwise
+        :rtype: bool
+        """
+        header = json.dumps(params or {}, sort_keys=True).encode('utf-8')
+        record = _RECORD.pack(len(header), len(body)) + header + body
+
+        with self._lock:
+            if len(record) > self.max_bytes:
+                self._dropped_bytes += len(record)
+                return False
+            self._make_room(len(record))
+            if self._sizes[self._current] >= self.segment_bytes:
+                self._start_segment()
+
+            self._file.write(record)
+            self._file.flush()
+            if self._fsync:
+                os.fsync(self._file.fileno())
+            self._sizes[self._current] += len(record)
+        return True
+
+    def read(self, max_bytes=None):
+        """Return the oldest records sharing the same parameters.
+
+        The records are not removed from the spool until :meth:`commit` is
+        called with the returned position.
+
+        :param max_bytes: maximum size of the returned body, at least one
+            record being returned, defaults to replay_batch_bytes
+        :type max_bytes: int
+        :returns: the query parameters, the concatenated bodies and the
+            position following them, or None when the spool is empty
+        :rtype: tuple
+        """
+        if max_bytes is None:
+            max_bytes = self.replay_batch_bytes
+
+        with self._lock:
+            segment, offset = self._checkpoint
+            for segment in self._segments:
+                if segment < self._checkpoint[0]:
+                    continue
+                if segment > self._checkpoint[0]:
+                    offset = 0
+                if offset >= self._sizes[segment]:
+                    continue
+                records = self._read_segment(segment, offset, max_bytes)
+                if records is not None:
+                    return records
+            return None
+
+    def commit(self, position):
+        """Mark the records before `position` as replayed.
+
+        :param position: a position returned by :meth:`read`
+        :type position: tuple
+        """
+        with self._lock:
+            if tuple(position) > self._checkpoint:
+                self._checkpoint = tuple(position)
+                self._write_checkpoint()
+                self._release()
+
+    def close(self):
+        """Close the segment being appended to."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _path(self, segment):
+        return os.path.join(self.directory, '%016d.seg' % segment)
+
+    def _pending_bytes(self):
+        segment, offset = self._checkpoint
+        return sum(size - (offset if s == segment else 0)
+                   for s, size in self._sizes.items() if s >= segment)
+
+    def _read_checkpoint(self):
+        try:
+            with open(os.path.join(self.directory, _CHECKPOINT)) as f:
+                segment, offset = f.read().split()
+            return int(segment), int(offset)
+        except (IOError, OSError, ValueError):
+            return (self._segments[0] if self._segments else 0), 0
+
+    def _write_checkpoint(self):
+        path = os.path.join(self.directory, _CHECKPOINT)
+        with open(path + '.tmp', 'w') as f:
+            f.write('%d %d\n' % self._checkpoint)
+            f.flush()
+            if self._fsync:
+                os.fsync(f.fileno())
+        _replace(path + '.tmp', path)
+
+    def _open_segment(self, segment):
+        if self._file is not None:
+            self._file.close()
+        self._current = segment
+        self._file = open(self._path(segment), 'ab')
+
+    def _start_segment(self):
+        # numbered after the checkpoint, whose segment may be gone
+        segment = self._checkpoint[0] + 1
+        if self._segments:
+            segment = max(segment, self._segments[-1] + 1)
+        self._segments.append(segment)
+        self._sizes[segment] = 0
+        self._open_segment(segment)
+
+    def _delete_segment(self, segment):
+        self._segments.remove(segment)
+        del self._sizes[segment]
+        try:
+            os.remove(self._path(segment))
+        except OSError:
+            pass
+
+    def _release(self):
+        """Delete the segments that were entirely replayed."""
+        for segment in list(self._segments):
+            if segment >= self._checkpoint[0] or segment == self._current:
+                break
+            self._delete_segment(segment)
+
+    def _make_room(self, size):
+        """Discard the oldest segments until `size` more bytes fit."""
+        while sum(self._sizes.values()) + size > self.max_bytes:
+            oldest = self._segments[0]
+            if oldest == self._current:
+                if not self._sizes[oldest]:
+                    return
+                self._start_segment()
+
+            segment, offset = self._checkpoint
+            if oldest > segment:
+                self._dropped_bytes += self._sizes[oldest]
+            elif oldest == segment:
+                self._dropped_bytes += self._sizes[oldest] - offset
+            self._delete_segment(oldest)
+            if self._checkpoint < (self._segments[0], 0):
+                self._checkpoint = (self._segments[0], 0)
+                self._write_checkpoint()
+
+    def _read_segment(self, segment, offset, max_bytes):
+        """Read the records of a segment, from `offset` on."""
+        size = self._sizes[segment]
+        with open(self._path(segment), 'rb') as f:
+            view = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        try:
+            params = None
+            bodies = []
+            total = 0
+            while offset + _RECORD.size <= size:
+                header_size, body_size = _RECORD.unpack_from(view, offset)
+                start = offset + _RECORD.size + header_size
+                end = start + body_size
+                if end > size:
+                    # truncated by a crash, the rest of the segment is lost
+                    break
+                header = json.loads(view[start - header_size:start]
+                                    .decode('utf-8'))
+                full = total + body_size > max_bytes
+                if bodies and (full or header != params):
+                    break
+                params = header
+                bodies.append(view[start:end])
+                total += body_size
+                offset = end
+        finally:
+            view.close()
+
+        if not bodies:
+            self._sizes[segment] = offset
+            return None
+        return params, b''.join(bodies), (segment, offset)
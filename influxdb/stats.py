@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Instrumentation of the work done by a client."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import bisect
+import logging
+import threading
+
+from six import iteritems
+
+log = logging.getLogger(__name__)
+
+STAGES = ('serialize', 'compress', 'send', 'server', 'parse')
+COUNTERS = ('points', 'bytes', 'requests', 'retries', 'failures')
+# upper bounds of the latency buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram(object):
+    """Distribution of the latencies of an endpoint."""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self, size):
+        # the last bucket counts the latencies above the largest bound
+        self.counts = [0] * (size + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def snapshot(self, bounds):
+        return {'count': self.count,
+                'total': self.total,
+                'max': self.max,
+                'buckets': list(zip(bounds + (float('inf'),), self.counts))}
+
+
+class ClientStats(object):
+    """Timings and counters of the requests of a client.
+
+    Pass one, or True for a new one, as the `stats` of a client to have it
+    record:
+
+    * the seconds spent per stage: serializing the points to line protocol
+      ('serialize'), compressing the bodies ('compress'), sending the
+      requests ('send'), waiting for the server's response ('server') and
+      parsing query results ('parse'). Only the fast writes tell sending
+      from waiting; the round trips of the requests sent with requests are
+      all counted as 'server'. Streamed bodies are serialized while they
+      are sent, which is not timed apart; compression is timed without
+      changing how the bodies are sent;
+    * the number of points written, of bytes of the bodies held in memory
+      or compressed, of requests (each attempt counting), retries and
+      failed requests;
+    * the requests in flight, the most at once since the last reset, to
+      size the connection pool;
+    * a latency histogram per endpoint ('write', 'query', 'ping'...).
+
+    :param buckets: upper bounds of the latency buckets in seconds,
+        defaults to :data:`DEFAULT_BUCKETS`
+    :type buckets: sequence of float
+    :param exporters: callables receiving each :meth:`snapshot` on
+        :meth:`export`, defaults to none
+    :type exporters: sequence of callable
+    :param export_interval: number of seconds between two exports by the
+        client, which also exports when it is closed, defaults to None
+        (only on :meth:`export`)
+    :type export_interval: float
+
+    :Example:
+
+    ::
+
+        >> client = InfluxDBClient(stats=ClientStats(
+            exporters=[log_exporter], export_interval=60))
+        >> client.write_points(points)
+        >> client.stats.snapshot()['counters']['points']
+        1000
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, exporters=(),
+                 export_interval=None):
+        """Construct a new ClientStats."""
+        self._buckets = tuple(sorted(buckets))
+        self._exporters = list(exporters)
+        self.export_interval = export_interval
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.reset()
+
+    def reset(self):
+        """Set all the timings and counters back to zero.
+
+        The requests in flight are still counted, the maximum starting
+        again from their number.
+        """
+        with self._lock:
+            self._stages = dict((stage, [0, 0.0]) for stage in STAGES)
+            self._counters = dict.fromkeys(COUNTERS, 0)
+            self._endpoints = {}
+            self._max_in_flight = self._in_flight
+
+    def add_time(self, stage, seconds):
+        """Account for `seconds` spent in a stage."""
+        with self._lock:
+            totals = self._stages.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def count(self, counter, value=1):
+        """Add `value` to a counter."""
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def request_started(self):
+        """Count a request in flight."""
+        with self._lock:
+            self._in_flight += 1
+            if self._in_flight > self._max_in_flight:
+                self._max_in_flight = self._in_flight
+
+    def request_finished(self, endpoint, seconds):
+        """Record the latency of a request to `endpoint`."""
+        with self._lock:
+            self._in_flight -= 1
+            histogram = self._endpoints.get(endpoint)
+            if histogram is None:
+                histogram = self._endpoints[endpoint] = _Histogram(
+                    len(self._buckets))
+            histogram.counts[bisect.bisect_left(self._buckets, seconds)] += 1
+            histogram.count += 1
+            histogram.total += seconds
+            if seconds > histogram.max:
+                histogram.max = seconds
+
+    def snapshot(self):
+        """Return a copy of the current timings and counters.
+
+        :returns: a dict of the 'stages' (count and total seconds of every
+            stage), the 'counters', the requests 'in_flight' and
+            'max_in_flight' and the 'endpoints' (count, total and max
+            seconds and the (upper bound, count) 'buckets' of the latencies
+            of every endpoint)
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'stages': dict(
+                    (stage, {'count': totals[0], 'total': totals[1]})
+                    for stage, totals in iteritems(self._stages)),
+                'counters': dict(self._counters),
+                'in_flight': self._in_flight,
+                'max_in_flight': self._max_in_flight,
+                'endpoints': dict(
+                    (endpoint, histogram.snapshot(self._buckets))
+                    for endpoint, histogram in iteritems(self._endpoints)),
+            }
+
+    def add_exporter(self, exporter):
+        """Add a callable receiving the snapshots on :meth:`export`."""
+        self._exporters.append(exporter)
+
+    def export(self):
+        """Hand a snapshot to every exporter, logging their errors."""
+        snapshot = self.snapshot()
+        for exporter in self._exporters:
+            try:
+                exporter(snapshot)
+            except Exception:
+                log.exception("Failed to export the client stats")
+
+
+def log_exporter(snapshot):
+    """Log the counters and the time spent per stage of a snapshot."""
+    log.info("InfluxDB client stats: %s; seconds per stage: %s",
+             ', '.join('{0}={1}'.format(name, value) for name, value
+                       in sorted(iteritems(snapshot['counters']))),
+             ', '.join('{0}={1:.6f}'.format(stage, totals['total'])
+                       for stage, totals
+                       in sorted(iteritems(snapshot['stages']))))
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the Aggregator."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+import mock
+import requests_mock
+
+from influxdb import Aggregator, InfluxDBClient, Point
+
+_S = 10 ** 9
+
+
+def _sample(ms, value, host='a', **fields):
+    fields['value'] = value
+    return {'measurement': 'gauge', 'tags': {'host': host},
+            'time': ms, 'fields': fields}
+
+
+class TestAggregator(unittest.TestCase):
+    """Define the Aggregator test object."""
+
+    def setUp(self):
+        """Create an aggregator writing to a mocked client."""
+        self.client = mock.Mock()
+        self.client.write_points.return_value = True
+
+    def written(self):
+        """Return the points written so far."""
+        return [point
+                for call in self.client.write_points.call_args_list
+                for point in call[0][0]]
+
+    def test_aggregates(self):
+        """Test every aggregate of a window."""
+        aggregator = Aggregator(
+            self.client, 1,
+            aggregates=('mean', 'min', 'max', 'count', 'sum', 'first',
+                        'last', 'p50', 'p90'))
+        aggregator.write_points(
+            [_sample(ms, value, text='ignored', flag=True)
+             for ms, value in ((0, 4), (500, 1), (250, 3), (750, 2))],
+            time_precision='ms')
+        self.assertFalse(self.client.write_points.called)
+        aggregator.flush()
+
+        self.assertEqual(self.written(), [{
+            'measurement': 'gauge',
+            'tags': {'host': 'a'},
+            'time': 0,
+            'fields': {'value_mean': 2.5, 'value_min': 1, 'value_max': 4,
+                       'value_count': 4, 'value_sum': 10, 'value_first': 4,
+                       'value_last': 2, 'value_p50': 2.5,
+                       'value_p90': 3.7000000000000002},
+        }])
+
+    def test_first_and_last_out_of_order(self):
+        """Test first and last follow the timestamps, not the arrival."""
+        aggregator = Aggregator(self.client, 1, aggregates=('first', 'last'))
+        aggregator.write_points(
+            [_sample(ms, value) for ms, value in ((5, 2), (1, 1), (3, 3))],
+            time_precision='ms')
+        aggregator.flush()
+
+        self.assertEqual(self.written()[0]['fields'],
+                         {'value_first': 1, 'value_last': 2})
+
+    def test_windows(self):
+        """Test windows written as the series move to later windows."""
+        aggregator = Aggregator(self.client, 1, aggregates=('count',),
+                                database='db', retention_policy='rp')
+        points = [_sample(ms, 1, host) for ms in range(0, 3000, 100)
+                  for host in ('a', 'b')]
+        aggregator.write_points(points, time_precision='ms')
+
+        self.assertEqual(
+            [(p['tags']['host'], p['time'], p['fields']['value_count'])
+             for p in self.written()],
+            [('a', 0, 10), ('b', 0, 10), ('a', _S, 10), ('b', _S, 10)])
+        self.client.write_points.assert_called_with(
+            mock.ANY, database='db', retention_policy='rp')
+
+        # the windows ended before the latest time seen are late
+        aggregator.write_points([_sample(1500, 1, 'a'),
+                                 _sample(1999, 1, 'c')],
+                                time_precision='ms')
+        self.assertEqual(aggregator.late, 2)
+
+    def test_grace(self):
+        """Test the windows of idle series written after the grace time."""
+        aggregator = Aggregator(self.client, 1, aggregates=('last',),
+                                grace=0.5)
+        aggregator.write_points([_sample(100, 1, 'a'),
+                                 _sample(1200, 2, 'b')], time_precision='ms')
+        self.assertFalse(self.client.write_points.called)
+        # out of order across the series, within the grace time
+        aggregator.write_points([_sample(900, 3, 'a')], time_precision='ms')
+        aggregator.write_points([_sample(1600, 4, 'b')], time_precision='ms')
+        self.assertEqual(self.written(), [{
+            'measurement': 'gauge', 'tags': {'host': 'a'}, 'time': 0,
+            'fields': {'value_last': 3}}])
+        self.assertEqual(aggregator.late, 0)
+
+    def test_points_and_tags(self):
+        """Test Point objects, shared tags and the selection of fields."""
+        aggregator = Aggregator(self.client, 60, aggregates=('max',),
+                                fields=['load'], field_format='{field}')
+        aggregator.write_points([
+            Point('cpu', tags={'host': 'a'}, fields={'load': 1, 'x': 9},
+                  time=10, time_precision='s'),
+            {'measurement': 'cpu', 'tags': {'host': 'a'},
+             'fields': {'load': 3.0}, 'time': '1970-01-01T00:00:20Z'},
+            # no field to aggregate: nothing is written for this series
+            {'measurement': 'cpu', 'tags': {'host': 'b'},
+             'fields': {'x': 1.0}, 'time': 30 * _S},
+        ], tags={'dc': 'eu'})
+        aggregator.flush()
+        self.assertEqual(self.written(), [{
+            'measurement': 'cpu', 'tags': {'dc': 'eu', 'host': 'a'},
+            'time': 0, 'fields': {'load': 3.0}}])
+
+    def test_invalid_arguments(self):
+        """Test invalid aggregates, intervals and precisions."""
+        for aggregates in (('median',), ('p101',), ('pxx',), ()):
+            with self.assertRaises(ValueError):
+                Aggregator(self.client, 1, aggregates=aggregates)
+        with self.assertRaises(ValueError):
+            Aggregator(self.client, 0)
+        with self.assertRaises(ValueError):
+            Aggregator(self.client, 1).write_points([], time_precision='x')
+
+    def test_write_to_client(self):
+        """Test the aggregates being written in line protocol."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            cli = InfluxDBClient(database='db')
+            aggregator = Aggregator(cli, 1, aggregates=('mean', 'count'))
+            aggregator.write_points([_sample(ms, ms) for ms in (0, 10)],
+                                    time_precision='ms')
+            self.assertTrue(aggregator.flush())
+            self.assertEqual(
+                m.last_request.body,
+                b'gauge,host=a value_count=2i,value_mean=5.0 0\n')
+
+    def test_stable_field_types(self):
+        """Test integer and float values giving the same field types."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            cli = InfluxDBClient(database='db')
+            aggregator = Aggregator(
+                cli, 1, aggregates=('min', 'max', 'sum', 'count', 'first',
+                                    'last', 'p50'))
+            aggregator.write_points([_sample(0, 1), _sample(1000, 1.5)],
+                                    time_precision='ms')
+            aggregator.flush()
+            self.assertEqual(
+                [r.body for r in m.request_history],
+                [b'gauge,host=a value_count=1i,value_first=1.0,'
+                 b'value_last=1.0,value_max=1.0,value_min=1.0,'
+                 b'value_p50=1.0,value_sum=1.0 0\n',
+                 b'gauge,host=a value_count=1i,value_first=1.5,'
+                 b'value_last=1.5,value_max=1.5,value_min=1.5,'
+                 b'value_p50=1.5,value_sum=1.5 1000000000\n'])
+
+
+if __name__ == '__main__':
+    unittest.main()
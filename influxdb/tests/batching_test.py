@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the BatchingWriter."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import time
+import unittest
+
+import mock
+import requests_mock
+
+from influxdb import BatchingWriter, InfluxDBClient
+
+
+def _bodies(mocker):
+    return [r.body.decode('utf-8') for r in mocker.request_history]
+
+
+def _point(value, host='server01'):
+    return {"measurement": "cpu_load_short",
+            "tags": {"host": host},
+            "time": 1257894000000000000 + value,
+            "fields": {"value": value}}
+
+
+class TestBatchingWriter(unittest.TestCase):
+    """Define the BatchingWriter test object."""
+
+    def setUp(self):
+        """Create the client of the writers."""
+        self.cli = InfluxDBClient(database='db')
+
+    def test_flush_on_batch_size(self):
+        """Test a batch is written as soon as it holds batch_size points."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            with BatchingWriter(self.cli, batch_size=2,
+                                flush_interval=60) as writer:
+                for i in range(5):
+                    self.assertTrue(writer.submit(_point(i)))
+                writer.flush()
+                self.assertEqual(m.call_count, 3)
+
+        self.assertEqual(
+            _bodies(m)[0],
+            'cpu_load_short,host=server01 value=0i 1257894000000000000\n'
+            'cpu_load_short,host=server01 value=1i 1257894000000000001\n'
+        )
+
+    def test_flush_on_batch_bytes(self):
+        """Test a batch is written before it exceeds max_batch_bytes."""
+        line_size = len('cpu_load_short,host=server01 value=0i '
+                        '1257894000000000000\n')
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            with BatchingWriter(self.cli,
+                                max_batch_bytes=2 * line_size + 1,
+                                flush_interval=60) as writer:
+                for i in range(5):
+                    writer.submit(_point(i))
+
+        self.assertEqual([b.count('\n') for b in _bodies(m)], [2, 2, 1])
+
+    def test_flush_on_age(self):
+        """Test a batch is written once it is flush_interval seconds old."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            writer = BatchingWriter(self.cli, flush_interval=0.05)
+            writer.submit(_point(1))
+            deadline = time.time() + 5
+            while m.call_count == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(m.call_count, 1)
+            writer.close()
+            self.assertEqual(m.call_count, 1)
+
+    def test_group_by_write_parameters(self):
+        """Test points are batched per database, policy and precision."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            with BatchingWriter(self.cli, flush_interval=60) as writer:
+                writer.submit(_point(1))
+                writer.submit(_point(2), database='other')
+                writer.submit(_point(3), retention_policy='rp')
+                writer.submit({"measurement": "cpu_load_short",
+                               "time": 1257894000,
+                               "fields": {"value": 4}}, time_precision='s')
+                writer.submit(_point(5))
+
+        queries = sorted((r.qs['db'][0], r.qs.get('rp', [''])[0],
+                          r.qs.get('precision', [''])[0])
+                         for r in m.request_history)
+        self.assertEqual(queries, [('db', '', ''),
+                                   ('db', '', 's'),
+                                   ('db', 'rp', ''),
+                                   ('other', '', '')])
+
+    def test_submit_when_queue_is_full(self):
+        """Test submit drops points instead of blocking."""
+        with mock.patch.object(InfluxDBClient, '_spawn'):
+            writer = BatchingWriter(self.cli, queue_size=2)
+        self.assertTrue(writer.submit(_point(1)))
+        self.assertTrue(writer.submit(_point(2)))
+        self.assertFalse(writer.submit(_point(3)))
+        self.assertEqual(writer.dropped, 1)
+
+    def test_submit_after_close(self):
+        """Test submitting to a closed writer raises."""
+        writer = BatchingWriter(self.cli)
+        writer.close()
+        with self.assertRaises(ValueError):
+            writer.submit(_point(1))
+
+    def test_flush_after_close(self):
+        """Test flushing a closed writer raises instead of blocking."""
+        writer = BatchingWriter(self.cli)
+        writer.close()
+        with self.assertRaises(ValueError):
+            writer.flush(timeout=1)
+
+    def test_write_errors_are_reported(self):
+        """Test failed batches are handed to the error callback."""
+        errors = []
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=400)
+            with BatchingWriter(self.cli,
+                                error_callback=lambda e, lines:
+                                errors.append((e, lines))) as writer:
+                writer.submit(_point(1))
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][1], [
+            b'cpu_load_short,host=server01 value=1i 1257894000000000001'])
+
+    def test_failing_error_callback(self):
+        """Test an error of the callback does not stop the writer."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           [{'status_code': 400}, {'status_code': 204}])
+            callback = mock.Mock(side_effect=KeyError)
+            with mock.patch('influxdb.batching.log') as log:
+                with BatchingWriter(self.cli, flush_interval=60,
+                                    error_callback=callback) as writer:
+                    writer.submit(_point(1))
+                    writer.flush(timeout=5)
+                    writer.submit(_point(2))
+                    writer.flush(timeout=5)
+
+        self.assertTrue(log.exception.called)
+        self.assertEqual(callback.call_count, 1)
+        self.assertEqual(m.call_count, 2)
+
+    def test_unserializable_point(self):
+        """Test a point that cannot be serialized is reported as given."""
+        errors = []
+        point = {'measurement': 'cpu', 'fields': {'value': 1},
+                 'time': object()}
+        with BatchingWriter(self.cli,
+                            error_callback=lambda e, lines:
+                            errors.append((e, lines))) as writer:
+            writer.submit(point)
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][1], [point])
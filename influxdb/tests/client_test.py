@@ -19,10 +19,14 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import errno
 import random
 import socket
+import threading
+import time
 import unittest
 import warnings
+import zlib
 
 import json
 import mock
@@ -33,6 +37,7 @@ import requests_mock
 from nose.tools import raises
 
 from influxdb import InfluxDBClient
+from influxdb.exceptions import InfluxDBBatchError, InfluxDBClientError
 from influxdb.resultset import ResultSet
 
 
@@ -239,6 +244,276 @@ class TestInfluxDBClient(unittest.TestCase):
         self.assertEqual(expected_last_body,
                          m.last_request.body.decode('utf-8'))
 
+    def test_write_points_max_batch_bytes(self):
+        """Test write points cut in batches of at most max_batch_bytes."""
+        points = [
+            {"measurement": "m", "fields": {"value": 1}, "time": 1},
+            {"measurement": "m", "fields": {"text": "x" * 40}, "time": 2},
+            {"measurement": "m", "fields": {"value": 3}, "time": 3},
+            {"measurement": "m", "fields": {"value": 4}, "time": 4},
+            {"measurement": "m", "fields": {"value": 5}, "time": 5},
+        ]
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            cli = InfluxDBClient(database='db')
+            cli.write_points(points, max_batch_bytes=32,
+                             tags={"host": "a"}, time_precision='s')
+
+            bodies = [r.body for r in m.request_history]
+            self.assertEqual(bodies, [
+                b'm,host=a value=1i 1\n',
+                b'm,host=a text="' + b'x' * 40 + b'" 2\n',
+                b'm,host=a value=3i 3\n',
+                b'm,host=a value=4i 4\n',
+                b'm,host=a value=5i 5\n',
+            ])
+            self.assertEqual(m.last_request.qs['precision'], ['s'])
+
+            m.reset_mock()
+            cli.write_points(points, max_batch_bytes=50, batch_size=2)
+            self.assertEqual([r.body.count(b'\n') for r in m.request_history],
+                             [1, 1, 2, 1])
+
+    def test_write_points_max_batch_bytes_bad_precision(self):
+        """Test byte batching validates the precision before serializing."""
+        cli = InfluxDBClient()
+        with self.assertRaisesRegexp(ValueError, "Invalid time precision"):
+            cli.write_points(self.dummy_points, time_precision='g',
+                             max_batch_bytes=1024)
+
+    def test_write_points_concurrency(self):
+        """Test batches are written by several workers at once."""
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'max_in_flight': 0, 'bodies': []}
+
+        def slow_request(*args, **kwargs):
+            with lock:
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'],
+                                             state['in_flight'])
+                state['bodies'].append(kwargs['data'])
+            time.sleep(0.05)
+            with lock:
+                state['in_flight'] -= 1
+            response = requests.Response()
+            response.status_code = 204
+            return response
+
+        points = ({"measurement": "m", "fields": {"value": i}, "time": i}
+                  for i in range(12))
+        cli = InfluxDBClient(database='db')
+        with mock.patch.object(cli._session, 'request',
+                               side_effect=slow_request):
+            self.assertTrue(cli.write_points(points, batch_size=2,
+                                             concurrency=3))
+
+        self.assertEqual(state['max_in_flight'], 3)
+        self.assertEqual(
+            set(state['bodies']),
+            set(('m value={0}i {0}\nm value={1}i {1}\n'.format(i, i + 1)
+                 .encode('utf-8')) for i in range(0, 12, 2))
+        )
+
+    def test_write_points_concurrency_errors(self):
+        """Test errors of concurrent writes are reported per batch."""
+        def fail_second_batch(request, context):
+            context.status_code = 400 if b'value=1i' in request.body else 204
+            return ''
+
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           text=fail_second_batch)
+            cli = InfluxDBClient(database='db')
+            points = ["m value={0}i".format(i) for i in range(4)]
+            with self.assertRaises(InfluxDBBatchError) as ctx:
+                cli.write_points(points, protocol='line', max_batch_bytes=20,
+                                 concurrency=2)
+
+        self.assertEqual(m.call_count, 4)
+        error = ctx.exception
+        self.assertEqual(list(error.errors), [1])
+        self.assertIsInstance(error.errors[1], InfluxDBClientError)
+        self.assertEqual(error.results[0], True)
+        self.assertEqual(len(error.results), 4)
+
+    def test_write_points_generator(self):
+        """Test write points from a generator for TestInfluxDBClient object."""
+        def points():
+            for i in range(3):
+                yield {"measurement": "cpu", "fields": {"value": i},
+                       "time": i}
+
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            cli = InfluxDBClient(database='db')
+            cli.write_points(points())
+
+            self.assertEqual(
+                b''.join(m.last_request.body),
+                b'cpu value=0i 0\ncpu value=1i 1\ncpu value=2i 2\n'
+            )
+
+    def test_write_points_generator_batch(self):
+        """Test a generator of points is consumed one batch at a time."""
+        consumed = []
+
+        def points():
+            for i in range(5):
+                consumed.append(i)
+                yield "cpu value={0}i {0}".format(i)
+
+        def check_laziness(request, context):
+            context.status_code = 204
+            self.assertLessEqual(len(consumed), 2 * (m.call_count + 1))
+            return ''
+
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           text=check_laziness)
+            cli = InfluxDBClient(database='db')
+            cli.write_points(points(), batch_size=2, protocol='line')
+
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual(m.last_request.body, b'cpu value=4i 4\n')
+
+    def test_write_stream_in_chunks(self):
+        """Test streamed bodies are sent in chunks."""
+        lines = ("cpu,host=server{0} value={0}i".format(i)
+                 for i in range(10000))
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            cli = InfluxDBClient(database='db')
+            cli.write(lines, protocol='line')
+
+            chunks = list(m.last_request.body)
+            self.assertGreater(len(chunks), 1)
+            body = b''.join(chunks)
+            self.assertEqual(body.count(b'\n'), 10000)
+            self.assertTrue(
+                body.endswith(b'cpu,host=server9999 value=9999i\n'))
+
+    @mock.patch('requests.Session.request')
+    def test_write_stream_is_not_retried(self, mock_request):
+        """Test a streamed body is not sent twice."""
+        def send(*args, **kwargs):
+            list(kwargs['data'])
+            raise requests.exceptions.ConnectionError
+
+        mock_request.side_effect = send
+        cli = InfluxDBClient(database='db', retries=3)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            cli.write_points(iter(self.dummy_points))
+        self.assertEqual(mock_request.call_count, 1)
+
+    def test_write_gzip(self):
+        """Test write with gzip compression for TestInfluxDBClient object."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(
+                requests_mock.POST,
+                "http://localhost:8086/write",
+                status_code=204
+            )
+            cli = InfluxDBClient(database='db', gzip=True)
+            cli.write_points(self.dummy_points)
+
+            self.assertEqual(m.last_request.headers['Content-Encoding'],
+                             'gzip')
+            self.assertEqual(
+                zlib.decompress(b''.join(m.last_request.body),
+                                16 + zlib.MAX_WBITS),
+                b'cpu_load_short,host=server01,region=us-west '
+                b'value=0.64 1257894000123456000\n'
+            )
+
+    def test_write_gzip_compresses_in_chunks(self):
+        """Test large bodies are compressed piece by piece."""
+        points = [{"measurement": "cpu", "tags": {"host": str(i)},
+                   "fields": {"value": i}, "time": i}
+                  for i in range(20000)]
+        with requests_mock.Mocker() as m:
+            m.register_uri(
+                requests_mock.POST,
+                "http://localhost:8086/write",
+                status_code=204
+            )
+            cli = InfluxDBClient(database='db', compression_level=1)
+            cli.write_points(points)
+
+            chunks = list(m.last_request.body)
+            self.assertGreater(len(chunks), 1)
+            body = zlib.decompress(b''.join(chunks), 16 + zlib.MAX_WBITS)
+            self.assertEqual(body.count(b'\n'), 20000)
+            self.assertTrue(body.startswith(b'cpu,host=0 value=0i 0\n'))
+            # the body can be iterated again when the request is retried
+            self.assertEqual(list(m.last_request.body), chunks)
+
+    def test_write_points_coalesce(self):
+        """Test write points merging the points of a series and time."""
+        points = [
+            {"measurement": "cpu", "tags": {"host": "a"},
+             "fields": {"user": 1.0}, "time": 1},
+            {"measurement": "cpu", "tags": {"host": "b"},
+             "fields": {"user": 2.0}, "time": 1},
+            {"measurement": "cpu", "tags": {"host": "a"},
+             "fields": {"system": 3.0}, "time": 1},
+        ]
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            cli = InfluxDBClient(database='db')
+            cli.write_points(iter(points), tags={"dc": "x"}, coalesce=True,
+                             time_precision='s', batch_size=1)
+            self.assertEqual([r.body for r in m.request_history], [
+                b'cpu,dc=x,host=a system=3.0,user=1.0 1\n',
+                b'cpu,dc=x,host=b user=2.0 1\n',
+            ])
+            self.assertEqual(m.last_request.qs['precision'], ['s'])
+
+        with self.assertRaises(ValueError):
+            cli.write_points(['cpu user=1.0 1'], protocol='line',
+                             coalesce=True)
+
+    def test_write_points_sort_by_series(self):
+        """Test write points grouped by series in time order."""
+        points = [
+            {"measurement": "cpu", "tags": {"host": "b"},
+             "fields": {"value": 1}, "time": 2},
+            {"measurement": "cpu", "tags": {"host": "a"},
+             "fields": {"value": 2}, "time": 3},
+            {"measurement": "cpu", "tags": {"host": "b"},
+             "fields": {"value": 3}, "time": 1},
+            {"measurement": "cpu", "tags": {"host": "a"},
+             "fields": {"value": 4}, "time": 1},
+        ]
+        expected = (
+            b'cpu,host=a value=4i 1\n'
+            b'cpu,host=a value=2i 3\n'
+            b'cpu,host=b value=3i 1\n'
+            b'cpu,host=b value=1i 2\n'
+        )
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            cli = InfluxDBClient(database='db', sort_by_series=True)
+            cli.write_points(iter(points))
+            self.assertEqual(m.last_request.body, expected)
+
+            cli.write_points(['cpu,host=b value=1i 2',
+                              'cpu,host=a value=2i 3',
+                              'cpu,host=b value=3i 1',
+                              'cpu,host=a value=4i 1'], protocol='line')
+            self.assertEqual(m.last_request.body, expected)
+
     def test_write_points_udp(self):
         """Test write points UDP for TestInfluxDBClient object."""
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -259,6 +534,71 @@ class TestInfluxDBClient(unittest.TestCase):
             received_data.decode()
         )
 
+    def test_write_points_udp_payload_size(self):
+        """Test UDP writes split into datagrams at line boundaries."""
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.bind(('127.0.0.1', 0))
+        s.settimeout(5)
+
+        cli = InfluxDBClient('127.0.0.1', use_udp=True,
+                             udp_port=s.getsockname()[1],
+                             udp_payload_size=64)
+        lines = ['m,host=server{0:02d} value={0}i {0}'.format(i)
+                 for i in range(10)]
+        cli.write_points(lines, protocol='line')
+
+        datagrams = []
+        received = b''
+        while received.count(b'\n') < len(lines):
+            data, _addr = s.recvfrom(1024)
+            datagrams.append(data)
+            received += data
+        s.close()
+
+        self.assertEqual(received.decode(), '\n'.join(lines) + '\n')
+        self.assertTrue(all(len(data) <= 64 for data in datagrams))
+        self.assertTrue(all(data.endswith(b'\n') for data in datagrams))
+        stats = cli.udp_stats
+        self.assertEqual(stats['datagrams'], len(datagrams))
+        self.assertEqual(stats['bytes'], len(received))
+        self.assertEqual(stats['dropped_lines'], 0)
+
+    def test_write_points_udp_oversized_line(self):
+        """Test UDP lines too long for a datagram being dropped."""
+        cli = InfluxDBClient('127.0.0.1', use_udp=True, udp_port=4444,
+                             udp_payload_size=32)
+        cli.udp_socket = mock.Mock()
+        cli.write_points(['m value=1i 1',
+                          'm text="{0}" 2'.format('x' * 65507),
+                          'm text="{0}" 3'.format('x' * 40)],
+                         protocol='line')
+        cli.write_points(['m value=4i 4'], protocol='line')
+
+        cli.udp_socket.connect.assert_called_once_with(('127.0.0.1', 4444))
+        sent = [call[0][0] for call in cli.udp_socket.send.call_args_list]
+        self.assertEqual(sent, [
+            b'm value=1i 1\n',
+            'm text="{0}" 3\n'.format('x' * 40).encode(),
+            b'm value=4i 4\n',
+        ])
+        self.assertEqual(cli.udp_stats['dropped_lines'], 1)
+
+    def test_write_points_udp_refused(self):
+        """Test refused UDP datagrams being counted, not raised."""
+        cli = InfluxDBClient('127.0.0.1', use_udp=True, udp_port=4444)
+        cli.udp_socket = mock.Mock()
+        cli.udp_socket.send.side_effect = socket.error(
+            errno.ECONNREFUSED, 'Connection refused')
+        cli.write_points(['m value=1i 1', 'm value=2i 2'], protocol='line')
+        self.assertEqual(cli.udp_stats['send_errors'], 1)
+        self.assertEqual(cli.udp_stats['dropped_lines'], 2)
+        self.assertEqual(cli.udp_stats['datagrams'], 0)
+
+        cli.udp_socket.send.side_effect = socket.error(
+            errno.EMSGSIZE, 'Message too long')
+        with self.assertRaises(socket.error):
+            cli.write_points(['m value=3i 3'], protocol='line')
+
     def test_write_bad_precision_udp(self):
         """Test write bad precision in UDP for TestInfluxDBClient object."""
         cli = InfluxDBClient(
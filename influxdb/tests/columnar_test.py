@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the columnar write API."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+import requests_mock
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from influxdb import InfluxDBClient
+from influxdb.line_protocol import convert_timestamps
+
+skip_if_no_numpy = unittest.skipIf(
+    np is None, "Skipping columnar tests, numpy not found.")
+
+
+@skip_if_no_numpy
+class TestWriteColumns(unittest.TestCase):
+    """Define the write_columns test object."""
+
+    def setUp(self):
+        """Create the client writing the columns."""
+        self.cli = InfluxDBClient(database='db')
+
+    def test_write_columns(self):
+        """Test typed field columns and tag columns."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            self.cli.write_columns(
+                'cpu load',
+                times=np.array([1, 2], dtype='int64'),
+                fields={'value': np.array([0.64, 1.0]),
+                        'count': np.array([3, 4], dtype='int32'),
+                        'up': np.array([True, False]),
+                        'state': np.array(['ok', 'say "hi"'])},
+                tags={'host': np.array(['server 01', 'a,b=c']),
+                      'region': 'us-west'},
+                time_precision='s')
+
+            self.assertEqual(
+                m.last_request.body,
+                b'cpu\\ load,host=server\\ 01,region=us-west '
+                b'count=3i,state="ok",up=True,value=0.64 1\n'
+                b'cpu\\ load,host=a\\,b\\=c,region=us-west '
+                b'count=4i,state="say \\"hi\\"",up=False,value=1.0 2\n'
+            )
+            self.assertEqual(m.last_request.qs['precision'], ['s'])
+
+    def test_datetime64_times(self):
+        """Test datetime64 times are converted to the precision."""
+        times = np.array(['2009-11-10T23:00:00.123456789',
+                          '1969-12-31T23:59:59.5'], dtype='datetime64[ns]')
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            self.cli.write_columns('cpu', times, {'value': np.array([1, 2])},
+                                   time_precision='s')
+            self.assertEqual(m.last_request.body,
+                             b'cpu value=1i 1257894000\n'
+                             b'cpu value=2i 0\n')
+
+            self.cli.write_columns('cpu', times[:1], {'value': np.array([1])})
+            self.assertEqual(m.last_request.body,
+                             b'cpu value=1i 1257894000123456789\n')
+
+    def test_missing_values(self):
+        """Test NaN fields and empty tags are left out."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            self.cli.write_columns(
+                'cpu', None,
+                fields={'a': np.array([np.nan, 1.5, np.nan]),
+                        'b': np.array([2.5, np.inf, np.nan])},
+                tags={'host': np.array(['', 'x', None], dtype=object)})
+
+            self.assertEqual(m.last_request.body,
+                             b'cpu b=2.5\ncpu,host=x a=1.5\n')
+
+    def test_batches(self):
+        """Test the lines are written in batches."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            self.cli.write_columns('cpu', np.arange(5),
+                                   {'value': np.arange(5)}, batch_size=2)
+            self.assertEqual(m.call_count, 3)
+
+    def test_invalid_columns(self):
+        """Test mismatched lengths and unsupported dtypes are rejected."""
+        with requests_mock.Mocker() as m:
+            with self.assertRaises(ValueError):
+                self.cli.write_columns('cpu', np.arange(3),
+                                       {'value': np.arange(2)})
+            with self.assertRaises(ValueError):
+                self.cli.write_columns('cpu', np.arange(2),
+                                       {'value': np.arange(2)},
+                                       tags={'host': np.array(['a'])})
+            with self.assertRaises(TypeError):
+                self.cli.write_columns('cpu', np.array([1.5]),
+                                       {'value': np.arange(1)})
+            with self.assertRaises(ValueError):
+                self.cli.write_columns('cpu', np.arange(1),
+                                       {'value': np.arange(1)},
+                                       time_precision='g')
+            self.assertEqual(m.call_count, 0)
+
+
+@skip_if_no_numpy
+class TestConvertTimestamps(unittest.TestCase):
+    """Define the datetime64 convert_timestamps test object."""
+
+    def test_datetime64_array(self):
+        """Test a datetime64 array being converted as a whole."""
+        times = np.array(['2009-11-10T23:00:00.123456789',
+                          '1969-12-31T23:59:59.5'], dtype='datetime64[ns]')
+        self.assertEqual(convert_timestamps(times),
+                         [1257894000123456789, -500000000])
+        self.assertEqual(convert_timestamps(times, 's'), [1257894000, 0])
+        with self.assertRaises(ValueError):
+            convert_timestamps(np.array(['NaT'], dtype='datetime64[ns]'))
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the GeventInfluxDBClient.
+
+All the responses are mocked, no server instance is needed.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+import mock
+import requests
+import requests_mock
+
+try:
+    import gevent
+except ImportError:
+    gevent = None
+
+from influxdb import GeventInfluxDBClient
+from influxdb.exceptions import InfluxDBClientError
+from influxdb.tests.server_tests.standin_server import StandInServer
+
+skip_if_no_gevent = unittest.skipIf(
+    gevent is None, "Skipping gevent tests, gevent not found.")
+
+
+@skip_if_no_gevent
+class TestGeventInfluxDBClient(unittest.TestCase):
+    """Set up the TestGeventInfluxDBClient object."""
+
+    def setUp(self):
+        """Initialize the points used by the tests."""
+        self.dummy_points = [
+            {
+                "measurement": "cpu_load_short",
+                "tags": {"host": "server01"},
+                "time": "2009-11-10T23:00:00Z",
+                "fields": {"value": 0.64}
+            }
+        ]
+
+    def test_write_points(self):
+        """Test write points through a pooled session."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            cli = GeventInfluxDBClient(database='db')
+            cli.write_points(self.dummy_points)
+
+            self.assertEqual(
+                b'cpu_load_short,host=server01 value=0.64 '
+                b'1257894000000000000\n',
+                m.last_request.body
+            )
+
+    def test_pool_is_bounded(self):
+        """Test no more than pool_size requests are in flight at once."""
+        state = {'in_flight': 0, 'max_in_flight': 0}
+
+        def slow_request(*args, **kwargs):
+            state['in_flight'] += 1
+            state['max_in_flight'] = max(state['max_in_flight'],
+                                         state['in_flight'])
+            gevent.sleep(0.01)
+            state['in_flight'] -= 1
+            response = requests.Response()
+            response.status_code = 204
+            return response
+
+        cli = GeventInfluxDBClient(database='db', pool_size=3)
+        with mock.patch('influxdb.gevent_client._PooledSession.request',
+                        side_effect=slow_request) as request:
+            greenlets = [gevent.spawn(cli.write_points, self.dummy_points)
+                         for _ in range(12)]
+            gevent.joinall(greenlets, raise_error=True)
+
+        self.assertEqual(request.call_count, 12)
+        self.assertEqual(state['max_in_flight'], 3)
+        self.assertEqual(cli._idle_sessions.qsize(), 3)
+
+    def test_pool_timeout(self):
+        """Test a greenlet gives up when no connection frees up in time."""
+        cli = GeventInfluxDBClient(database='db', pool_size=1,
+                                   pool_timeout=0.01)
+        cli._pool_slots.acquire()
+        with self.assertRaises(InfluxDBClientError):
+            cli.query('SHOW DATABASES')
+
+    def test_pool_size_is_forwarded(self):
+        """Test the shared session being sized by pool_size."""
+        cli = GeventInfluxDBClient(pool_size=25)
+        adapter = cli._shared_session.get_adapter('http://localhost:8086')
+        self.assertEqual(adapter._pool_maxsize, 25)
+        cli.close()
+
+    def test_invalid_pool_size(self):
+        """Test the pool size must be positive."""
+        with self.assertRaises(ValueError):
+            GeventInfluxDBClient(pool_size=0)
+
+    def test_udp_socket_is_cooperative(self):
+        """Test the UDP socket is a gevent socket."""
+        cli = GeventInfluxDBClient(use_udp=True, udp_port=4444)
+        self.assertIsInstance(cli.udp_socket, gevent.socket.socket)
+        cli.close()
+
+    def test_unpatched_concurrency(self):
+        """Test unpatched requests running up to pool_size at once."""
+        self.assertFalse(gevent.monkey.is_module_patched('socket'))
+        with StandInServer(delay=0.5) as server:
+            cli = GeventInfluxDBClient(server.host, server.port,
+                                       pool_size=30)
+            greenlets = [gevent.spawn(cli.ping) for _ in range(30)]
+            gevent.joinall(greenlets, raise_error=True)
+            cli.close()
+        # the pings wait on the server together, not 10 at a time
+        self.assertEqual(server.requests, 30)
+        self.assertGreater(server.max_in_flight, 10)
+        self.assertLessEqual(server.max_in_flight, 30)
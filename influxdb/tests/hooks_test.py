@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the request hooks."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+import mock
+import requests.exceptions
+import requests_mock
+
+from influxdb import InfluxDBClient
+from influxdb.exceptions import InfluxDBClientError
+
+
+class TestRequestHooks(unittest.TestCase):
+    """Define the request hooks test object."""
+
+    def setUp(self):
+        """Create a client recording what its hooks see."""
+        self.cli = InfluxDBClient(database='db')
+        self.events = []
+
+        def before(info):
+            info.context['seen'] = True
+            self.events.append(('before', info.path, info.attempt,
+                                info.status_code))
+
+        def after(info):
+            self.events.append(('after', info.path, info.attempt,
+                                info.status_code))
+            self.infos.append(info)
+
+        self.before = before
+        self.after = after
+        self.infos = []
+        self.cli.add_hook('before_request', before)
+        self.cli.add_hook('after_response', after)
+
+    def test_write_and_query(self):
+        """Test the hooks seeing the writes and the queries."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            m.register_uri(requests_mock.GET,
+                           "http://localhost:8086/query",
+                           text='{"results": [{"statement_id": 0}]}')
+            self.cli.write_points(['cpu value=1'], protocol='line')
+            self.cli.query('SELECT * FROM cpu')
+
+        self.assertEqual(self.events, [
+            ('before', 'write', 1, None), ('after', 'write', 1, 204),
+            ('before', 'query', 1, None), ('after', 'query', 1, 200)])
+        write, query = self.infos
+        self.assertEqual(write.method, 'POST')
+        self.assertEqual(write.request_bytes, 12)
+        self.assertEqual(write.response_bytes, 0)
+        self.assertIsNone(write.query)
+        self.assertTrue(write.context['seen'])
+        self.assertGreaterEqual(write.elapsed, 0)
+        self.assertEqual(query.query, 'SELECT * FROM cpu')
+        self.assertEqual(query.params['db'], 'db')
+        self.assertEqual(query.response_bytes, 34)
+        self.assertIsNone(query.error)
+
+    def test_retries_and_errors(self):
+        """Test every attempt being seen, with its error if any."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(
+                requests_mock.POST, "http://localhost:8086/write",
+                [{'exc': requests.exceptions.ConnectionError},
+                 {'status_code': 400, 'text': '{"error": "bad"}'}])
+            with self.assertRaises(InfluxDBClientError):
+                self.cli.write_points(['cpu value=1'], protocol='line')
+
+        self.assertEqual(self.events, [
+            ('before', 'write', 1, None), ('after', 'write', 1, None),
+            ('before', 'write', 2, None), ('after', 'write', 2, 400)])
+        self.assertIsInstance(self.infos[0].error,
+                              requests.exceptions.ConnectionError)
+        self.assertIsNone(self.infos[0].response)
+
+    def test_failing_hook(self):
+        """Test the errors of the hooks being logged, not raised."""
+        self.cli.add_hook('before_request', mock.Mock(side_effect=KeyError))
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            with mock.patch('influxdb.client.log') as log:
+                self.cli.write_points(['cpu value=1'], protocol='line')
+        self.assertTrue(log.exception.called)
+        self.assertEqual(len(self.infos), 1)
+
+    def test_remove_hook(self):
+        """Test the hooks being removed."""
+        self.cli.remove_hook('before_request', self.before)
+        self.cli.remove_hook('after_response', self.after)
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            self.cli.write_points(['cpu value=1'], protocol='line')
+        self.assertEqual(self.events, [])
+
+        with self.assertRaises(ValueError):
+            self.cli.remove_hook('after_response', self.after)
+        with self.assertRaises(ValueError):
+            self.cli.add_hook('on_error', self.after)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the clients of several InfluxDB hosts."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import time
+import unittest
+
+import requests.exceptions
+import requests_mock
+
+from influxdb import InfluxDBClient
+from influxdb._balancer import Endpoint, HostPool, base_url, is_read_query
+from influxdb._balancer import parse_host
+
+_QUERY_RESPONSE = {'results': [{}]}
+
+
+class TestHostPool(unittest.TestCase):
+    """Define the HostPool test object."""
+
+    def test_parse_host(self):
+        """Test the host formats."""
+        self.assertEqual(parse_host('a'), ('a', 8086))
+        self.assertEqual(parse_host('a:1'), ('a', 1))
+        self.assertEqual(parse_host(('a', '2')), ('a', 2))
+        self.assertEqual(parse_host('[::1]:3'), ('::1', 3))
+        self.assertEqual(parse_host('[::1]'), ('::1', 8086))
+
+    def test_base_url(self):
+        """Test IPv6 addresses are bracketed in URLs."""
+        self.assertEqual(base_url('http', 'a', 1), 'http://a:1')
+        self.assertEqual(base_url('https', '::1', 2), 'https://[::1]:2')
+
+    def test_is_read_query(self):
+        """Test only SELECT and SHOW statements without INTO are reads."""
+        self.assertTrue(is_read_query('SELECT * FROM cpu'))
+        self.assertTrue(is_read_query(' show databases; SELECT 1 FROM a;'))
+        self.assertFalse(is_read_query('SELECT * INTO b FROM a'))
+        self.assertFalse(is_read_query('SHOW DATABASES; DROP DATABASE "a"'))
+        self.assertFalse(is_read_query('CREATE USER "u" WITH PASSWORD \'p\''))
+        self.assertFalse(is_read_query(''))
+        self.assertFalse(is_read_query(None))
+
+    def test_round_robin(self):
+        """Test the healthy hosts are used in turn."""
+        endpoints = [Endpoint(url) for url in 'abc']
+        pool = HostPool(endpoints)
+        picked = []
+        for _ in range(6):
+            endpoint = pool.acquire()
+            picked.append(endpoint.url)
+            pool.release(endpoint)
+        self.assertEqual(sorted(picked), list('aabbcc'))
+
+        pool.release(pool.acquire(), failed=True)
+        down = [e.url for e in endpoints if not e.healthy]
+        self.assertEqual(len(down), 1)
+        for _ in range(4):
+            self.assertNotEqual(pool.acquire().url, down[0])
+
+    def test_least_outstanding(self):
+        """Test the host with the fewest requests in flight is used."""
+        endpoints = [Endpoint(url) for url in 'abc']
+        pool = HostPool(endpoints, 'least_outstanding')
+        busy = [pool.acquire() for _ in range(3)]
+        self.assertEqual(sorted(e.url for e in busy), list('abc'))
+        pool.release(busy[1])
+        self.assertIs(pool.acquire(), busy[1])
+
+    def test_all_hosts_down(self):
+        """Test the hosts are all tried when none is healthy."""
+        endpoint = Endpoint('a')
+        endpoint.healthy = False
+        self.assertIs(HostPool([endpoint]).acquire(), endpoint)
+
+    def test_invalid_strategy(self):
+        """Test the load balancing strategy is validated."""
+        with self.assertRaises(ValueError):
+            HostPool([Endpoint('a')], 'random')
+
+
+class TestMultiHostClient(unittest.TestCase):
+    """Define the test object of a client of several hosts."""
+
+    def test_queries_are_balanced(self):
+        """Test queries go to the hosts in turn, writes to write_hosts."""
+        cli = InfluxDBClient(hosts=['h1:8086', 'h2:8087'],
+                             write_hosts=['w1'], database='db',
+                             health_check_interval=None)
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.GET, requests_mock.ANY,
+                           json=_QUERY_RESPONSE)
+            m.register_uri(requests_mock.POST, requests_mock.ANY,
+                           status_code=204)
+            for _ in range(4):
+                cli.query('SELECT * FROM cpu')
+            cli.write_points(['cpu value=1'], protocol='line')
+
+            netlocs = [r.netloc for r in m.request_history]
+        self.assertEqual(sorted(netlocs[:4]),
+                         ['h1:8086', 'h1:8086', 'h2:8087', 'h2:8087'])
+        self.assertEqual(netlocs[4], 'w1:8086')
+
+    def test_statements_reach_write_hosts(self):
+        """Test the statements changing data go to write_hosts."""
+        cli = InfluxDBClient(hosts=['replica1', 'replica2'],
+                             write_hosts=['writer'], database='db',
+                             health_check_interval=None)
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.ANY, requests_mock.ANY,
+                           json=_QUERY_RESPONSE)
+            cli.create_database('other')
+            cli.create_user('user', 'password')
+            cli.query('DROP MEASUREMENT cpu')
+            cli.query('SELECT * INTO cpu_1h FROM cpu')
+            cli.query('SHOW MEASUREMENTS')
+
+            netlocs = [r.netloc for r in m.request_history]
+        self.assertEqual(netlocs[:4], ['writer:8086'] * 4)
+        self.assertIn(netlocs[4], ('replica1:8086', 'replica2:8086'))
+
+    def test_ipv6_hosts(self):
+        """Test the URLs of IPv6 hosts keep their brackets."""
+        cli = InfluxDBClient(hosts=['[::1]:8086', '[::2]'],
+                             health_check_interval=None)
+        self.assertEqual([e.url for e in cli._read_hosts.endpoints],
+                         ['http://[::1]:8086', 'http://[::2]:8086'])
+
+    def test_failover(self):
+        """Test a failing host is ejected and the request sent elsewhere."""
+        cli = InfluxDBClient(hosts=['h1', 'h2'], database='db',
+                             health_check_interval=None)
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.GET, 'http://h1:8086/query',
+                           exc=requests.exceptions.ConnectionError)
+            m.register_uri(requests_mock.GET, 'http://h2:8086/query',
+                           json=_QUERY_RESPONSE)
+            for _ in range(3):
+                cli.query('SELECT * FROM cpu')
+            netlocs = [r.netloc for r in m.request_history]
+
+        self.assertLessEqual(netlocs.count('h1:8086'), 1)
+        self.assertEqual(netlocs.count('h2:8086'), 3)
+        self.assertEqual([e.healthy for e in cli._read_hosts.endpoints],
+                         [False, True])
+
+    def test_health_checks(self):
+        """Test ejected hosts are readmitted once they answer a ping."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.GET, 'http://h1:8086/ping',
+                           status_code=204)
+            m.register_uri(requests_mock.GET, 'http://h2:8086/ping',
+                           exc=requests.exceptions.ConnectionError)
+            cli = InfluxDBClient(hosts=['h1', 'h2'],
+                                 health_check_interval=0.01)
+            h1, h2 = cli._read_hosts.endpoints
+            h1.healthy = False
+
+            deadline = time.time() + 5
+            while (not h1.healthy or h2.healthy) and time.time() < deadline:
+                time.sleep(0.01)
+            cli.close()
+
+        self.assertTrue(h1.healthy)
+        self.assertFalse(h2.healthy)
+
+    def test_from_dsn(self):
+        """Test a DSN with several hosts."""
+        cli = InfluxDBClient.from_dsn('influxdb://u:p@h1:1886,h2:1887/db',
+                                      health_check_interval=None)
+        self.assertEqual('http://h1:1886', cli._baseurl)
+        self.assertEqual([e.url for e in cli._read_hosts.endpoints],
+                         ['http://h1:1886', 'http://h2:1887'])
+        self.assertIs(cli._read_hosts.endpoints[1],
+                      cli._write_hosts.endpoints[1])
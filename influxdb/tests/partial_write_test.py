@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the handling of partial writes."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import unittest
+
+import requests_mock
+
+from influxdb import InfluxDBClient
+from influxdb._partial_write import parse_write_error
+from influxdb.exceptions import (InfluxDBClientError,
+                                 InfluxDBPartialWriteError, WriteFailure)
+
+_LINES = [b'cpu,host=a value=1 1',
+          b'cpu,host=b value="high" 2',
+          b'cpu value= 3',
+          b'mem free=5i 4']
+
+_TYPE_CONFLICT = ('partial write: field type conflict: input field "value" '
+                  'on measurement "cpu" is type string, already exists as '
+                  'type float dropped=1')
+_UNABLE_TO_PARSE = "unable to parse 'cpu value= 3': missing field value"
+
+
+def _error(message, code=400):
+    return InfluxDBClientError(json.dumps({'error': message}), code)
+
+
+class TestParseWriteError(unittest.TestCase):
+    """Define the test object of the parsing of write errors."""
+
+    def test_type_conflict(self):
+        """Test a field type conflict is traced to its lines."""
+        error = parse_write_error(_error(_TYPE_CONFLICT), _LINES)
+        self.assertIsInstance(error, InfluxDBPartialWriteError)
+        self.assertEqual(error.code, 400)
+        self.assertEqual(error.dropped, 1)
+        self.assertEqual([f.line for f in error.failures], [_LINES[1]])
+        self.assertTrue(error.failures[0].reason.startswith(
+            'field type conflict: input field "value"'))
+
+    def test_unable_to_parse(self):
+        """Test every unparsable line is reported."""
+        message = "\n".join([_UNABLE_TO_PARSE,
+                             "unable to parse 'x': invalid field format"])
+        error = parse_write_error(_error(message), _LINES)
+        self.assertEqual(error.failures, [
+            WriteFailure(b'cpu value= 3', 'missing field value'),
+            WriteFailure(None, 'invalid field format'),
+        ])
+        self.assertIsNone(error.dropped)
+
+    def test_untraceable_failure(self):
+        """Test failures without a line are kept with their reason."""
+        error = parse_write_error(
+            _error('partial write: points beyond retention policy '
+                   'dropped=2'), _LINES)
+        self.assertEqual(error.failures, [
+            WriteFailure(None, 'points beyond retention policy')])
+        self.assertEqual(error.dropped, 2)
+
+    def test_other_errors(self):
+        """Test errors other than partial writes are left alone."""
+        self.assertIsNone(parse_write_error(_error('database not found'),
+                                            _LINES))
+        self.assertIsNone(parse_write_error(_error(_TYPE_CONFLICT, 404),
+                                            _LINES))
+        self.assertIsNotNone(parse_write_error(
+            InfluxDBClientError(_UNABLE_TO_PARSE, 400), _LINES))
+
+
+class TestClientPartialWrites(unittest.TestCase):
+    """Define the test object of partial writes through the client."""
+
+    def write(self, cli, responses):
+        """Write _LINES with the given responses, return the bodies sent."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           responses)
+            try:
+                cli.write_points(_LINES, protocol='line')
+            finally:
+                bodies = [r.body for r in m.request_history]
+        return bodies
+
+    def test_raise(self):
+        """Test the default is to raise the rejected points."""
+        cli = InfluxDBClient(database='db')
+        with self.assertRaises(InfluxDBPartialWriteError) as ctx:
+            self.write(cli, [{'status_code': 400,
+                              'json': {'error': _UNABLE_TO_PARSE}}])
+        self.assertEqual(ctx.exception.failures,
+                         [WriteFailure(b'cpu value= 3',
+                                       'missing field value')])
+
+    def test_drop(self):
+        """Test the other lines are sent again without the rejected ones."""
+        cli = InfluxDBClient(database='db', partial_writes='drop')
+        bodies = self.write(cli, [{'status_code': 400,
+                                   'json': {'error': _TYPE_CONFLICT}},
+                                  {'status_code': 204}])
+        self.assertEqual(bodies[1], b'cpu,host=a value=1 1\n'
+                                    b'cpu value= 3\n'
+                                    b'mem free=5i 4\n')
+
+    def test_quarantine(self):
+        """Test a callable receives the rejected points."""
+        quarantined = []
+        cli = InfluxDBClient(database='db',
+                             partial_writes=quarantined.extend)
+        bodies = self.write(cli, [{'status_code': 400,
+                                   'json': {'error': _UNABLE_TO_PARSE}},
+                                  {'status_code': 204}])
+        self.assertEqual([f.line for f in quarantined], [b'cpu value= 3'])
+        self.assertNotIn(b'cpu value= 3', bodies[1])
+        self.assertEqual(bodies[1].count(b'\n'), 3)
+
+    def test_untraceable_failures_raise(self):
+        """Test nothing is sent again when a failure has no line."""
+        cli = InfluxDBClient(database='db', partial_writes='drop')
+        with self.assertRaises(InfluxDBPartialWriteError):
+            self.write(cli, [{'status_code': 400,
+                              'json': {'error': 'partial write: points '
+                                                'beyond retention policy '
+                                                'dropped=1'}},
+                             {'status_code': 204}])
+
+    def test_invalid_option(self):
+        """Test partial_writes is validated."""
+        with self.assertRaises(ValueError):
+            InfluxDBClient(partial_writes='ignore')
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the Point class."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from datetime import datetime
+import unittest
+
+import mock
+import requests_mock
+
+from influxdb import InfluxDBClient, Point
+from influxdb import line_protocol
+
+
+class TestPoint(unittest.TestCase):
+    """Define the Point test object."""
+
+    def test_builder(self):
+        """Test building a point step by step."""
+        point = Point('cpu load') \
+            .tag('region', 'us-west') \
+            .tag('host', 'server01') \
+            .field('value', 0.64) \
+            .field('count', 3) \
+            .field('value', 0.65) \
+            .time('2009-11-10T23:00:00.123456789Z')
+
+        self.assertEqual(point.measurement, 'cpu load')
+        self.assertEqual(point.tags,
+                         (('host', 'server01'), ('region', 'us-west')))
+        self.assertEqual(point.fields, (('count', 3), ('value', 0.65)))
+        self.assertEqual(point.timestamp, 1257894000123456789)
+        self.assertEqual(
+            point.to_line(),
+            b'cpu\\ load,host=server01,region=us-west count=3i,value=0.65 '
+            b'1257894000123456789\n'
+        )
+        self.assertEqual(
+            point.to_line('ms'),
+            b'cpu\\ load,host=server01,region=us-west count=3i,value=0.65 '
+            b'1257894000123\n'
+        )
+
+    def test_constructor(self):
+        """Test building a point in one call."""
+        point = Point('cpu', tags={'host': 'a'}, fields={'value': 1},
+                      time=1257894000, time_precision='s')
+        self.assertEqual(point.timestamp, 1257894000000000000)
+        self.assertEqual(point.to_line('s'),
+                         b'cpu,host=a value=1i 1257894000\n')
+        self.assertEqual(Point('cpu', time=datetime(1970, 1, 1, 0, 0, 1))
+                         .timestamp, 10 ** 9)
+
+        with self.assertRaises(ValueError):
+            Point('cpu', time=1, time_precision='g')
+        with self.assertRaises(ValueError):
+            Point('cpu', time=1)
+
+    def test_line_is_cached(self):
+        """Test the serialized line is reused until the point changes."""
+        point = Point('cpu').field('value', 1).time(1, 'n')
+        line = point.to_line()
+        with mock.patch('influxdb.point._encode_fields') as encode:
+            self.assertIs(point.to_line(), line)
+            self.assertFalse(encode.called)
+
+        point.field('value', 2)
+        self.assertEqual(point.to_line(), b'cpu value=2i 1\n')
+
+    def test_static_tags(self):
+        """Test the tags of the point override the static tags."""
+        point = Point('cpu', tags={'host': 'a'}, fields={'value': 1})
+        self.assertEqual(point.to_line(tags={'host': 'b', 'region': 'eu'}),
+                         b'cpu,host=a,region=eu value=1i\n')
+        self.assertEqual(point.to_line(), b'cpu,host=a value=1i\n')
+
+    def test_mixed_with_dicts(self):
+        """Test make_lines accepts points and dicts together."""
+        data = {'points': [
+            Point('cpu').field('value', 1).time(1, 'n'),
+            {'measurement': 'cpu', 'fields': {'value': 2}, 'time': 2},
+        ]}
+        self.assertEqual(line_protocol.make_lines(data),
+                         'cpu value=1i 1\ncpu value=2i 2\n')
+
+    def test_integer_time_precision(self):
+        """Test integer times written like the equivalent dicts."""
+        data = {'points': [
+            Point('cpu', fields={'value': 1}, time=1500000000,
+                  time_precision='s'),
+            {'measurement': 'cpu', 'fields': {'value': 1},
+             'time': 1500000000},
+        ]}
+        self.assertEqual(line_protocol.make_lines(data, precision='s'),
+                         'cpu value=1i 1500000000\n' * 2)
+        self.assertEqual(line_protocol.make_lines(data, precision='ms'),
+                         'cpu value=1i 1500000000000\n'
+                         'cpu value=1i 1500000000\n')
+
+    def test_as_dict(self):
+        """Test converting a point to its dict representation."""
+        point = Point('cpu', tags={'host': 'a'}, fields={'value': 1}, time=5,
+                      time_precision='n')
+        self.assertEqual(point.as_dict(), {'measurement': 'cpu',
+                                           'tags': {'host': 'a'},
+                                           'fields': {'value': 1},
+                                           'time': 5})
+
+    def test_write_points(self):
+        """Test write_points accepts points."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            cli = InfluxDBClient(database='db')
+            cli.write_points([Point('cpu').field('value', 0.64)
+                              .time('2009-11-10T23:00:00Z')],
+                             time_precision='s', tags={'host': 'a'})
+
+            self.assertEqual(m.last_request.body,
+                             b'cpu,host=a value=0.64 1257894000\n')
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Unit tests of the fast write transport."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import base64
+import json
+import threading
+import unittest
+import zlib
+
+import requests.exceptions
+from six.moves import BaseHTTPServer, socketserver
+
+from influxdb import InfluxDBClient
+from influxdb.exceptions import InfluxDBClientError, InfluxDBServerError
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code, body=b'', chunked=False):
+        self.send_response(code)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for i in range(0, len(body), 4):
+                chunk = body[i:i + 4]
+                self.wfile.write('{0:x}\r\n'.format(len(chunk)).encode())
+                self.wfile.write(chunk + b'\r\n')
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        if self.server.close_after_reply:
+            # close the connection without telling the client
+            self.close_connection = True
+
+    def do_GET(self):
+        self.server.requests.append((self.command, self.path,
+                                     dict(self.headers), None))
+        self._reply(200, b'{"results": [{"statement_id": 0}]}')
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding') != 'chunked':
+            return self.rfile.read(int(self.headers['Content-Length']))
+        chunks = []
+        while True:
+            size = int(self.rfile.readline(), 16)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+            if not size:
+                return b''.join(chunks)
+
+    def do_POST(self):
+        body = self._read_body()
+        self.server.requests.append((self.command, self.path,
+                                     dict(self.headers), body))
+        status, content, chunked = self.server.reply
+        self._reply(status, content, chunked)
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.requests = []
+        self.connections = 0
+        self.reply = (204, b'', False)
+        self.close_after_reply = False
+
+    def get_request(self):
+        request = BaseHTTPServer.HTTPServer.get_request(self)
+        self.connections += 1
+        return request
+
+
+class TestRawHTTPWriter(unittest.TestCase):
+    """Test the writes sent with fast_writes."""
+
+    def setUp(self):
+        """Start a HTTP server and a client using the fast writes."""
+        self.server = _HTTPServer()
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       args=(0.05,))
+        self.thread.daemon = True
+        self.thread.start()
+        self.cli = InfluxDBClient('127.0.0.1', self.server.server_port,
+                                  'usr', 'pwd', 'db', fast_writes=True)
+
+    def tearDown(self):
+        """Stop the client and the server."""
+        self.cli.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_write_keep_alive(self):
+        """Test writes sharing one connection, queries using requests."""
+        for i in range(3):
+            self.cli.write_points(['cpu value={0}'.format(i)],
+                                  protocol='line', time_precision='s')
+        self.cli.query('SELECT * FROM cpu')
+
+        writes = self.server.requests[:3]
+        self.assertEqual([body for _, _, _, body in writes],
+                         [b'cpu value=0\n', b'cpu value=1\n',
+                          b'cpu value=2\n'])
+        method, path, headers, _ = writes[0]
+        self.assertEqual(method, 'POST')
+        self.assertEqual(path, '/write?db=db&precision=s')
+        self.assertEqual(headers['Authorization'], 'Basic {0}'.format(
+            base64.b64encode(b'usr:pwd').decode()))
+        self.assertEqual(headers['Content-type'], 'application/octet-stream')
+        self.assertEqual(headers['Host'], '127.0.0.1:{0}'.format(
+            self.server.server_port))
+        self.assertEqual(self.server.requests[3][0], 'GET')
+        self.assertIn('python-requests',
+                      self.server.requests[3][2]['User-Agent'])
+        # one connection for the writes, one for the query
+        self.assertEqual(self.server.connections, 2)
+
+    def test_write_gzip(self):
+        """Test gzip compressed bodies being sent with a Content-Length."""
+        self.cli._gzip = True
+        self.cli.write_points(['cpu value=1'], protocol='line')
+        _, _, headers, body = self.server.requests[0]
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(zlib.decompress(body, 16 + zlib.MAX_WBITS),
+                         b'cpu value=1\n')
+
+    def test_write_stream_uses_requests(self):
+        """Test streamed bodies falling back to requests."""
+        self.cli.write_points(iter(['cpu value=1']), protocol='line')
+        self.assertIn('python-requests',
+                      self.server.requests[0][2]['User-Agent'])
+
+    def test_stale_connection(self):
+        """Test a write resent when its kept-alive connection was closed."""
+        self.server.close_after_reply = True
+        self.cli.write_points(['cpu value=1'], protocol='line')
+        self.cli.write_points(['cpu value=2'], protocol='line')
+        self.assertEqual([r[3] for r in self.server.requests],
+                         [b'cpu value=1\n', b'cpu value=2\n'])
+        self.assertEqual(self.server.connections, 2)
+
+    def test_client_error(self):
+        """Test an error response being raised, chunked or not."""
+        error = json.dumps({'error': 'database not found'}).encode()
+        for chunked in (False, True):
+            self.server.reply = (404, error, chunked)
+            with self.assertRaises(InfluxDBClientError) as ctx:
+                self.cli.write_points(['cpu value=1'], protocol='line')
+            self.assertEqual(ctx.exception.code, 404)
+            self.assertIn('database not found', ctx.exception.content)
+
+        self.server.reply = (500, error, False)
+        with self.assertRaises(InfluxDBServerError):
+            self.cli.write_points(['cpu value=1'], protocol='line')
+
+        self.server.reply = (204, b'', False)
+        self.cli.write_points(['cpu value=1'], protocol='line')
+        self.assertEqual(self.server.connections, 1)
+
+    def test_connection_refused(self):
+        """Test a server that cannot be reached."""
+        port = self.server.server_port
+        self.tearDown()
+        cli = InfluxDBClient('127.0.0.1', port, fast_writes=True, retries=2)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            cli.write_points(['cpu value=1'], protocol='line')
+        self.setUp()
+
+    def test_stats(self):
+        """Test the send and server times being told apart."""
+        cli = InfluxDBClient('127.0.0.1', self.server.server_port,
+                             database='db', fast_writes=True, stats=True)
+        cli.write_points(['cpu value=1'], protocol='line')
+        stages = cli.stats.snapshot()['stages']
+        cli.close()
+        self.assertEqual(stages['send']['count'], 1)
+        self.assertEqual(stages['server']['count'], 1)
+
+    def test_incompatible_options(self):
+        """Test fast_writes being refused with ssl or proxies."""
+        with self.assertRaises(ValueError):
+            InfluxDBClient(ssl=True, fast_writes=True)
+        with self.assertRaises(ValueError):
+            InfluxDBClient(proxies={'http': 'http://proxy'},
+                           fast_writes=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the RetryPolicy."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+from email.utils import formatdate
+import time
+
+import mock
+import requests
+import requests.exceptions
+import requests_mock
+
+from influxdb import InfluxDBClient, RetryPolicy
+from influxdb.exceptions import InfluxDBServerError
+
+
+def _response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Define the RetryPolicy test object."""
+
+    def test_default_policy(self):
+        """Test the default policy retries connection errors at once."""
+        policy = RetryPolicy()
+        error = requests.exceptions.ConnectionError()
+        self.assertEqual(policy.delay(1, 0, error), 0)
+        self.assertEqual(policy.delay(2, 0, error), 0)
+        self.assertIsNone(policy.delay(3, 0, error))
+        timeout = requests.exceptions.ReadTimeout()
+        self.assertIsNone(policy.delay(1, 0, timeout))
+        self.assertIsNone(policy.delay(1, 0, response=_response(503)))
+
+    def test_unlimited_attempts(self):
+        """Test attempts=0 never gives up."""
+        policy = RetryPolicy(attempts=0)
+        self.assertEqual(
+            policy.delay(1000, 0, requests.exceptions.ConnectionError()), 0)
+
+    def test_exponential_backoff(self):
+        """Test the backoff doubles up to backoff_max."""
+        policy = RetryPolicy(attempts=0, backoff_factor=0.5, backoff_max=3)
+        self.assertEqual([policy.backoff(i) for i in range(1, 6)],
+                         [0.5, 1, 2, 3, 3])
+
+    def test_jitter(self):
+        """Test the jittered backoff stays between 0 and the backoff."""
+        policy = RetryPolicy(backoff_factor=1, jitter=True)
+        with mock.patch('random.uniform', return_value=0.25) as uniform:
+            self.assertEqual(policy.backoff(3), 0.25)
+        uniform.assert_called_once_with(0, 4)
+
+    def test_status_and_timeouts(self):
+        """Test status_forcelist and retry_timeouts."""
+        policy = RetryPolicy(status_forcelist=[503], retry_timeouts=True)
+        self.assertEqual(policy.delay(1, 0, response=_response(503)), 0)
+        self.assertIsNone(policy.delay(1, 0, response=_response(500)))
+        self.assertEqual(
+            policy.delay(1, 0, requests.exceptions.ReadTimeout()), 0)
+
+    def test_retry_after(self):
+        """Test the Retry-After header lengthens the delay."""
+        policy = RetryPolicy(backoff_factor=1, status_forcelist=[429, 503])
+        self.assertEqual(
+            policy.delay(1, 0, response=_response(429, {'Retry-After': '7'})),
+            7)
+        self.assertEqual(
+            policy.delay(1, 0, response=_response(429, {'Retry-After': '0'})),
+            1)
+        date = formatdate(time.time() + 60, usegmt=True)
+        delay = policy.delay(1, 0,
+                             response=_response(503, {'Retry-After': date}))
+        self.assertTrue(55 < delay <= 60)
+
+        policy.respect_retry_after = False
+        self.assertEqual(
+            policy.delay(1, 0, response=_response(429, {'Retry-After': '7'})),
+            1)
+
+    def test_max_elapsed(self):
+        """Test no retry starts after max_elapsed seconds."""
+        policy = RetryPolicy(attempts=0, backoff_factor=1, max_elapsed=10)
+        error = requests.exceptions.ConnectionError()
+        self.assertEqual(policy.delay(2, 7, error), 2)
+        self.assertIsNone(policy.delay(3, 7, error))
+
+
+class TestClientRetries(unittest.TestCase):
+    """Define the test object of the retries of the client."""
+
+    def setUp(self):
+        """Initialize the points used by the tests."""
+        self.points = [{"measurement": "cpu", "fields": {"value": 1}}]
+
+    @mock.patch.object(InfluxDBClient, '_sleep')
+    def test_retry_server_errors(self, sleep):
+        """Test a write policy retries 5xx responses with backoff."""
+        policy = RetryPolicy(attempts=4, backoff_factor=0.1,
+                             status_forcelist=[503])
+        cli = InfluxDBClient(database='db', write_retry_policy=policy)
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           [{'status_code': 503},
+                            {'status_code': 503},
+                            {'status_code': 204}])
+            cli.write_points(self.points)
+            self.assertEqual(m.call_count, 3)
+        self.assertEqual(sleep.call_args_list,
+                         [mock.call(0.1), mock.call(0.2)])
+
+    @mock.patch.object(InfluxDBClient, '_sleep')
+    def test_give_up(self, sleep):
+        """Test the last error is raised once the attempts are exhausted."""
+        policy = RetryPolicy(attempts=2, status_forcelist=[503])
+        cli = InfluxDBClient(database='db', write_retry_policy=policy)
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=503)
+            with self.assertRaises(InfluxDBServerError):
+                cli.write_points(self.points)
+            self.assertEqual(m.call_count, 2)
+
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           exc=requests.exceptions.ReadTimeout)
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                cli.write_points(self.points)
+            self.assertEqual(m.call_count, 3)
+        self.assertFalse(sleep.called)
+
+    def test_query_policy(self):
+        """Test queries use their own policy."""
+        cli = InfluxDBClient(
+            database='db',
+            write_retry_policy=RetryPolicy(attempts=1),
+            query_retry_policy=RetryPolicy(retry_timeouts=True))
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.GET,
+                           "http://localhost:8086/query",
+                           [{'exc': requests.exceptions.ReadTimeout},
+                            {'json': {'results': [{}]}}])
+            cli.query('SELECT * FROM cpu')
+            self.assertEqual(m.call_count, 2)
+
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           exc=requests.exceptions.ConnectionError)
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                cli.write_points(self.points)
+            self.assertEqual(m.call_count, 3)
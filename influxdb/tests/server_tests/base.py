@@ -10,6 +10,7 @@ import sys
 
 from influxdb.tests import using_pypy
 from influxdb.tests.server_tests.influxdb_instance import InfluxDbInstance
+from influxdb.tests.server_tests.standin_server import StandInServer
 
 from influxdb.client import InfluxDBClient
 
@@ -83,3 +84,33 @@ class ManyTestCasesWithServerMixin(object):
     def tearDown(self):
         """Deconstruct an instance of ManyTestCasesWithServerMixin."""
         self.cli.drop_database('db')
+
+
+class StandInServerMixin(object):
+    """Define the stand-in server mixin.
+
+    Same as the ManyTestCasesWithServerMixin but with a StandInServer,
+    serving from memory in a thread, so that no influxd binary is needed.
+    Only what the stand-in server supports can be tested this way.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the StandInServer of the class."""
+        cls.standin = StandInServer().start()
+        cls.cli = InfluxDBClient(cls.standin.host, cls.standin.port,
+                                 'root', '', database='db')
+
+    def setUp(self):
+        """Create the 'db' database."""
+        self.cli.create_database('db')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the StandInServer of the class."""
+        cls.cli.close()
+        cls.standin.close()
+
+    def tearDown(self):
+        """Drop the 'db' database."""
+        self.cli.drop_database('db')
@@ -0,0 +1,957 @@
+# -*- coding: utf-8 -*-
+"""A pure-Python stand-in for an InfluxDB server.
+
+:class:`StandInServer` speaks enough of the HTTP API of InfluxDB 1.x for
+the client to run end to end without an ``influxd`` binary:
+
+* ``/ping``;
+* ``/write``, parsing the line protocol, gzipped or not, sent at once or
+  with chunked transfer encoding, and keeping the points in memory. Like
+  InfluxDB, the points of a series sharing a time are merged and a field
+  keeps the type it was first written with;
+* ``/query``, including chunked JSON responses, for a subset of InfluxQL:
+  ``CREATE DATABASE``, ``DROP DATABASE``, ``DROP MEASUREMENT``, ``SHOW
+  DATABASES``, ``SHOW MEASUREMENTS``, ``SHOW SERIES``, ``SHOW TAG KEYS``,
+  ``SHOW FIELD KEYS``, ``SHOW RETENTION POLICIES`` and ``SELECT`` of fields,
+  tags or of the count, sum, mean, min, max, first or last of fields,
+  with ``WHERE`` conditions joined by ``AND``, ``GROUP BY`` tags, ``ORDER
+  BY time``, ``LIMIT`` and ``OFFSET``.
+
+Retention policies are accepted and ignored. The server runs in a thread
+of the current process, so that it shares the interpreter with the client
+under test; run the module as a script to serve from another process::
+
+    $ python -m influxdb.tests.server_tests.standin_server --port 8086
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import base64
+import json
+import logging
+import math
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from six import integer_types, iteritems, text_type
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qsl, urlparse
+
+from influxdb.line_protocol import _parse_timestamp
+
+log = logging.getLogger(__name__)
+
+VERSION = '1.3.0-standin'
+DEFAULT_CHUNK_SIZE = 10000
+
+_UNITS_NS = {
+    'n': 1, 'ns': 1,
+    'u': 10 ** 3, 'us': 10 ** 3, '\xb5': 10 ** 3, '\xb5s': 10 ** 3,
+    'ms': 10 ** 6,
+    's': 10 ** 9,
+    'm': 60 * 10 ** 9,
+    'h': 3600 * 10 ** 9,
+    'd': 86400 * 10 ** 9,
+    'w': 7 * 86400 * 10 ** 9,
+}
+_BOOLEANS = {
+    't': True, 'T': True, 'true': True, 'True': True, 'TRUE': True,
+    'f': False, 'F': False, 'false': False, 'False': False, 'FALSE': False,
+}
+_EPOCH = datetime(1970, 1, 1)
+
+# line protocol
+
+_KEY_ESCAPE = re.compile(r'\\([\\ ,=])')
+_STRING_ESCAPE = re.compile(r'\\([\\"])')
+
+
+# the series key, the field set and the timestamp of a line with escaped
+# characters or string values
+_LINE_RE = re.compile(
+    r'([^\\ ]*(?:\\.[^\\ ]*)*) '
+    r'([^\\" ]*(?:(?:"[^"\\]*(?:\\.[^"\\]*)*"|\\.)[^\\" ]*)*)'
+    r'(?: (\S*))?$', re.S)
+# the measurement or a tag of a series key, with the comma that follows
+_ELEMENT_RE = re.compile(r'([^\\,]*(?:\\.[^\\,]*)*)(?:,|$)', re.S)
+_PAIR_RE = re.compile(r'([^\\=]*(?:\\.[^\\=]*)*)=(.*)$', re.S)
+# a field of a field set, with the comma that follows
+_FIELD_RE = re.compile(
+    r'([^\\,=]*(?:\\.[^\\,=]*)*)='
+    r'("[^"\\]*(?:\\.[^"\\]*)*"|[^\\,"]*(?:\\.[^\\,"]*)*)(?:,|$)', re.S)
+
+
+def _iter_matches(pattern, text):
+    """Generate the consecutive matches of `pattern` covering `text`."""
+    position = 0
+    while True:
+        match = pattern.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError("invalid line format")
+        yield match
+        position = match.end()
+        if position == len(text):
+            return
+
+
+def _split_pair(text):
+    """Split a tag on its first unescaped '='."""
+    match = _PAIR_RE.match(text)
+    return [text] if match is None else list(match.groups())
+
+
+def _split(text, separator, quotes=False):
+    """Split `text` on the unescaped occurrences of `separator`.
+
+    With `quotes`, the occurrences in double quotes are skipped too.
+    """
+    parts = []
+    start = i = 0
+    quoted = False
+    while i < len(text):
+        char = text[i]
+        if char == '\\':
+            i += 2
+            continue
+        if quotes and char == '"':
+            quoted = not quoted
+        elif char == separator and not quoted:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _field_value(text):
+    if text[:1] == '"':
+        if len(text) < 2 or text[-1] != '"':
+            raise ValueError("unterminated string")
+        text = text[1:-1]
+        return _STRING_ESCAPE.sub(r'\1', text) if '\\' in text else text
+    if text in _BOOLEANS:
+        return _BOOLEANS[text]
+    if text[-1:] == 'i':
+        return int(text[:-1])
+    value = float(text)
+    if math.isnan(value) or math.isinf(value):
+        raise ValueError("invalid number")
+    return value
+
+
+def parse_line(line, precision=None, now=None):
+    """Parse a line of line protocol.
+
+    :param line: the line, without its newline
+    :type line: str
+    :param precision: unit of the timestamp, defaults to nanoseconds
+    :type precision: str
+    :param now: nanoseconds since the epoch given to a point without a
+        timestamp, defaults to the current time
+    :type now: int
+    :returns: the measurement, the sorted (key, value) pairs of the tags,
+        the dict of the fields and the time in nanoseconds
+    :rtype: tuple
+    :raises ValueError: if the line is invalid
+    """
+    escaped = '\\' in line
+    if escaped or '"' in line:
+        match = _LINE_RE.match(line)
+        if match is None:
+            raise ValueError("invalid line format")
+        key, field_set, timestamp = match.groups()
+        parts = [key, field_set]
+        if timestamp is not None:
+            parts.append(timestamp)
+        series = [_split_pair(element.group(1))
+                  for element in _iter_matches(_ELEMENT_RE, key)]
+        fields = [field.groups()[:2]
+                  for field in _iter_matches(_FIELD_RE, field_set)]
+    else:
+        parts = line.split(' ')
+        if len(parts) < 2:
+            raise ValueError("missing fields")
+        series = [element.split('=', 1) for element in parts[0].split(',')]
+        fields = [field.split('=', 1) for field in parts[1].split(',')]
+    if len(parts) > 3:
+        raise ValueError("invalid timestamp")
+
+    measurement = '='.join(series[0])
+    if not measurement:
+        raise ValueError("missing measurement")
+    tags = []
+    for tag in series[1:]:
+        if len(tag) < 2 or not tag[0] or not tag[1]:
+            raise ValueError("missing tag value")
+        tags.append(tuple(tag))
+    if escaped:
+        measurement = _KEY_ESCAPE.sub(r'\1', measurement)
+        tags = [(_KEY_ESCAPE.sub(r'\1', name), _KEY_ESCAPE.sub(r'\1', value))
+                for name, value in tags]
+    tags.sort()
+
+    values = {}
+    for field in fields:
+        if len(field) < 2 or not field[0] or not field[1]:
+            raise ValueError("invalid field format")
+        name = _KEY_ESCAPE.sub(r'\1', field[0]) if escaped else field[0]
+        values[name] = _field_value(field[1])
+
+    if len(parts) == 3 and parts[2]:
+        timestamp = int(parts[2]) * _UNITS_NS[precision or 'n']
+    elif now is not None:
+        timestamp = now
+    else:
+        timestamp = int(time.time() * 10 ** 9)
+    return measurement, tuple(tags), values, timestamp
+
+
+def _field_type(value):
+    if isinstance(value, bool):
+        return 'boolean'
+    elif isinstance(value, integer_types):
+        return 'integer'
+    elif isinstance(value, float):
+        return 'float'
+    return 'string'
+
+
+class _Database(object):
+    """The points of a database, by measurement, series and time."""
+
+    __slots__ = ('measurements', 'field_types')
+
+    def __init__(self):
+        # {measurement: {tags: {time: fields}}}
+        self.measurements = {}
+        # {measurement: {field: type}}
+        self.field_types = {}
+
+    def add(self, measurement, tags, fields, timestamp):
+        types = self.field_types.setdefault(measurement, {})
+        kinds = [(name, _field_type(value))
+                 for name, value in iteritems(fields)]
+        for name, kind in kinds:
+            if types.get(name, kind) != kind:
+                raise ValueError(
+                    'field type conflict: input field "{0}" on measurement '
+                    '"{1}" is type {2}, already exists as type {3}'.format(
+                        name, measurement, kind, types[name]))
+        types.update(kinds)
+        series = self.measurements.setdefault(measurement, {}).setdefault(
+            tags, {})
+        point = series.get(timestamp)
+        if point is None:
+            series[timestamp] = fields
+        else:
+            point.update(fields)
+
+
+# InfluxQL
+
+class QueryError(Exception):
+    """A statement the stand-in server cannot parse."""
+
+
+class _StatementError(Exception):
+    """A statement that fails, reported in its result."""
+
+
+_IDENT = r'(?:"(?:[^"\\]|\\.)*"|[A-Za-z_]\w*)'
+_STRING = r"'(?:[^'\\]|\\.)*'"
+_DURATION = r'\d+(?:ns|us|u|\xb5s|\xb5|ms|s|m|h|d|w)'
+_ON = r'(?:\s+ON\s+(?P<db>{0}))?'.format(_IDENT)
+_FROM = r'(?:\s+FROM\s+(?P<measurement>{0}))?'.format(_IDENT)
+
+_STATEMENTS_RE = re.compile(
+    r'(?:{0}|"(?:[^"\\]|\\.)*"|[^;\'"])+'.format(_STRING))
+_SELECT_RE = re.compile(
+    r'SELECT\s+(?P<fields>.+?)\s+FROM\s+(?P<source>(?:(?:{0})?\.){{0,2}}{0})'
+    r'(?:\s+WHERE\s+(?P<where>.+?))?'
+    r'(?:\s+GROUP\s+BY\s+(?P<group>.+?))?'
+    r'(?:\s+ORDER\s+BY\s+time(?:\s+(?P<order>ASC|DESC))?)?'
+    r'(?:\s+LIMIT\s+(?P<limit>\d+))?'
+    r'(?:\s+OFFSET\s+(?P<offset>\d+))?$'.format(_IDENT),
+    re.I | re.S)
+_ITEM_RE = re.compile(
+    r'(?:(?P<function>[A-Za-z_]\w*)\(\s*(?P<argument>\*|{0})\s*\)'
+    r'|(?P<field>\*|{0}))(?:\s+AS\s+(?P<alias>{0}))?$'.format(_IDENT),
+    re.I)
+_CONDITION_RE = re.compile(
+    r'\s*(?P<name>{0})\s*(?P<op>!=|<>|>=|<=|=|>|<)\s*'
+    r'(?P<value>{1}|now\(\)(?:\s*[-+]\s*{2})?|-?{2}|-?\d+(?:\.\d*)?'
+    r'(?:[eE][-+]?\d+)?|true|false)\s*'.format(_IDENT, _STRING, _DURATION),
+    re.I)
+_AND_RE = re.compile(r'AND\s', re.I)
+_DURATION_RE = re.compile(r'(-?\d+)(\D+)$')
+
+_AGGREGATES = ('count', 'sum', 'mean', 'min', 'max', 'first', 'last')
+
+
+def _unquote(identifier):
+    if identifier.startswith('"'):
+        return re.sub(r'\\(.)', r'\1', identifier[1:-1])
+    return identifier
+
+
+def _split_outside(text, separator):
+    """Split `text` on `separator` out of quotes and parentheses."""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote and text[i - 1] != '\\':
+                quote = None
+        elif char in '\'"':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == separator and not depth:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts]
+
+
+def _literal(text, now):
+    """Return the value of a literal of a WHERE condition."""
+    lowered = text.lower()
+    if text.startswith("'"):
+        return re.sub(r"\\(.)", r'\1', text[1:-1])
+    elif lowered in ('true', 'false'):
+        return lowered == 'true'
+    elif lowered.startswith('now()'):
+        offset = lowered[5:].replace(' ', '')
+        if not offset:
+            return now
+        sign = -1 if offset[0] == '-' else 1
+        return now + sign * _literal(offset[1:], now)
+    match = _DURATION_RE.match(text)
+    if match is not None:
+        return int(match.group(1)) * _UNITS_NS[match.group(2)]
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _parse_where(where, now):
+    """Return the time bounds and the other conditions of a WHERE clause."""
+    lower = upper = None
+    conditions = []
+    position = 0
+    while True:
+        match = _CONDITION_RE.match(where, position)
+        if match is None:
+            raise QueryError("unsupported condition: {0}".format(
+                where[position:]))
+        name = _unquote(match.group('name'))
+        op = match.group('op')
+        value = _literal(match.group('value'), now)
+        if name.lower() == 'time':
+            if isinstance(value, text_type):
+                value = _parse_timestamp(value)
+            value = int(value)
+            if op in ('>', '>=', '='):
+                value_lower = value + 1 if op == '>' else value
+                lower = value_lower if lower is None else \
+                    max(lower, value_lower)
+            if op in ('<', '<=', '='):
+                value_upper = value - 1 if op == '<' else value
+                upper = value_upper if upper is None else \
+                    min(upper, value_upper)
+            if op in ('!=', '<>'):
+                raise QueryError("unsupported time condition")
+        else:
+            conditions.append((name, '!=' if op == '<>' else op, value))
+        position = match.end()
+        if position == len(where):
+            return lower, upper, conditions
+        match = _AND_RE.match(where, position)
+        if match is None:
+            raise QueryError("only AND is supported in WHERE clauses")
+        position = match.end()
+
+
+def _matches(value, op, expected):
+    if op == '=':
+        return value == expected
+    elif op == '!=':
+        return value != expected
+    if value is None:
+        return False
+    try:
+        if op == '>':
+            return value > expected
+        elif op == '>=':
+            return value >= expected
+        elif op == '<':
+            return value < expected
+        return value <= expected
+    except TypeError:
+        return False
+
+
+def _aggregate(function, values):
+    """Return an aggregate of the (time, value) pairs of a field."""
+    if function == 'count':
+        return len(values)
+    if not values:
+        return None
+    if function == 'first':
+        return min(values, key=lambda item: item[0])[1]
+    elif function == 'last':
+        return max(values, key=lambda item: item[0])[1]
+    numbers = [value for _, value in values
+               if _field_type(value) in ('integer', 'float')]
+    if not numbers:
+        return None
+    if function == 'sum':
+        return sum(numbers)
+    elif function == 'mean':
+        return sum(numbers) / len(numbers)
+    elif function == 'min':
+        return min(numbers)
+    return max(numbers)
+
+
+def _format_time(ns, epoch):
+    if epoch is not None:
+        return ns // _UNITS_NS[epoch]
+    seconds, nanoseconds = divmod(ns, 10 ** 9)
+    text = (_EPOCH + timedelta(seconds=seconds)).strftime(
+        '%Y-%m-%dT%H:%M:%S')
+    if nanoseconds:
+        text += '.{0:09d}'.format(nanoseconds).rstrip('0')
+    return text + 'Z'
+
+
+class StandInServer(object):
+    """Serve the HTTP API of InfluxDB from memory.
+
+    :param host: the address to listen on, defaults to '127.0.0.1'
+    :type host: str
+    :param port: the port to listen on, defaults to 0 (any free port)
+    :type port: int
+    :param databases: the databases to create, defaults to none
+    :type databases: sequence of str
+    :param auth: the (username, password) the requests but the pings must
+        present, as parameters or with basic authentication, defaults to
+        None (no authentication)
+    :type auth: tuple
+    :param delay: number of seconds to wait before every response, to
+        simulate the latency of a remote server, defaults to 0
+    :type delay: float
+
+    :Example:
+
+    ::
+
+        >> with StandInServer(databases=['db']) as server:
+        ..     client = InfluxDBClient(port=server.port, database='db')
+        ..     client.write_points(points)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, databases=(), auth=None,
+                 delay=0):
+        """Construct a new StandInServer, listening on its port."""
+        self._databases = dict((name, _Database()) for name in databases)
+        self._auth = auth
+        self.delay = delay
+        self.points_written = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._http = _HTTPServer((host, port), self)
+        self.host, self.port = self._http.server_address[:2]
+        self._thread = None
+
+    @property
+    def url(self):
+        """The URL of the server."""
+        return 'http://{0}:{1}'.format(self.host, self.port)
+
+    def start(self):
+        """Serve the requests from a thread."""
+        self._thread = threading.Thread(target=self._http.serve_forever,
+                                        args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stop serving and close the listening socket."""
+        if self._thread is not None:
+            self._http.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._http.server_close()
+
+    def __enter__(self):
+        """Start the server."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the server."""
+        self.close()
+
+    def authorized(self, params, authorization):
+        """Tell if a request presents the expected credentials."""
+        if self._auth is None:
+            return True
+        if 'u' in params:
+            return (params['u'], params.get('p', '')) == tuple(self._auth)
+        if authorization and authorization.startswith('Basic '):
+            credentials = base64.b64decode(authorization[6:]).decode('utf-8')
+            return tuple(credentials.split(':', 1)) == tuple(self._auth)
+        return False
+
+    def write(self, database, body, precision=None):
+        """Store the points of a body of line protocol.
+
+        :returns: the HTTP status and the error, if any
+        :rtype: tuple
+        """
+        if precision not in (None, '') and precision not in _UNITS_NS:
+            return 400, 'invalid precision {0!r}'.format(precision)
+        now = int(time.time() * 10 ** 9)
+        error = None
+        written = 0
+        with self._lock:
+            db = self._databases.get(database)
+            if db is None:
+                return 404, 'database not found: "{0}"'.format(database)
+            for line in body.decode('utf-8').split('\n'):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    db.add(*parse_line(line, precision or None, now))
+                    written += 1
+                except (ValueError, KeyError) as e:
+                    if error is None:
+                        error = "unable to parse '{0}': {1}".format(line, e)
+            self.points_written += written
+        if error is not None:
+            return 400, 'partial write: {0}'.format(error)
+        return 204, None
+
+    def query(self, query, database=None, epoch=None):
+        """Run the statements of a query.
+
+        :returns: the result of every statement
+        :rtype: list of dict
+        :raises QueryError: if a statement is not supported
+        """
+        statements = [statement.strip() for statement
+                      in _STATEMENTS_RE.findall(query) if statement.strip()]
+        if not statements:
+            raise QueryError("empty query")
+        if epoch is not None and epoch not in _UNITS_NS:
+            raise QueryError("invalid epoch {0!r}".format(epoch))
+        now = int(time.time() * 10 ** 9)
+        results = []
+        with self._lock:
+            for statement_id, statement in enumerate(statements):
+                result = {'statement_id': statement_id}
+                try:
+                    series = self._execute(statement, database, epoch, now)
+                except _StatementError as e:
+                    result['error'] = str(e)
+                else:
+                    if series:
+                        result['series'] = series
+                results.append(result)
+        return results
+
+    def _database(self, name):
+        if not name:
+            raise _StatementError('database name required')
+        db = self._databases.get(name)
+        if db is None:
+            raise _StatementError('database not found: {0}'.format(name))
+        return db
+
+    def _execute(self, statement, database, epoch, now):
+        """Return the series of the result of a statement."""
+        words = statement.split(None, 3)
+        command = ' '.join(words[:2]).upper()
+        match = None
+        if command == 'CREATE DATABASE' or command == 'DROP DATABASE':
+            match = re.match(r'(?:CREATE|DROP)\s+DATABASE\s+(?P<db>{0})'
+                             r'(?:\s+WITH\s+.*)?$'.format(_IDENT),
+                             statement, re.I | re.S)
+            if match is not None:
+                name = _unquote(match.group('db'))
+                if command == 'CREATE DATABASE':
+                    self._databases.setdefault(name, _Database())
+                else:
+                    self._databases.pop(name, None)
+                return None
+        elif command == 'DROP MEASUREMENT':
+            match = re.match(r'DROP\s+MEASUREMENT\s+(?P<measurement>{0})$'
+                             .format(_IDENT), statement, re.I)
+            if match is not None:
+                name = _unquote(match.group('measurement'))
+                db = self._database(database)
+                db.measurements.pop(name, None)
+                db.field_types.pop(name, None)
+                return None
+        elif command == 'SHOW DATABASES':
+            if len(words) == 2:
+                return [{'name': 'databases', 'columns': ['name'],
+                         'values': [[name] for name
+                                    in sorted(self._databases)]}]
+        elif command.startswith('SHOW '):
+            match = re.match(
+                r'SHOW\s+(?P<what>MEASUREMENTS|SERIES|TAG\s+KEYS|FIELD\s+KEYS'
+                r'|RETENTION\s+POLICIES){0}{1}$'.format(_ON, _FROM),
+                statement, re.I)
+            if match is not None:
+                return self._show(match, database)
+        elif command.startswith('SELECT '):
+            match = _SELECT_RE.match(statement)
+            if match is not None:
+                return self._select(match, database, epoch, now)
+        raise QueryError("unsupported statement: {0}".format(statement))
+
+    def _show(self, match, database):
+        what = ' '.join(match.group('what').upper().split())
+        if match.group('db'):
+            database = _unquote(match.group('db'))
+        db = self._database(database)
+        if what == 'RETENTION POLICIES':
+            return [{'columns': ['name', 'duration', 'shardGroupDuration',
+                                 'replicaN', 'default'],
+                     'values': [['autogen', '0s', '168h0m0s', 1, True]]}]
+        names = sorted(db.measurements)
+        if match.group('measurement'):
+            name = _unquote(match.group('measurement'))
+            names = [name] if name in db.measurements else []
+        if not names:
+            return None
+        if what == 'MEASUREMENTS':
+            return [{'name': 'measurements', 'columns': ['name'],
+                     'values': [[name] for name in names]}]
+        elif what == 'SERIES':
+            keys = sorted(','.join([name] + ['='.join(tag) for tag in tags])
+                          for name in names for tags in db.measurements[name])
+            return [{'columns': ['key'], 'values': [[key] for key in keys]}]
+        elif what == 'TAG KEYS':
+            series = []
+            for name in names:
+                keys = set(key for tags in db.measurements[name]
+                           for key, _ in tags)
+                if keys:
+                    series.append({'name': name, 'columns': ['tagKey'],
+                                   'values': [[key] for key in sorted(keys)]})
+            return series
+        return [{'name': name, 'columns': ['fieldKey', 'fieldType'],
+                 'values': [list(item) for item
+                            in sorted(iteritems(db.field_types[name]))]}
+                for name in names]
+
+    def _select(self, match, database, epoch, now):
+        source = _split(match.group('source'), '.', quotes=True)
+        if len(source) == 3 and source[0]:
+            database = _unquote(source[0])
+        db = self._database(database)
+        measurement = _unquote(source[-1])
+
+        # (column, function, field); a field of None is every field
+        items = []
+        for text in _split_outside(match.group('fields'), ','):
+            item = _ITEM_RE.match(text)
+            if item is None:
+                raise QueryError("unsupported field: {0}".format(text))
+            function = item.group('function')
+            if function is not None:
+                function = function.lower()
+                if function not in _AGGREGATES:
+                    raise QueryError("unsupported function: {0}".format(
+                        function))
+                argument = item.group('argument')
+                field = None if argument == '*' else _unquote(argument)
+                column = function
+            else:
+                field = item.group('field')
+                field = None if field == '*' else _unquote(field)
+                column = field
+            if item.group('alias'):
+                column = _unquote(item.group('alias'))
+            items.append((column, function, field))
+        aggregated = set(function is not None for _, function, _ in items)
+        if len(aggregated) > 1:
+            raise QueryError("mixing aggregate and non-aggregate queries "
+                             "is not supported")
+        aggregated = aggregated.pop()
+
+        lower = upper = None
+        conditions = []
+        if match.group('where'):
+            lower, upper, conditions = _parse_where(
+                match.group('where').strip(), now)
+
+        group = match.group('group')
+        group_keys = ()
+        if group:
+            group_keys = [_unquote(key) for key in _split_outside(group, ',')]
+            if any(key.lower().startswith('time(') for key in group_keys):
+                raise QueryError("GROUP BY time() is not supported")
+
+        all_series = db.measurements.get(measurement, {})
+        field_names = sorted(db.field_types.get(measurement, {}))
+        tag_names = sorted(set(key for tags in all_series
+                               for key, _ in tags))
+        if group_keys == ['*']:
+            group_keys = tag_names
+
+        groups = {}
+        for tags, points in iteritems(all_series):
+            tag_dict = dict(tags)
+            group_tags = tuple(tag_dict.get(key, '') for key in group_keys)
+            rows = groups.setdefault(group_tags, [])
+            for timestamp, fields in iteritems(points):
+                if lower is not None and timestamp < lower or \
+                        upper is not None and timestamp > upper:
+                    continue
+                if all(_matches(tag_dict[name] if name in tag_dict
+                                else fields.get(name), op, value)
+                       for name, op, value in conditions):
+                    rows.append((timestamp, tag_dict, fields))
+
+        # expand the wildcards
+        columns = []
+        for column, function, field in items:
+            if field is not None:
+                columns.append((column, function, field))
+            elif function is not None:
+                columns.extend(('{0}_{1}'.format(column, name), function,
+                                name) for name in field_names)
+            else:
+                columns.extend((name, None, name) for name in sorted(
+                    set(field_names).union(tag_names) - set(group_keys)))
+
+        descending = (match.group('order') or '').upper() == 'DESC'
+        offset = int(match.group('offset') or 0)
+        limit = match.group('limit')
+        series = []
+        for group_tags in sorted(groups):
+            rows = groups[group_tags]
+            if not rows:
+                continue
+            rows.sort(key=lambda row: row[0], reverse=descending)
+            if aggregated:
+                values = [[_format_time(lower or 0, epoch)] + [
+                    _aggregate(function, [
+                        (timestamp, fields[field])
+                        for timestamp, _, fields in rows if field in fields])
+                    for _, function, field in columns]]
+            else:
+                values = []
+                for timestamp, tag_dict, fields in rows:
+                    row = [fields.get(field, tag_dict.get(field))
+                           for _, _, field in columns]
+                    if any(field in fields for _, _, field in columns):
+                        values.append([_format_time(timestamp, epoch)] + row)
+            values = values[offset:]
+            if limit is not None:
+                values = values[:int(limit)]
+            if not values:
+                continue
+            result = {'name': measurement,
+                      'columns': ['time'] + [column for column, _, _
+                                             in columns],
+                      'values': values}
+            if group_keys:
+                result['tags'] = dict(zip(group_keys, group_tags))
+            series.append(result)
+        return series
+
+
+def _chunks(results, chunk_size):
+    """Split the results of a query into the chunks of a response."""
+    for result in results:
+        series = result.get('series')
+        if not series:
+            yield {'results': [result]}
+            continue
+        pieces = [dict(serie, values=serie['values'][i:i + chunk_size])
+                  for serie in series
+                  for i in range(0, len(serie['values']), chunk_size)]
+        for i, piece in enumerate(pieces):
+            chunk = {'statement_id': result['statement_id'],
+                     'series': [piece]}
+            if i < len(pieces) - 1:
+                chunk['partial'] = True
+            yield {'results': [chunk]}
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'InfluxDB-stand-in'
+    # the head and the body are written separately
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        log.debug(format, *args)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';', 1)[0], 16)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                if not size:
+                    break
+            body = b''.join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        return body
+
+    def _send_head(self, status, headers=()):
+        self.send_response(status)
+        self.send_header('X-Influxdb-Version', VERSION)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _reply(self, status, payload=None):
+        if payload is None:
+            self._send_head(status, [('Content-Length', '0')]
+                            if status != 204 else [])
+            return
+        body = json.dumps(payload).encode('utf-8')
+        self._send_head(status, [('Content-Type', 'application/json'),
+                                 ('Content-Length', str(len(body)))])
+        self.wfile.write(body)
+
+    def _reply_chunked(self, chunks):
+        self._send_head(200, [('Content-Type', 'application/json'),
+                              ('Transfer-Encoding', 'chunked')])
+        for chunk in chunks:
+            data = json.dumps(chunk).encode('utf-8') + b'\n'
+            self.wfile.write(b''.join((
+                '{0:x}\r\n'.format(len(data)).encode('ascii'),
+                data, b'\r\n')))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _handle(self):
+        server = self.server.standin
+        url = urlparse(self.path)
+        params = dict(parse_qsl(url.query))
+        body = b''
+        if self.command == 'POST':
+            body = self._read_body()
+            if self.headers.get('Content-Type', '').startswith(
+                    'application/x-www-form-urlencoded'):
+                params.update(parse_qsl(body.decode('utf-8')))
+        with server._lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight,
+                                       server.in_flight)
+        try:
+            self._respond(server, url, params, body)
+        finally:
+            with server._lock:
+                server.in_flight -= 1
+
+    def _respond(self, server, url, params, body):
+        if server.delay:
+            time.sleep(server.delay)
+
+        path = url.path.rstrip('/')
+        if path == '/ping':
+            self._reply(204)
+        elif not server.authorized(params,
+                                   self.headers.get('Authorization')):
+            self._reply(401, {'error': 'authorization failed'})
+        elif path == '/write':
+            if self.command != 'POST':
+                self._reply(405)
+                return
+            status, error = server.write(params.get('db'), body,
+                                         params.get('precision'))
+            self._reply(status, None if error is None else {'error': error})
+        elif path == '/query':
+            self._query(server, params)
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def _query(self, server, params):
+        if 'q' not in params:
+            self._reply(400, {'error': 'missing required parameter "q"'})
+            return
+        try:
+            results = server.query(params['q'], params.get('db'),
+                                   params.get('epoch'))
+        except QueryError as e:
+            self._reply(400, {'error': 'error parsing query: {0}'.format(e)})
+            return
+        if params.get('chunked') == 'true':
+            chunk_size = int(params.get('chunk_size') or DEFAULT_CHUNK_SIZE)
+            self._reply_chunked(_chunks(results, chunk_size))
+        else:
+            self._reply(200, {'results': results})
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_HEAD(self):
+        self._handle()
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, standin):
+        BaseHTTPServer.HTTPServer.__init__(self, address, _Handler)
+        self.standin = standin
+
+
+def main(argv=None):
+    """Serve until interrupted."""
+    parser = argparse.ArgumentParser(
+        description='pure-Python stand-in for an InfluxDB server')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on')
+    parser.add_argument('--port', type=int, default=8086,
+                        help='port to listen on, 0 for any')
+    parser.add_argument('--database', action='append', default=[],
+                        help='database to create, can be repeated')
+    parser.add_argument('--delay', type=float, default=0,
+                        help='seconds to wait before every response')
+    args = parser.parse_args(argv)
+
+    server = StandInServer(args.host, args.port, args.database,
+                           delay=args.delay)
+    print('Listening on {0}'.format(server.url))
+    try:
+        server._http.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._http.server_close()
+
+
+if __name__ == '__main__':
+    main()
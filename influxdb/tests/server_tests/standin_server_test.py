@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Unit tests of the client against the stand-in server.
+
+Unlike client_test_with_server.py, these tests need no influxd binary:
+the requests are served from memory by a StandInServer.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+from influxdb import InfluxDBClient, Point
+from influxdb.exceptions import InfluxDBClientError
+from influxdb.tests.server_tests.base import StandInServerMixin
+from influxdb.tests.server_tests.standin_server import (
+    StandInServer,
+    parse_line,
+)
+
+_S = 10 ** 9
+
+
+class TestParseLine(unittest.TestCase):
+    """Test the line protocol parser of the stand-in server."""
+
+    def test_parse_line(self):
+        """Test the parsing of the values and of the escapes."""
+        self.assertEqual(
+            parse_line('cpu,region=eu,host=a value=0.5,n=3i,ok=t 10'),
+            ('cpu', (('host', 'a'), ('region', 'eu')),
+             {'value': 0.5, 'n': 3, 'ok': True}, 10))
+        self.assertEqual(
+            parse_line(r'my\ cpu,a\,b=c\=d s="x \"y\", z",f\ 1=F 2', 's'),
+            ('my cpu', (('a,b', 'c=d'),), {'s': 'x "y", z', 'f 1': False},
+             2 * _S))
+        self.assertEqual(parse_line('cpu value=1', now=42)[3], 42)
+
+    def test_parse_invalid_line(self):
+        """Test the invalid lines being rejected."""
+        for line in ('cpu', 'cpu value', 'cpu,host value=1', ',a=b v=1',
+                     'cpu value="open', 'cpu value=1 2 3', 'cpu value=x',
+                     'cpu value=1 now'):
+            with self.assertRaises(ValueError):
+                parse_line(line)
+
+
+class TestStandInServer(StandInServerMixin, unittest.TestCase):
+    """Test the client against the stand-in server."""
+
+    def query_points(self, query, **kwargs):
+        """Return the points of a query."""
+        return list(self.cli.query(query, **kwargs).get_points())
+
+    def test_ping(self):
+        """Test the version returned by a ping."""
+        self.assertEqual(self.cli.ping(), '1.3.0-standin')
+
+    def test_write_and_select(self):
+        """Test the points written being selected back."""
+        self.assertTrue(self.cli.write_points([
+            {'measurement': 'cpu', 'tags': {'host': 'a'},
+             'time': '2009-11-10T23:00:00Z',
+             'fields': {'value': 0.64, 'text': 'a "quoted", text'}},
+            {'measurement': 'cpu', 'tags': {'host': 'b c'},
+             'time': '2009-11-10T23:00:00.5Z', 'fields': {'value': 1.0}},
+        ]))
+
+        self.assertEqual(self.query_points('SELECT * FROM "cpu"'), [
+            {'time': '2009-11-10T23:00:00Z', 'host': 'a',
+             'text': 'a "quoted", text', 'value': 0.64},
+            {'time': '2009-11-10T23:00:00.5Z', 'host': 'b c',
+             'text': None, 'value': 1.0},
+        ])
+        self.assertEqual(
+            self.query_points('SELECT value FROM db.autogen.cpu', epoch='ms'),
+            [{'time': 1257894000000, 'value': 0.64},
+             {'time': 1257894000500, 'value': 1.0}])
+
+    def test_merge_points(self):
+        """Test the points of a series sharing a time being merged."""
+        self.cli.write_points(['cpu,host=a x=1i 10', 'cpu,host=a y=2i 10',
+                               'cpu,host=a x=3i 10'], protocol='line')
+        self.assertEqual(self.query_points('SELECT * FROM cpu', epoch='n'),
+                         [{'time': 10, 'host': 'a', 'x': 3, 'y': 2}])
+
+    def test_partial_write(self):
+        """Test the valid lines of a body being written despite errors."""
+        with self.assertRaises(InfluxDBClientError) as ctx:
+            self.cli.write_points(['cpu value=1 1', 'cpu value="x" 2',
+                                   'cpu value=3 3'], protocol='line')
+        self.assertEqual(ctx.exception.code, 400)
+        self.assertIn('field type conflict', ctx.exception.content)
+        self.assertEqual(
+            self.query_points('SELECT count(value) FROM cpu'),
+            [{'time': '1970-01-01T00:00:00Z', 'count': 2}])
+
+    def test_where_group_by_and_aggregates(self):
+        """Test the conditions, the grouping and the aggregates."""
+        self.cli.write_points(
+            [Point('load', tags={'host': host}, fields={'value': value},
+                   time=time, time_precision='s')
+             for time, (host, value) in enumerate([
+                 ('a', 1), ('b', 2), ('a', 3), ('b', 4), ('a', 5)])])
+
+        self.assertEqual(
+            self.query_points("SELECT value FROM load WHERE host = 'a' AND "
+                              "time >= 1s AND value < 5", epoch='s'),
+            [{'time': 2, 'value': 3}])
+        result = self.cli.query(
+            'SELECT count(value), mean(value), max(value) AS top FROM load '
+            'GROUP BY * ; SELECT sum(*) FROM load WHERE time > now() - 1h')
+        self.assertEqual(
+            list(result[0].get_points(tags={'host': 'a'})),
+            [{'time': '1970-01-01T00:00:00Z', 'count': 3, 'mean': 3.0,
+              'top': 5}])
+        self.assertEqual(list(result[1].get_points()), [])
+
+    def test_order_limit_offset(self):
+        """Test the ordering and the paging of the rows."""
+        self.cli.write_points(['m v={0}i {0}'.format(i) for i in range(10)],
+                              protocol='line')
+        self.assertEqual(
+            [p['v'] for p in self.query_points(
+                'SELECT v FROM m ORDER BY time DESC LIMIT 3 OFFSET 2')],
+            [7, 6, 5])
+
+    def test_chunked_query(self):
+        """Test a query answered in chunks."""
+        self.cli.write_points(['m v={0}i {0}'.format(i) for i in range(25)],
+                              protocol='line')
+        points = list(self.cli.query('SELECT v FROM m', epoch='n',
+                                     chunked=True, chunk_size=10)
+                      .get_points())
+        self.assertEqual([p['v'] for p in points], list(range(25)))
+
+    def test_show_statements(self):
+        """Test the SHOW statements."""
+        self.cli.write_points(['cpu,host=a value=1,n=1i 1',
+                               'mem,region=eu free=2i 1'], protocol='line')
+        self.assertIn({'name': 'db'}, self.cli.get_list_database())
+        self.assertEqual(self.cli.get_list_retention_policies()[0]['name'],
+                         'autogen')
+        self.assertEqual(self.query_points('SHOW MEASUREMENTS'),
+                         [{'name': 'cpu'}, {'name': 'mem'}])
+        self.assertEqual(self.query_points('SHOW SERIES'),
+                         [{'key': 'cpu,host=a'}, {'key': 'mem,region=eu'}])
+        self.assertEqual(self.query_points('SHOW TAG KEYS FROM mem'),
+                         [{'tagKey': 'region'}])
+        self.assertEqual(self.query_points('SHOW FIELD KEYS ON db FROM cpu'),
+                         [{'fieldKey': 'n', 'fieldType': 'integer'},
+                          {'fieldKey': 'value', 'fieldType': 'float'}])
+
+        self.cli.query('DROP MEASUREMENT cpu')
+        self.assertEqual(self.query_points('SHOW MEASUREMENTS'),
+                         [{'name': 'mem'}])
+
+    def test_errors(self):
+        """Test the unknown databases and the unsupported statements."""
+        with self.assertRaises(InfluxDBClientError) as ctx:
+            self.cli.write_points(['cpu value=1'], protocol='line',
+                                  database='missing')
+        self.assertEqual(ctx.exception.code, 404)
+        with self.assertRaises(InfluxDBClientError) as ctx:
+            self.cli.query('SELECT * FROM cpu', database='missing')
+        self.assertIn('database not found', str(ctx.exception))
+        for query in ('SELECT median(value) FROM cpu',
+                      "SELECT * FROM cpu WHERE a = 'b' OR c = 'd'",
+                      'SELECT mean(value) FROM cpu GROUP BY time(1m)',
+                      'SHOW USERS'):
+            with self.assertRaises(InfluxDBClientError) as ctx:
+                self.cli.query(query)
+            self.assertEqual(ctx.exception.code, 400)
+
+    def test_transports(self):
+        """Test the gzipped, streamed and fast writes."""
+        points = [{'measurement': 'm', 'tags': {'t': str(i % 3)},
+                   'fields': {'v': i}, 'time': i} for i in range(30)]
+        clients = [
+            InfluxDBClient(self.standin.host, self.standin.port,
+                           database='db', gzip=True),
+            InfluxDBClient(self.standin.host, self.standin.port,
+                           database='db', fast_writes=True,
+                           sort_by_series=True),
+        ]
+        for cli in clients:
+            self.cli.query('DROP MEASUREMENT m')
+            try:
+                self.assertTrue(cli.write_points(points[:10]))
+                self.assertTrue(cli.write_points(iter(points[10:])))
+            finally:
+                cli.close()
+            self.assertEqual(self.query_points('SELECT sum(v) FROM m'),
+                             [{'time': '1970-01-01T00:00:00Z',
+                               'sum': sum(range(30))}])
+
+
+class TestStandInServerAuth(unittest.TestCase):
+    """Test the authentication by the stand-in server."""
+
+    def test_auth(self):
+        """Test the requests without the credentials being refused."""
+        with StandInServer(databases=['db'], auth=('root', 'pw')) as server:
+            cli = InfluxDBClient(server.host, server.port, 'root', 'pw',
+                                 database='db')
+            cli.write_points(['cpu value=1'], protocol='line')
+            self.assertEqual(server.points_written, 1)
+
+            cli = InfluxDBClient(server.host, server.port, 'root', 'no',
+                                 database='db')
+            self.assertTrue(cli.ping())
+            with self.assertRaises(InfluxDBClientError) as ctx:
+                cli.query('SHOW DATABASES')
+            self.assertEqual(ctx.exception.code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
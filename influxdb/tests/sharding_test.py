@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the ShardedInfluxDBClient."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+import requests_mock
+
+from influxdb import InfluxDBClient, Point, ShardedInfluxDBClient
+from influxdb.exceptions import InfluxDBBatchError
+from influxdb.sharding import _line_series_key
+
+
+def _sharded(*names, **kwargs):
+    return ShardedInfluxDBClient(
+        [InfluxDBClient(name, database='db') for name in names], **kwargs)
+
+
+class TestShardedInfluxDBClient(unittest.TestCase):
+    """Define the ShardedInfluxDBClient test object."""
+
+    def test_line_series_key(self):
+        """Test the series key of a line stops at the first real space."""
+        self.assertEqual(_line_series_key(b'cpu,host=a value=1 1'),
+                         b'cpu,host=a')
+        self.assertEqual(_line_series_key('cpu\\ load,host=a\\ b value=1'),
+                         b'cpu\\ load,host=a\\ b')
+        self.assertEqual(_line_series_key(b'cpu,host=a\\\\ value=1'),
+                         b'cpu,host=a\\\\')
+
+    def test_series_spread(self):
+        """Test series are spread over all the nodes, consistently."""
+        client = _sharded('h1', 'h2', 'h3')
+        owners = [client.node_for('cpu', {'host': str(i)})
+                  for i in range(3000)]
+        for name in client.nodes:
+            self.assertGreater(owners.count(name), 600)
+
+        again = _sharded('h3', 'h1', 'h2')
+        self.assertEqual(owners, [again.node_for('cpu', {'host': str(i)})
+                                  for i in range(3000)])
+
+    def test_adding_a_node_moves_few_series(self):
+        """Test only the series taken by a new node move."""
+        client = _sharded('h1', 'h2', 'h3')
+        before = [client.node_for('cpu', {'host': str(i)})
+                  for i in range(3000)]
+        client.add_node(InfluxDBClient('h4'))
+        after = [client.node_for('cpu', {'host': str(i)})
+                 for i in range(3000)]
+
+        moved = [(old, new) for old, new in zip(before, after) if old != new]
+        self.assertTrue(all(new == 'http://h4:8086' for _, new in moved))
+        self.assertLess(len(moved), 3000 * 0.35)
+
+        client.remove_node('http://h4:8086')
+        self.assertEqual(before, [client.node_for('cpu', {'host': str(i)})
+                                  for i in range(3000)])
+
+    def test_same_owner_for_every_point_type(self):
+        """Test dicts, Points and lines of a series go to the same node."""
+        client = _sharded('h1', 'h2', 'h3')
+        for i in range(50):
+            tags = {'host': 'server{0}'.format(i), 'region': 'eu'}
+            owner = client.node_for('cpu', tags)
+            groups = [
+                client._group([{'measurement': 'cpu', 'tags': tags,
+                                'fields': {'value': 1}}], None, 'json'),
+                client._group([{'measurement': 'cpu',
+                                'tags': {'host': tags['host']},
+                                'fields': {'value': 1}}],
+                              {'region': 'eu'}, 'json'),
+                client._group([Point('cpu', tags, {'value': 1})],
+                              None, 'json'),
+                client._group(['cpu,host={0},region=eu value=1'.format(
+                    tags['host'])], None, 'line'),
+            ]
+            for group in groups:
+                self.assertEqual(list(group), [owner])
+
+    def test_write_points(self):
+        """Test each node receives the points of its series."""
+        client = _sharded('h1', 'h2')
+        points = [{'measurement': 'cpu', 'tags': {'host': str(i)},
+                   'fields': {'value': i}} for i in range(20)]
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST, requests_mock.ANY,
+                           status_code=204)
+            self.assertTrue(client.write_points(points))
+            requests = m.request_history
+
+        self.assertEqual(len(requests), 2)
+        for request in requests:
+            lines = request.body.decode('utf-8').splitlines()
+            for line in lines:
+                host = line.split(' ')[0].split('=')[1]
+                self.assertEqual(
+                    client.node_for('cpu', {'host': host}),
+                    'http://{0}'.format(request.netloc))
+        self.assertEqual(sum(r.body.count(b'\n') for r in requests), 20)
+
+    def test_write_points_arguments(self):
+        """Test the batching arguments forwarded, the others checked."""
+        client = _sharded('h1', 'h2')
+        points = [{'measurement': 'cpu', 'tags': {'host': str(i)},
+                   'fields': {'value': i}} for i in range(20)]
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST, requests_mock.ANY,
+                           status_code=204)
+            self.assertTrue(client.write_points(
+                points, batch_size=4, max_batch_bytes=1000, concurrency=2))
+            self.assertEqual(sum(r.body.count(b'\n')
+                                 for r in m.request_history), 20)
+            self.assertGreater(m.call_count, 2)
+
+            for kwargs in ({'protocol': 'line', 'coalesce': True},
+                           {'time_precision': 'g'}):
+                with self.assertRaises(ValueError):
+                    client.write_points(['cpu value=1'], **kwargs)
+
+    def test_write_points_failure(self):
+        """Test the failure of a node is reported once all are written."""
+        client = _sharded('h1', 'h2')
+        points = [{'measurement': 'cpu', 'tags': {'host': str(i)},
+                   'fields': {'value': i}} for i in range(20)]
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST, 'http://h1:8086/write',
+                           status_code=204)
+            m.register_uri(requests_mock.POST, 'http://h2:8086/write',
+                           status_code=400)
+            with self.assertRaises(InfluxDBBatchError) as ctx:
+                client.write_points(points)
+            self.assertEqual(m.call_count, 2)
+        self.assertIs(ctx.exception.results[0], True)
+        self.assertEqual(list(ctx.exception.errors), [1])
+
+    def test_query_routing(self):
+        """Test a query goes to the node owning its series."""
+        client = _sharded('h1', 'h2', 'h3')
+        owner = client.node_for('cpu', {'host': 'server01'})
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.GET, requests_mock.ANY,
+                           json={'results': [{}]})
+            client.query('SELECT * FROM cpu', measurement='cpu',
+                         tags={'host': 'server01'})
+            self.assertEqual('http://' + m.last_request.netloc, owner)
+
+            self.assertEqual(sorted(client.query_all('SHOW DATABASES')),
+                             sorted(client.nodes))
+            self.assertEqual(m.call_count, 4)
+
+    def test_nodes_by_name(self):
+        """Test nodes given by name."""
+        client = ShardedInfluxDBClient({'a': InfluxDBClient('h1'),
+                                        'b': InfluxDBClient('h2')})
+        self.assertEqual(sorted(client.nodes), ['a', 'b'])
+        with self.assertRaises(ValueError):
+            client.add_node(InfluxDBClient('h3'), 'a')
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the WriteSpool and its replay by the client."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import requests.exceptions
+import requests_mock
+
+from influxdb import InfluxDBClient, WriteSpool
+
+
+class TestWriteSpool(unittest.TestCase):
+    """Define the WriteSpool test object."""
+
+    def setUp(self):
+        """Create a directory for the spool."""
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the spool directory."""
+        shutil.rmtree(self.directory)
+
+    def segments(self):
+        """Return the names of the segment files."""
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.endswith('.seg'))
+
+    def test_read_groups_records(self):
+        """Test consecutive records with the same parameters are merged."""
+        spool = WriteSpool(self.directory)
+        spool.append(b'cpu value=1i 1\n', {'db': 'a'})
+        spool.append(b'cpu value=2i 2\n', {'db': 'a'})
+        spool.append(b'cpu value=3i 3\n', {'db': 'b'})
+
+        params, body, position = spool.read()
+        self.assertEqual(params, {'db': 'a'})
+        self.assertEqual(body, b'cpu value=1i 1\ncpu value=2i 2\n')
+        # not consumed until committed
+        self.assertEqual(spool.read()[1], body)
+
+        spool.commit(position)
+        params, body, position = spool.read()
+        self.assertEqual((params, body), ({'db': 'b'}, b'cpu value=3i 3\n'))
+        spool.commit(position)
+        self.assertIsNone(spool.read())
+        self.assertEqual(spool.pending_bytes, 0)
+
+    def test_read_max_bytes(self):
+        """Test a read returns at least one record, at most max_bytes."""
+        spool = WriteSpool(self.directory)
+        for i in range(3):
+            spool.append(b'cpu value=1i\n')
+        self.assertEqual(spool.read(1)[1], b'cpu value=1i\n')
+        self.assertEqual(spool.read(26)[1], b'cpu value=1i\n' * 2)
+
+    def test_segments_are_released(self):
+        """Test replayed segments are deleted."""
+        spool = WriteSpool(self.directory, segment_bytes=1)
+        for i in range(3):
+            spool.append(b'cpu value=1i\n')
+        self.assertEqual(len(self.segments()), 3)
+
+        while True:
+            batch = spool.read()
+            if batch is None:
+                break
+            spool.commit(batch[2])
+        self.assertEqual(len(self.segments()), 1)
+
+    def test_resume_from_checkpoint(self):
+        """Test a reopened spool starts after the last commit."""
+        spool = WriteSpool(self.directory)
+        spool.append(b'cpu value=1i\n')
+        spool.append(b'cpu value=2i\n', {'db': 'other'})
+        spool.commit(spool.read()[2])
+        spool.close()
+
+        spool = WriteSpool(self.directory)
+        self.assertEqual(spool.read()[:2],
+                         ({'db': 'other'}, b'cpu value=2i\n'))
+        spool.append(b'cpu value=3i\n', {'db': 'other'})
+        spool.commit(spool.read()[2])
+        self.assertEqual(spool.read()[1], b'cpu value=3i\n')
+
+    def test_reopen_reuses_empty_segment(self):
+        """Test reopening a spool does not pile up empty segments."""
+        for i in range(4):
+            WriteSpool(self.directory).close()
+        self.assertEqual(len(self.segments()), 1)
+
+        spool = WriteSpool(self.directory)
+        spool.append(b'cpu value=1i\n')
+        spool.close()
+        for i in range(3):
+            WriteSpool(self.directory).close()
+        self.assertEqual(len(self.segments()), 2)
+        self.assertEqual(WriteSpool(self.directory).read()[1],
+                         b'cpu value=1i\n')
+
+    def test_truncated_record(self):
+        """Test a record cut by a crash is skipped."""
+        spool = WriteSpool(self.directory)
+        spool.append(b'cpu value=1i\n')
+        spool.append(b'cpu value=2i\n')
+        spool.close()
+        path = os.path.join(self.directory, self.segments()[0])
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 1)
+
+        spool = WriteSpool(self.directory)
+        params, body, position = spool.read()
+        self.assertEqual(body, b'cpu value=1i\n')
+        spool.commit(position)
+        self.assertIsNone(spool.read())
+
+    def test_max_bytes(self):
+        """Test the oldest segments are dropped to respect max_bytes."""
+        spool = WriteSpool(self.directory, segment_bytes=1, max_bytes=70)
+        for i in range(4):
+            self.assertTrue(spool.append(
+                'cpu value={0}i\n'.format(i).encode('utf-8')))
+        # each record takes 23 bytes, the first one had to go
+        self.assertEqual(spool.dropped_bytes, 23)
+        self.assertEqual(spool.read()[1], b'cpu value=1i\n')
+
+        self.assertFalse(spool.append(b'x' * 100))
+        self.assertEqual(spool.dropped_bytes, 23 + 110)
+
+
+class TestClientSpool(unittest.TestCase):
+    """Define the test object of writes through a spool."""
+
+    def setUp(self):
+        """Create a directory for the spool."""
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the spool directory."""
+        shutil.rmtree(self.directory)
+
+    def wait_until(self, condition):
+        """Wait up to 5 seconds for the condition to be true."""
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_write_is_spooled_and_replayed(self):
+        """Test writes are spooled during an outage and replayed after."""
+        spool = WriteSpool(self.directory, retry_interval=0.01)
+        with requests_mock.Mocker() as m:
+            for path in ('write', 'ping'):
+                m.register_uri(requests_mock.ANY,
+                               "http://localhost:8086/" + path,
+                               exc=requests.exceptions.ConnectionError)
+            cli = InfluxDBClient(database='db', spool=spool)
+            self.assertTrue(cli.write_points(
+                [{'measurement': 'cpu', 'fields': {'value': 1}}]))
+            self.assertTrue(cli.write_points(
+                [{'measurement': 'cpu', 'fields': {'value': 2}}]))
+            # the second write went straight to the spool
+            writes = [r for r in m.request_history if r.path == '/write']
+            self.assertEqual(len(writes), 3)
+            self.assertEqual(spool.pending_bytes, 2 * 33)
+
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            m.register_uri(requests_mock.GET,
+                           "http://localhost:8086/ping",
+                           status_code=204)
+            self.wait_until(lambda: spool.pending_bytes == 0)
+            cli.close()
+
+            self.assertEqual(m.last_request.body,
+                             b'cpu value=1i\ncpu value=2i\n')
+            self.assertEqual(m.last_request.qs['db'], ['db'])
+
+    def test_reopened_spool_is_replayed(self):
+        """Test a spool left non-empty is replayed without a new write."""
+        spool = WriteSpool(self.directory)
+        spool.append(b'cpu value=1i\n', {'db': 'db'})
+        spool.close()
+
+        spool = WriteSpool(self.directory, retry_interval=0.01)
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            m.register_uri(requests_mock.GET,
+                           "http://localhost:8086/ping",
+                           status_code=204)
+            cli = InfluxDBClient(spool=spool)
+            self.wait_until(lambda: spool.pending_bytes == 0)
+            cli.close()
+
+            self.assertEqual(spool.pending_bytes, 0)
+            self.assertEqual(m.last_request.body, b'cpu value=1i\n')
+            self.assertEqual(m.last_request.qs['db'], ['db'])
+
+    def test_rejected_data_is_dropped(self):
+        """Test spooled data the server rejects is not replayed forever."""
+        spool = WriteSpool(self.directory)
+        spool.append(b'bad\n', {'db': 'db'})
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=400)
+            m.register_uri(requests_mock.GET,
+                           "http://localhost:8086/ping",
+                           status_code=204)
+            cli = InfluxDBClient(spool=spool)
+            self.wait_until(lambda: spool.pending_bytes == 0)
+            cli.close()
+        self.assertEqual(spool.pending_bytes, 0)
+
+    def test_ping(self):
+        """Test ping returns the server version."""
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.GET,
+                           "http://localhost:8086/ping",
+                           status_code=204,
+                           headers={'X-Influxdb-Version': '1.2.3'})
+            self.assertEqual(InfluxDBClient().ping(), '1.2.3')
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the ClientStats."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+import mock
+import requests.exceptions
+import requests_mock
+
+from influxdb import ClientStats, InfluxDBClient
+from influxdb.client import _GzipBody, _StreamBody
+from influxdb.exceptions import InfluxDBClientError
+from influxdb.stats import log_exporter
+from influxdb.tests.server_tests.standin_server import StandInServer
+
+
+class TestClientStats(unittest.TestCase):
+    """Define the ClientStats test object."""
+
+    def test_snapshot(self):
+        """Test the stages, counters and histograms of a snapshot."""
+        stats = ClientStats(buckets=(0.1, 0.01, 1))
+        stats.add_time('serialize', 0.5)
+        stats.add_time('serialize', 0.25)
+        stats.count('points', 10)
+        for seconds in (0.005, 0.01, 0.5, 2):
+            stats.request_started()
+            stats.request_finished('write', seconds)
+        stats.request_started()
+
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot['stages']['serialize'],
+                         {'count': 2, 'total': 0.75})
+        self.assertEqual(snapshot['stages']['parse'],
+                         {'count': 0, 'total': 0.0})
+        self.assertEqual(snapshot['counters']['points'], 10)
+        self.assertEqual(snapshot['counters']['retries'], 0)
+        self.assertEqual(snapshot['in_flight'], 1)
+        self.assertEqual(snapshot['max_in_flight'], 1)
+        self.assertEqual(snapshot['endpoints']['write'], {
+            'count': 4, 'total': 2.515, 'max': 2,
+            'buckets': [(0.01, 2), (0.1, 0), (1, 1), (float('inf'), 1)]})
+
+        stats.reset()
+        self.assertEqual(stats.snapshot()['counters']['points'], 0)
+        self.assertEqual(stats.snapshot()['endpoints'], {})
+
+    def test_reset_keeps_in_flight(self):
+        """Test a reset does not forget the requests in flight."""
+        stats = ClientStats()
+        stats.request_started()
+        stats.request_started()
+        stats.request_finished('write', 0.1)
+        stats.reset()
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot['in_flight'], 1)
+        self.assertEqual(snapshot['max_in_flight'], 1)
+
+        stats.request_finished('write', 0.1)
+        self.assertEqual(stats.snapshot()['in_flight'], 0)
+
+    def test_export(self):
+        """Test the exporters receiving the snapshots."""
+        exporter = mock.Mock()
+        failing = mock.Mock(side_effect=ValueError)
+        stats = ClientStats(exporters=[failing])
+        stats.add_exporter(exporter)
+        stats.add_exporter(log_exporter)
+        stats.count('requests')
+        with mock.patch('influxdb.stats.log') as log:
+            stats.export()
+        self.assertTrue(log.exception.called)
+        self.assertEqual(exporter.call_args[0][0]['counters']['requests'], 1)
+
+    def test_periodic_export(self):
+        """Test the client exporting its stats until it is closed."""
+        exporter = mock.Mock()
+        cli = InfluxDBClient(stats=ClientStats(exporters=[exporter],
+                                               export_interval=0.01))
+        cli.close()
+        self.assertTrue(exporter.called)
+
+
+class TestClientInstrumentation(unittest.TestCase):
+    """Test the stats recorded by a client."""
+
+    def test_no_stats(self):
+        """Test the stats being off by default."""
+        self.assertIsNone(InfluxDBClient().stats)
+
+    def test_write_and_query(self):
+        """Test the counters and timings of writes and queries."""
+        cli = InfluxDBClient(database='db', stats=True)
+        with requests_mock.Mocker() as m:
+            m.register_uri(requests_mock.POST,
+                           "http://localhost:8086/write",
+                           status_code=204)
+            m.register_uri(requests_mock.GET,
+                           "http://localhost:8086/query",
+                           json={'results': [{'statement_id': 0}]})
+            cli.write_points(['cpu value=1', 'cpu value=2'],
+                             protocol='line')
+            cli.query('SELECT * FROM cpu')
+
+        snapshot = cli.stats.snapshot()
+        self.assertEqual(snapshot['counters'], {
+            'points': 2, 'bytes': 24, 'requests': 2, 'retries': 0,
+            'failures': 0})
+        self.assertEqual(snapshot['stages']['serialize']['count'], 1)
+        self.assertEqual(snapshot['stages']['server']['count'], 2)
+        self.assertEqual(snapshot['stages']['parse']['count'], 1)
+        self.assertEqual(snapshot['stages']['compress']['count'], 0)
+        self.assertEqual(snapshot['endpoints']['write']['count'], 1)
+        self.assertEqual(snapshot['endpoints']['query']['count'], 1)
+        self.assertEqual(snapshot['in_flight'], 0)
+        self.assertEqual(snapshot['max_in_flight'], 1)
+
+    def test_stream_lines(self):
+        """Test the lines of a streamed body being counted as sent."""
+        body = _StreamBody(iter([b'a\n', b'b\n', b'c\n']), chunk_size=4)
+        self.assertEqual(list(body), [b'a\nb\n', b'c\n'])
+        self.assertEqual(body.lines, 3)
+        self.assertEqual(_GzipBody(body, 1).lines, 3)
+        self.assertEqual(_GzipBody(b'a\nb\n', 1).lines, 2)
+
+    def test_gzip(self):
+        """Test the compression being timed while the bodies stream."""
+        with StandInServer(databases=['db']) as server:
+            cli = InfluxDBClient(server.host, server.port, database='db',
+                                 gzip=True, stats=True)
+            with mock.patch.object(cli._session, 'request',
+                                   wraps=cli._session.request) as request:
+                cli.write_points(['cpu value=1'], protocol='line')
+                cli.write_points(iter(['cpu value=2', 'cpu value=3']),
+                                 protocol='line')
+            cli.close()
+
+        self.assertEqual(server.points_written, 3)
+        # stats or not, the bodies are compressed while they are sent
+        for call in request.call_args_list:
+            self.assertIsInstance(call[1]['data'], _GzipBody)
+        snapshot = cli.stats.snapshot()
+        self.assertEqual(snapshot['stages']['compress']['count'], 2)
+        self.assertEqual(snapshot['counters']['bytes'],
+                         sum(call[1]['data'].size
+                             for call in request.call_args_list))
+        self.assertEqual(snapshot['counters']['points'], 3)
+
+    def test_retries_and_failures(self):
+        """Test the retried and failed requests being counted."""
+        cli = InfluxDBClient(database='db', stats=True)
+        with requests_mock.Mocker() as m:
+            m.register_uri(
+                requests_mock.POST, "http://localhost:8086/write",
+                [{'exc': requests.exceptions.ConnectionError},
+                 {'status_code': 204},
+                 {'status_code': 400, 'text': '{"error": "bad"}'}])
+            cli.write_points(['cpu value=1'], protocol='line')
+            with self.assertRaises(InfluxDBClientError):
+                cli.write_points(['cpu value=1'], protocol='line')
+
+        snapshot = cli.stats.snapshot()
+        self.assertEqual(snapshot['counters']['requests'], 3)
+        self.assertEqual(snapshot['counters']['retries'], 1)
+        self.assertEqual(snapshot['counters']['failures'], 1)
+        self.assertEqual(snapshot['counters']['points'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,7 +10,7 @@ from datetime import datetime
 import unittest
 from pytz import UTC, timezone
 
-from influxdb import line_protocol
+from influxdb import Point, line_protocol
 
 
 class TestLineProtocol(unittest.TestCase):
@@ -144,3 +144,168 @@ class TestLineProtocol(unittest.TestCase):
             line_protocol.make_lines(data),
             'test float_val=1.0000000000000009\n'
         )
+
+    def test_iter_lines_bytes(self):
+        """Test iter_lines yields one encoded line per point."""
+        data = {
+            "points": [
+                {"measurement": "cpu", "tags": {"host": "Привет"},
+                 "fields": {"value": 1}, "time": 1},
+                {"measurement": "cpu", "tags": {"host": "Привет"},
+                 "fields": {"value": 2}, "time": 2},
+            ]
+        }
+        self.assertEqual(
+            list(line_protocol.iter_lines(data)),
+            ['cpu,host=Привет value=1i 1\n'.encode('utf-8'),
+             'cpu,host=Привет value=2i 2\n'.encode('utf-8')]
+        )
+
+    def test_series_key_cache(self):
+        """Test cached series keys honour static and point tags."""
+        data = {
+            "measurement": "default measurement",
+            "tags": {"region": "us west", "host": "static"},
+            "points": [
+                {"tags": {"host": "a,b"}, "fields": {"value": 1}},
+                {"tags": {"host": "a,b"}, "fields": {"value": 2}},
+                {"measurement": "other", "fields": {"value": 3}},
+                {"tags": {"host": ["not", "hashable"]},
+                 "fields": {"value": 4}},
+            ]
+        }
+        expected = (
+            'default\\ measurement,host=a\\,b,region=us\\ west value=1i\n'
+            'default\\ measurement,host=a\\,b,region=us\\ west value=2i\n'
+            'other,host=static,region=us\\ west value=3i\n'
+            "default\\ measurement,host=['not'\\,\\ 'hashable'],"
+            "region=us\\ west value=4i\n"
+        )
+        self.assertEqual(line_protocol.make_lines(data), expected)
+        # a second pass is served from the cache
+        self.assertEqual(line_protocol.make_lines(data), expected)
+
+    def test_series_key_cache_equal_values(self):
+        """Test equal values of different types not sharing a cache entry."""
+        data = {"points": [
+            {"measurement": "m", "tags": {"t": value}, "fields": {key: 1}}
+            for value, key in ((2.0, 2.0), (2, 2), (True, True), (1, 1),
+                               (1.0, 1.0), ('1', '1'))]}
+        for _ in range(2):
+            self.assertEqual(
+                line_protocol.make_lines(data),
+                'm,t=2.0 2.0=1i\n'
+                'm,t=2 2=1i\n'
+                'm,t=True True=1i\n'
+                'm,t=1 1=1i\n'
+                'm,t=1.0 1.0=1i\n'
+                'm,t=1 1=1i\n'
+            )
+        self.assertEqual(
+            line_protocol.make_lines({"tags": {"t": 1.0}, "points": [
+                {"measurement": "m", "fields": {"v": 1}}]}),
+            'm,t=1.0 v=1i\n')
+        self.assertEqual(
+            line_protocol.make_lines({"tags": {"t": True}, "points": [
+                {"measurement": "m", "fields": {"v": 1}}]}),
+            'm,t=True v=1i\n')
+
+    def test_convert_timestamp_strings(self):
+        """Test RFC3339 and ISO-8601 strings are converted exactly."""
+        convert = line_protocol._convert_timestamp
+        self.assertEqual(convert('2009-11-10T23:00:00.123456789Z'),
+                         1257894000123456789)
+        self.assertEqual(convert('2009-11-10T23:00:00Z', 's'), 1257894000)
+        self.assertEqual(convert('2009-11-10T23:00:00+01:00', 's'),
+                         1257890400)
+        self.assertEqual(convert('2009-11-10 23:00:00-0130', 's'),
+                         1257899400)
+        self.assertEqual(convert('2009-11-10', 'h'), 349392)
+        self.assertEqual(convert(b'1970-01-01T00:00:00.000000001Z'), 1)
+        self.assertEqual(convert('1969-12-31T23:59:59.5Z', 's'), 0)
+        self.assertEqual(convert('1900-03-01T00:00:00Z', 's'), -2203891200)
+        # other formats are still handed to dateutil
+        self.assertEqual(convert('Nov 10 2009 23:00:00', 's'), 1257894000)
+
+        with self.assertRaises(ValueError):
+            convert('2009-02-29T00:00:00Z')
+        with self.assertRaises(ValueError):
+            convert('2009-11-10T23:00:00Z', 'g')
+
+    def test_convert_timestamp_datetimes(self):
+        """Test datetimes are converted with integer arithmetic."""
+        convert = line_protocol._convert_timestamp
+        dt = datetime(2262, 4, 11, 23, 47, 16, 854775)
+        self.assertEqual(convert(dt), 9223372036854775000)
+        self.assertEqual(convert(UTC.localize(dt), 'u'), 9223372036854775)
+        self.assertEqual(convert(datetime(1969, 12, 31, 23, 59, 59, 1), 's'),
+                         0)
+
+    def test_convert_timestamps(self):
+        """Test the batch conversion of timestamps."""
+        dt = datetime(2009, 11, 10, 23, 0, 0, 123456)
+        berlin = timezone('Europe/Berlin').localize(dt)
+        self.assertEqual(
+            line_protocol.convert_timestamps(
+                [dt, berlin, '2009-11-10T23:00:00.123456Z', 42], 'ms'),
+            [1257894000123, 1257890400123, 1257894000123, 42]
+        )
+        with self.assertRaises(ValueError):
+            line_protocol.convert_timestamps([dt], 'g')
+
+    def test_coalesce_lines(self):
+        """Test the points of a series and time being merged."""
+        data = {
+            'tags': {'region': 'eu'},
+            'points': [
+                {'measurement': 'cpu', 'tags': {'host': 'a'},
+                 'fields': {'user': 1.0}, 'time': '2009-11-10T23:00:00Z'},
+                {'measurement': 'mem', 'tags': {'host': 'a'},
+                 'fields': {'used': 10}, 'time': 1257894000},
+                # same series and second as the first point
+                {'measurement': 'cpu', 'tags': {'host': 'a'},
+                 'fields': {'system': 2.0, 'user': 3.0},
+                 'time': datetime(2009, 11, 10, 23, 0, 0, 5000)},
+                Point('cpu', tags={'host': 'a', 'region': 'eu'},
+                      fields={'idle': 4.0}, time=1257894000,
+                      time_precision='s'),
+                # another series
+                {'measurement': 'cpu', 'tags': {'host': 'b'},
+                 'fields': {'user': 5.0}, 'time': 1257894000},
+                # points without a time are left alone
+                {'measurement': 'cpu', 'tags': {'host': 'a'},
+                 'fields': {'user': 6.0}},
+                {'measurement': 'cpu', 'tags': {'host': 'a'},
+                 'fields': {'user': 7.0}},
+            ]
+        }
+        self.assertEqual(line_protocol.coalesce_lines(data, 's'), [
+            b'cpu,host=a,region=eu idle=4.0,system=2.0,user=3.0 1257894000\n',
+            b'mem,host=a,region=eu used=10i 1257894000\n',
+            b'cpu,host=b,region=eu user=5.0 1257894000\n',
+            b'cpu,host=a,region=eu user=6.0\n',
+            b'cpu,host=a,region=eu user=7.0\n',
+        ])
+        # in nanoseconds the first and third points differ
+        self.assertEqual(
+            len(line_protocol.coalesce_lines(data)), len(data['points']) - 1)
+        self.assertEqual(
+            line_protocol.make_lines(data, 's', coalesce=True),
+            b''.join(line_protocol.coalesce_lines(data, 's')).decode())
+
+    def test_series_order(self):
+        """Test lines sorted by series, then time."""
+        lines = [
+            b'cpu,host=b value=1 20',
+            b'cpu,host=a\\ b value="x 10" 30',
+            b'cpu,host=a\\ b value="x 10"',
+            b'cpu,host=b value=2 -5',
+            b'cpu,host=a\\ b value=1 10',
+        ]
+        self.assertEqual(sorted(lines, key=line_protocol._series_order), [
+            b'cpu,host=a\\ b value="x 10"',
+            b'cpu,host=a\\ b value=1 10',
+            b'cpu,host=a\\ b value="x 10" 30',
+            b'cpu,host=b value=2 -5',
+            b'cpu,host=b value=1 20',
+        ])
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Unit tests of the unix domain socket transport."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+import requests.exceptions
+from six.moves import BaseHTTPServer, socketserver
+
+from influxdb import GeventInfluxDBClient, InfluxDBClient
+from influxdb.exceptions import InfluxDBClientError
+
+try:
+    import gevent  # noqa: F401
+except ImportError:
+    _HAS_GEVENT = False
+else:
+    _HAS_GEVENT = True
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        return 'unix'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code, body=b''):
+        self.send_response(code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path, None))
+        if self.path.startswith('/ping'):
+            self._reply(204)
+        else:
+            self._reply(200, json.dumps({'results': [{
+                'statement_id': 0,
+                'series': [{'name': 'cpu', 'columns': ['time', 'value'],
+                            'values': [[0, 1]]}]}]}).encode())
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        self.server.requests.append(('POST', self.path, body))
+        if b'bad' in body:
+            self._reply(400, b'{"error":"unable to parse"}')
+        else:
+            self._reply(204)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn,
+                      socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        socketserver.UnixStreamServer.__init__(self, path, _Handler)
+        self.requests = []
+        self.connections = 0
+
+    def get_request(self):
+        request, _ = self.socket.accept()
+        self.connections += 1
+        return request, ('unix', 0)
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "needs unix sockets")
+class TestUnixSocket(unittest.TestCase):
+    """Test the requests sent over a unix domain socket."""
+
+    def setUp(self):
+        """Serve HTTP on a unix socket in a temporary directory."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'Influx.sock')
+        self.server = _UnixHTTPServer(self.path)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       args=(0.05,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_write_and_query(self):
+        """Test writes and queries reusing a connection to the socket."""
+        cli = InfluxDBClient(unix_socket=self.path, database='db')
+        self.assertTrue(cli.write_points(['cpu value=1'], protocol='line'))
+        result = cli.query('SELECT value FROM cpu')
+        self.assertEqual(list(result.get_points()),
+                         [{'time': 0, 'value': 1}])
+        cli.ping()
+        cli.close()
+
+        method, path, body = self.server.requests[0]
+        self.assertEqual(method, 'POST')
+        self.assertTrue(path.startswith('/write?'))
+        self.assertEqual(body, b'cpu value=1\n')
+        self.assertEqual([r[0] for r in self.server.requests],
+                         ['POST', 'GET', 'GET'])
+        self.assertEqual(self.server.connections, 1)
+
+    def test_fast_writes(self):
+        """Test the fast writes being sent to the socket."""
+        cli = InfluxDBClient(unix_socket=self.path, database='db',
+                             fast_writes=True)
+        cli.write_points(['cpu value=1'], protocol='line')
+        cli.write_points(['cpu value=2'], protocol='line')
+        cli.close()
+        self.assertEqual([r[2] for r in self.server.requests],
+                         [b'cpu value=1\n', b'cpu value=2\n'])
+        self.assertEqual(self.server.connections, 1)
+
+    def test_error_response(self):
+        """Test the errors of the server being raised as usual."""
+        cli = InfluxDBClient(unix_socket=self.path, database='db')
+        with self.assertRaises(InfluxDBClientError) as ctx:
+            cli.write_points(['bad'], protocol='line')
+        self.assertEqual(ctx.exception.code, 400)
+
+    def test_missing_socket(self):
+        """Test a missing socket raising a connection error."""
+        cli = InfluxDBClient(unix_socket=self.path + '.missing', retries=1)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            cli.ping()
+
+    def test_from_dsn(self):
+        """Test the unix+influxdb DSN."""
+        cli = InfluxDBClient.from_dsn(
+            'unix+influxdb://usr:pwd@{0}/db'.format(
+                self.path.replace('/', '%2F')))
+        self.assertEqual(cli._unix_socket, self.path)
+        self.assertEqual(cli._database, 'db')
+        self.assertEqual(cli._username, 'usr')
+        self.assertEqual(cli._password, 'pwd')
+        cli.ping()
+        self.assertEqual(self.server.requests[0][0], 'GET')
+
+        with self.assertRaises(ValueError):
+            InfluxDBClient.from_dsn('unix+influxdb:///db')
+
+    def test_incompatible_options(self):
+        """Test unix_socket being refused with hosts or ssl."""
+        with self.assertRaises(ValueError):
+            InfluxDBClient(unix_socket=self.path, ssl=True)
+        with self.assertRaises(ValueError):
+            InfluxDBClient(unix_socket=self.path, hosts=['a', 'b'])
+
+    @unittest.skipUnless(_HAS_GEVENT, "needs gevent")
+    def test_gevent_client(self):
+        """Test the pooled sessions of the gevent client."""
+        cli = GeventInfluxDBClient(unix_socket=self.path, database='db')
+        self.assertTrue(cli.write_points(['cpu value=1'], protocol='line'))
+        cli.close()
+        self.assertEqual(self.server.requests[0][2], b'cpu value=1\n')
+
+
+if __name__ == '__main__':
+    unittest.main()